@@ -1,27 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+import io
+from typing import Optional
 
-from api.v1.services.auth import check_access_token
-from api.v1.services.user import UserService
+from fastapi import APIRouter, Depends, Query, Request, Response, UploadFile
+from starlette.responses import StreamingResponse
+
+from api.v1.services.auth import get_current_user
 from core.db import DatabaseHandler
-from core.db.models import User
+from core.db.crud import unit_of_work
 from api.v1.services.applicant import ApplicantService
-from core.request_models.applicant import ApplicantCreateRequest, ApplicantUpdateRequest
-from core.responce_models.applicant import ApplicantResponse, ApplicantPaginatedResponse
+from api.v1.services.applicant_export import ApplicantExportService
+from api.v1.services.applicant_import import ApplicantImportService, iter_rows
+from core.request_models.applicant import (
+    ApplicantBulkStatusRequest,
+    ApplicantCreateRequest,
+    ApplicantFileFormat,
+    ApplicantFilterRequest,
+    ApplicantSortKey,
+    ApplicantUpdateRequest,
+)
+from core.responce_models.applicant import (
+    ApplicantBulkStatusResponse,
+    ApplicantResponse,
+    ApplicantImportResponse,
+    ApplicantPaginatedResponse,
+    ApplicantSearchResponse,
+)
+from core.responce_models.timeline import TimelinePaginatedResponse
+from core.utilities.etag import entity_etag, etag_matches, not_modified, page_etag
+from core.utilities.responses import RowsJSONResponse
+from core.utilities.security import CurrentUser
 from deps import DatabaseMarker
 
 router = APIRouter(tags=["Applicants"])
 
-# ---------- Helper ----------
-
-
-async def get_user_obj(user_id: int, session: AsyncSession) -> User:
-    user = await UserService.get_user(session, user_id)
-    if not user.is_active:
-        raise HTTPException(403, "User is not active")
-    return user
-
-
 # ---------- Create applicant ----------
 
 
@@ -29,10 +40,9 @@ async def get_user_obj(user_id: int, session: AsyncSession) -> User:
 async def create_applicant(
     data: ApplicantCreateRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         applicant = await ApplicantService.create_applicant(
             session=session,
             first_name=data.first_name,
@@ -52,18 +62,147 @@ async def create_applicant(
         return applicant
 
 
+# ---------- Bulk status transition ----------
+
+
+@router.post("/status", response_model=ApplicantBulkStatusResponse)
+async def bulk_update_status(
+    data: ApplicantBulkStatusRequest,
+    db: DatabaseHandler = Depends(DatabaseMarker),
+    requester: CurrentUser = Depends(get_current_user),
+):
+    async with db.sessionmaker() as session, unit_of_work(session):
+        return await ApplicantService.bulk_update_status(
+            session=session,
+            status=data.status,
+            updated_by=requester,
+            ids=data.ids,
+            filters=data.filters,
+        )
+
+
+# ---------- Bulk import applicants ----------
+
+
+@router.post("/import", response_model=ApplicantImportResponse)
+async def import_applicants(
+    file: UploadFile,
+    file_format: Optional[ApplicantFileFormat] = Query(None, alias="format"),
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: DatabaseHandler = Depends(DatabaseMarker),
+    requester: CurrentUser = Depends(get_current_user),
+):
+    if file_format is None:
+        file_format = (
+            ApplicantFileFormat.jsonl
+            if (file.filename or "").endswith((".jsonl", ".ndjson"))
+            else ApplicantFileFormat.csv
+        )
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    async with db.sessionmaker() as session:
+        return await ApplicantImportService.import_applicants(
+            session=session,
+            rows=iter_rows(stream, file_format),
+            imported_by_id=requester.id,
+            batch_size=batch_size,
+        )
+
+
+# ---------- Export applicants ----------
+
+EXPORT_MEDIA_TYPES = {
+    ApplicantFileFormat.csv: "text/csv",
+    ApplicantFileFormat.jsonl: "application/x-ndjson",
+}
+
+
+@router.get("/export")
+async def export_applicants(
+    file_format: ApplicantFileFormat = Query(ApplicantFileFormat.csv, alias="format"),
+    filters: ApplicantFilterRequest = Depends(),
+    db: DatabaseHandler = Depends(DatabaseMarker),
+    requester: CurrentUser = Depends(get_current_user),
+):
+    # Сессия живёт, пока клиент дочитывает ответ
+    async def body():
+        async with db.sessionmaker() as session:
+            async for chunk in ApplicantExportService.stream_applicants(
+                session, filters, file_format
+            ):
+                yield chunk
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="applicants.{file_format.value}"'
+            )
+        },
+    )
+
+
+# ---------- Search applicants ----------
+
+
+@router.get("/search", response_model=ApplicantSearchResponse)
+async def search_applicants(
+    q: str = Query(min_length=3),
+    limit: int = Query(20, ge=1, le=100),
+    db: DatabaseHandler = Depends(DatabaseMarker),
+    requester: CurrentUser = Depends(get_current_user),
+):
+    async with db.sessionmaker() as session:
+        result = await ApplicantService.search_applicants(session, q, limit)
+    return RowsJSONResponse(result)
+
+
 # ---------- Get single applicant ----------
 
 
 @router.get("/{applicant_id}", response_model=ApplicantResponse)
 async def get_applicant(
     applicant_id: int,
+    request: Request,
+    response: Response,
+    db: DatabaseHandler = Depends(DatabaseMarker),
+    requester: CurrentUser = Depends(get_current_user),
+):
+    async with db.sessionmaker() as session:
+        # С If-None-Match сначала сверяем только версию строки
+        if request.headers.get("if-none-match"):
+            version = await ApplicantService.get_applicant_version(
+                session, applicant_id
+            )
+            if version is not None:
+                etag = entity_etag(applicant_id, version)
+                if etag_matches(request, etag):
+                    return not_modified(etag)
+
+        applicant = await ApplicantService.get_applicant(session, applicant_id)
+
+    response.headers["ETag"] = entity_etag(applicant.id, applicant.version)
+    return applicant
+
+
+# ---------- Applicant timeline: comments + audit (keyset) ----------
+
+
+@router.get("/{applicant_id}/timeline", response_model=TimelinePaginatedResponse)
+async def get_applicant_timeline(
+    applicant_id: int,
+    # Каждая ветка UNION читает до page_size + 1 строк
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
     async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await ApplicantService.get_applicant(session, applicant_id)
+        result = await ApplicantService.get_applicant_timeline(
+            session, applicant_id, page_size=page_size, cursor=cursor
+        )
+    return RowsJSONResponse(result)
 
 
 # ---------- Update applicant ----------
@@ -74,10 +213,9 @@ async def update_applicant(
     applicant_id: int,
     updates: ApplicantUpdateRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         return await ApplicantService.update_applicant(
             session=session,
             applicant_id=applicant_id,
@@ -93,10 +231,9 @@ async def update_applicant(
 async def delete_applicant(
     applicant_id: int,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         await ApplicantService.delete_applicant(
             session=session, applicant_id=applicant_id, deleted_by=requester
         )
@@ -108,11 +245,28 @@ async def delete_applicant(
 
 @router.get("/", response_model=ApplicantPaginatedResponse)
 async def get_applicants(
+    request: Request,
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
+    sort: ApplicantSortKey = ApplicantSortKey.id,
+    descending: bool = False,
+    filters: ApplicantFilterRequest = Depends(),
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
     async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await ApplicantService.get_applicants_paginated(session, page, page_size)
+        result = await ApplicantService.get_applicants_paginated(
+            session,
+            page,
+            page_size,
+            cursor,
+            filters=filters,
+            sort=sort,
+            descending=descending,
+        )
+
+    etag = page_etag(result)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return RowsJSONResponse(result, headers={"ETag": etag})
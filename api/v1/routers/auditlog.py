@@ -1,24 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from fastapi import APIRouter, Depends
 
 from api.v1.services.auditlog import AuditLogService
-from api.v1.services.auth import check_access_token
-from api.v1.services.user import UserService
+from api.v1.services.auth import get_current_user
 from core.db import DatabaseHandler
-from core.db.models import User
+from core.request_models.auditlog import AuditLogQueryRequest
 from core.responce_models.auditlog import AuditLogResponse, AuditLogPaginatedResponse
-from deps import DatabaseMarker
+from core.utilities.audit_archive import AuditArchive
+from core.utilities.responses import RowsJSONResponse
+from core.utilities.security import CurrentUser
+from deps import DatabaseMarker, SettingsMarker
+from settings import Settings
 
 router = APIRouter(tags=["Audit Logs"])
 
-# ---------- Helper ----------
+# ---------- Query audit logs by field changes (paginated) ----------
 
 
-async def get_user_obj(user_id: int, session: AsyncSession) -> User:
-    user = await UserService.get_user(session, user_id)
-    if not user.is_active:
-        raise HTTPException(403, "User is not active")
-    return user
+@router.get("/query", response_model=AuditLogPaginatedResponse)
+async def query_audit_logs(
+    filters: AuditLogQueryRequest = Depends(),
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    db: DatabaseHandler = Depends(DatabaseMarker),
+    requester: CurrentUser = Depends(get_current_user),
+):
+    async with db.sessionmaker() as session:
+        result = await AuditLogService.query_audit_logs(
+            session=session,
+            filters=filters,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+        )
+    return RowsJSONResponse(result)
 
 
 # ---------- Get audit log by ID ----------
@@ -28,10 +45,9 @@ async def get_user_obj(user_id: int, session: AsyncSession) -> User:
 async def get_audit_log(
     audit_id: int,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
     async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
         return await AuditLogService.get_audit_log(session, audit_id)
 
 
@@ -43,11 +59,21 @@ async def list_audit_logs_by_applicant(
     applicant_id: int,
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
+    include_archived: bool = False,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    settings: Settings = Depends(SettingsMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
     async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await AuditLogService.get_applicant_audit_logs_paginated(
-            session=session, applicant_id=applicant_id, page=page, page_size=page_size
+        result = await AuditLogService.get_applicant_audit_logs_paginated(
+            session=session,
+            applicant_id=applicant_id,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            archive=(
+                AuditArchive(settings.audit_archive_dir) if include_archived else None
+            ),
         )
+    return RowsJSONResponse(result)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from fastapi.params import Depends
 from starlette.requests import Request
 from starlette.responses import JSONResponse
@@ -7,7 +7,15 @@ from api.v1.services import auth
 from core.db import DatabaseHandler
 from core.request_models.auth import SignInModel, RefreshTokenModel, SignUpModel
 from core.responce_models.defaults import DefaultResponseModel
-from deps import SettingsMarker, DatabaseMarker
+from core.utilities.rate_limit import TokenBuckets
+from core.utilities.security import RevokedTokens, SecurityEpochs
+from deps import (
+    SettingsMarker,
+    DatabaseMarker,
+    RateLimiterMarker,
+    RevokedTokensMarker,
+    SecurityEpochsMarker,
+)
 from settings import Settings
 
 router = APIRouter(tags=["Auth"])
@@ -28,14 +36,23 @@ router = APIRouter(tags=["Auth"])
                 }
             },
         },
+        429: {
+            "description": "Too Many Requests",
+            "content": {
+                "application/json": {"example": {"detail": "Too many login attempts"}}
+            },
+        },
     },
     response_model=DefaultResponseModel,
 )
 async def login(
+    request: Request,
     data: SignInModel,
     settings: Settings = Depends(SettingsMarker),
     db: DatabaseHandler = Depends(DatabaseMarker),
+    limiter: TokenBuckets = Depends(RateLimiterMarker),
 ) -> JSONResponse:
+    await auth.check_login_rate(request, data.username, settings, limiter)
     result = await auth.sign_in(data, settings.jwt_secret_key, db)
     response = JSONResponse(
         {"status": "ok", "detail": "Successfully logged in"},
@@ -94,7 +111,11 @@ async def signup(
         },
         401: {
             "description": "Unauthorized",
-            "content": {"application/json": {"example": {"detail": "Invalid token"}}},
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Refresh token reuse detected"}
+                }
+            },
         },
     },
 )
@@ -102,11 +123,18 @@ async def refresh(
     request: Request,
     settings: Settings = Depends(SettingsMarker),
     db: DatabaseHandler = Depends(DatabaseMarker),
+    epochs: SecurityEpochs = Depends(SecurityEpochsMarker),
+    revoked: RevokedTokens = Depends(RevokedTokensMarker),
 ) -> JSONResponse:
-    data = RefreshTokenModel(
-        refresh_token=request.headers.get("Authorization").split(" ")[1],
-    )
-    result = await auth.renew(data, db, settings.jwt_secret_key)
+    refresh_token = request.cookies.get("refresh_token")
+    authorization = request.headers.get("Authorization")
+    if refresh_token is None and authorization:
+        refresh_token = authorization.split(" ")[-1]
+    if not refresh_token:
+        raise HTTPException(status_code=401, detail="Token is required")
+
+    data = RefreshTokenModel(refresh_token=refresh_token)
+    result = await auth.renew(data, db, settings.jwt_secret_key, epochs, revoked)
     response = JSONResponse({"status": "ok", "detail": "success"}, status_code=200)
     response.set_cookie(
         key="access_token",
@@ -115,11 +143,25 @@ async def refresh(
         secure=settings.is_prod,
         samesite="strict",
     )
+    response.set_cookie(
+        key="refresh_token",
+        value=result.refresh_token,
+        httponly=True,
+        secure=settings.is_prod,
+        samesite="none",
+    )
     return response
 
 
 @router.post("/logout")
-async def logout() -> JSONResponse:
+async def logout(
+    request: Request,
+    settings: Settings = Depends(SettingsMarker),
+    revoked: RevokedTokens = Depends(RevokedTokensMarker),
+) -> JSONResponse:
+    await auth.sign_out(
+        request.cookies.get("refresh_token"), settings.jwt_secret_key, revoked
+    )
     response = JSONResponse(
         {"status": "ok", "detail": "Successfully logged out"}, status_code=200
     )
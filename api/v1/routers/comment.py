@@ -1,27 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from api.v1.services.auth import check_access_token
+from fastapi import APIRouter, Depends
+
+from api.v1.services.auth import get_current_user
 from api.v1.services.comment import CommentService
-from api.v1.services.user import UserService
 from core.db import DatabaseHandler
-from core.db.models import User
+from core.db.crud import unit_of_work
 from core.request_models.comment import CommentCreateRequest
 from core.responce_models.comment import CommentResponse, CommentPaginatedResponse
+from core.utilities.responses import RowsJSONResponse
+from core.utilities.security import CurrentUser
 from deps import DatabaseMarker
 
 router = APIRouter(tags=["Comments"])
 
-# ---------- Helper ----------
-
-
-async def get_user_obj(user_id: int, session: AsyncSession) -> User:
-    user = await UserService.get_user(session, user_id)
-    if not user.is_active:
-        raise HTTPException(403, "User is not active")
-    return user
-
-
 # ---------- Create comment ----------
 
 
@@ -29,14 +21,13 @@ async def get_user_obj(user_id: int, session: AsyncSession) -> User:
 async def create_comment(
     data: CommentCreateRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         return await CommentService.create_comment(
             session=session,
             applicant_id=data.applicant_id,
-            user_id=requester_id,
+            user_id=requester.id,
             text=data.text,
         )
 
@@ -48,10 +39,9 @@ async def create_comment(
 async def get_comment(
     comment_id: int,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
     async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
         return await CommentService.get_comment(session, comment_id)
 
 
@@ -62,12 +52,11 @@ async def get_comment(
 async def delete_comment(
     comment_id: int,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        user = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         await CommentService.delete_comment(
-            session=session, comment_id=comment_id, current_user=user
+            session=session, comment_id=comment_id, current_user=requester
         )
         return {"detail": "Comment deleted"}
 
@@ -80,11 +69,16 @@ async def list_comments_by_applicant(
     applicant_id: int,
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
     async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await CommentService.get_comments_paginated(
-            session=session, applicant_id=applicant_id, page=page, page_size=page_size
+        result = await CommentService.get_comments_paginated(
+            session=session,
+            applicant_id=applicant_id,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
         )
+    return RowsJSONResponse(result)
@@ -1,27 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from api.v1.services.auth import check_access_token
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+
+from api.v1.services.auth import get_current_user
 from api.v1.services.exam import ExamService
-from api.v1.services.user import UserService
 from core.db import DatabaseHandler
-from core.db.models import User, UserRole
+from core.db.crud import unit_of_work
+from core.db.models import UserRole
 from core.request_models.exam import ExamCreateRequest, ExamUpdateRequest
 from core.responce_models.exam import ExamResponse, ExamPaginatedResponse
-from deps import DatabaseMarker
+from core.utilities.catalog import CatalogCache
+from core.utilities.etag import entity_etag, etag_matches, not_modified, page_etag
+from core.utilities.responses import RowsJSONResponse
+from core.utilities.security import CurrentUser
+from deps import CatalogMarker, DatabaseMarker
 
 router = APIRouter(tags=["Exams"])
 
-# ---------- Helper ----------
-
-
-async def get_user_obj(user_id: int, session: AsyncSession) -> User:
-    user = await UserService.get_user(session, user_id)
-    if not user.is_active:
-        raise HTTPException(403, "User is not active")
-    return user
-
-
 # ---------- Create exam (Admin only) ----------
 
 
@@ -29,16 +24,19 @@ async def get_user_obj(user_id: int, session: AsyncSession) -> User:
 async def create_exam(
     data: ExamCreateRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         if requester.role != UserRole.admin:
             raise HTTPException(403, "Only admins can create exams")
 
-        return await ExamService.create_exam(
+        exam = await ExamService.create_exam(
             session=session, name=data.name, type_=data.type, min_score=data.min_score
         )
+    # Этот воркер видит изменение сразу, остальные — по NOTIFY
+    await catalog.reload()
+    return exam
 
 
 # ---------- Get exam by ID ----------
@@ -47,12 +45,18 @@ async def create_exam(
 @router.get("/{exam_id}", response_model=ExamResponse)
 async def get_exam(
     exam_id: int,
-    db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    request: Request,
+    response: Response,
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await ExamService.get_exam(session, exam_id)
+    # Версия берётся из снимка справочников, БД не нужна
+    exam = ExamService.get_cached_exam(catalog, exam_id)
+    etag = entity_etag(exam.id, exam.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return exam
 
 
 # ---------- Update exam (Admin only) ----------
@@ -63,16 +67,18 @@ async def update_exam(
     exam_id: int,
     updates: ExamUpdateRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         if requester.role != UserRole.admin:
             raise HTTPException(403, "Only admins can update exams")
 
-        return await ExamService.update_exam(
+        exam = await ExamService.update_exam(
             session=session, exam_id=exam_id, updates=updates.dict(exclude_unset=True)
         )
+    await catalog.reload()
+    return exam
 
 
 # ---------- Delete exam (Admin only) ----------
@@ -82,15 +88,16 @@ async def update_exam(
 async def delete_exam(
     exam_id: int,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         if requester.role != UserRole.admin:
             raise HTTPException(403, "Only admins can delete exams")
 
         await ExamService.delete_exam(session, exam_id)
-        return {"detail": "Exam deleted"}
+    await catalog.reload()
+    return {"detail": "Exam deleted"}
 
 
 # ---------- List exams (paginated) ----------
@@ -98,11 +105,16 @@ async def delete_exam(
 
 @router.get("/", response_model=ExamPaginatedResponse)
 async def list_exams(
+    request: Request,
     page: int = 1,
     page_size: int = 20,
-    db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    cursor: Optional[str] = None,
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await ExamService.get_exams_paginated(session, page, page_size)
+    result = ExamService.get_cached_exams_paginated(catalog, page, page_size, cursor)
+
+    etag = page_etag(result)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return RowsJSONResponse(result, headers={"ETag": etag})
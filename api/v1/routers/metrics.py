@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from api.v1.services.auth import get_current_user
+from core.db.models import UserRole
+from core.db import DatabaseHandler
+from core.utilities.audit import AuditSink
+from core.utilities.catalog import CatalogCache
+from core.utilities.notifications import NotificationListener
+from core.utilities.password import password_hasher
+from core.utilities.security import CurrentUser, RevokedTokens
+from deps import (
+    AuditSinkMarker,
+    CatalogMarker,
+    DatabaseMarker,
+    NotificationListenerMarker,
+    RevokedTokensMarker,
+)
+
+router = APIRouter(tags=["Metrics"])
+
+# ---------- Worker metrics (Admin only) ----------
+
+
+@router.get("/")
+async def get_metrics(
+    db: DatabaseHandler = Depends(DatabaseMarker),
+    audit_sink: AuditSink = Depends(AuditSinkMarker),
+    revoked_tokens: RevokedTokens = Depends(RevokedTokensMarker),
+    catalog: CatalogCache = Depends(CatalogMarker),
+    listener: NotificationListener = Depends(NotificationListenerMarker),
+    requester: CurrentUser = Depends(get_current_user),
+):
+    if requester.role != UserRole.admin:
+        raise HTTPException(403, "Only admins can view metrics")
+
+    return {
+        "db_pool": db.pool_metrics(),
+        "audit": audit_sink.metrics(),
+        "password": password_hasher.metrics(),
+        "revoked_tokens": revoked_tokens.metrics(),
+        "catalog": catalog.metrics(),
+        "notifications": listener.metrics(),
+    }
@@ -1,27 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 
-from api.v1.services.auth import check_access_token
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+
+from api.v1.services.auth import get_current_user
 from api.v1.services.speciality import SpecialtyService
-from api.v1.services.user import UserService
 from core.db import DatabaseHandler
-from core.db.models import User, UserRole
+from core.db.crud import unit_of_work
+from core.db.models import UserRole
 from core.request_models.specialty import SpecialtyCreateRequest, SpecialtyUpdateRequest
 from core.responce_models.specialty import SpecialtyResponse, SpecialtyPaginatedResponse
-from deps import DatabaseMarker
+from core.utilities.catalog import CatalogCache
+from core.utilities.etag import entity_etag, etag_matches, not_modified, page_etag
+from core.utilities.responses import RowsJSONResponse
+from core.utilities.security import CurrentUser
+from deps import CatalogMarker, DatabaseMarker
 
 router = APIRouter(tags=["Specialties"])
 
-# ---------- Helper ----------
-
-
-async def get_user_obj(user_id: int, session: AsyncSession) -> User:
-    user = await UserService.get_user(session, user_id)
-    if not user.is_active:
-        raise HTTPException(403, "User is not active")
-    return user
-
-
 # ---------- Create specialty (Admin only) ----------
 
 
@@ -29,20 +24,23 @@ async def get_user_obj(user_id: int, session: AsyncSession) -> User:
 async def create_specialty(
     data: SpecialtyCreateRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         if requester.role != UserRole.admin:
             raise HTTPException(403, "Only admins can create specialties")
 
-        return await SpecialtyService.create_specialty(
+        specialty = await SpecialtyService.create_specialty(
             session=session,
             name=data.name,
             code=data.code,
             faculty=data.faculty,
             degree_level=data.degree_level,
         )
+    # Этот воркер видит изменение сразу, остальные — по NOTIFY
+    await catalog.reload()
+    return specialty
 
 
 # ---------- Get single specialty ----------
@@ -51,12 +49,18 @@ async def create_specialty(
 @router.get("/{specialty_id}", response_model=SpecialtyResponse)
 async def get_specialty(
     specialty_id: int,
-    db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    request: Request,
+    response: Response,
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await SpecialtyService.get_specialty(session, specialty_id)
+    # Версия берётся из снимка справочников, БД не нужна
+    specialty = SpecialtyService.get_cached_specialty(catalog, specialty_id)
+    etag = entity_etag(specialty.id, specialty.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return specialty
 
 
 # ---------- Update specialty (Admin only) ----------
@@ -67,18 +71,20 @@ async def update_specialty(
     specialty_id: int,
     updates: SpecialtyUpdateRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         if requester.role != UserRole.admin:
             raise HTTPException(403, "Only admins can update specialties")
 
-        return await SpecialtyService.update_specialty(
+        specialty = await SpecialtyService.update_specialty(
             session=session,
             specialty_id=specialty_id,
             updates=updates.dict(exclude_unset=True),
         )
+    await catalog.reload()
+    return specialty
 
 
 # ---------- Delete specialty (Admin only) ----------
@@ -88,15 +94,16 @@ async def update_specialty(
 async def delete_specialty(
     specialty_id: int,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         if requester.role != UserRole.admin:
             raise HTTPException(403, "Only admins can delete specialties")
 
         await SpecialtyService.delete_specialty(session, specialty_id)
-        return {"detail": "Specialty deleted"}
+    await catalog.reload()
+    return {"detail": "Specialty deleted"}
 
 
 # ---------- List specialties with pagination ----------
@@ -104,13 +111,18 @@ async def delete_specialty(
 
 @router.get("/", response_model=SpecialtyPaginatedResponse)
 async def list_specialties(
+    request: Request,
     page: int = 1,
     page_size: int = 20,
-    db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    cursor: Optional[str] = None,
+    catalog: CatalogCache = Depends(CatalogMarker),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await SpecialtyService.get_specialties_paginated(
-            session, page, page_size
-        )
+    result = SpecialtyService.get_cached_specialties_paginated(
+        catalog, page, page_size, cursor
+    )
+
+    etag = page_etag(result)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return RowsJSONResponse(result, headers={"ETag": etag})
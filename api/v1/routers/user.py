@@ -1,28 +1,22 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.responses import JSONResponse
 
-from api.v1.services.auth import check_access_token
+from api.v1.services.auth import get_current_user
 from core.db import DatabaseHandler
-from core.db.models import User, UserRole
+from core.db.crud import unit_of_work
+from core.db.models import UserRole
 
 from api.v1.services.user import UserService
 from core.request_models.user import UserCreateRequest, UserUpdateRoleRequest
 from core.responce_models.user import UserResponse, UserPaginatedResponse
+from core.utilities.responses import RowsJSONResponse
+from core.utilities.security import CurrentUser
 from deps import DatabaseMarker
 
 router = APIRouter(tags=["Users"])
 
-# ---------- Helper для загрузки User ----------
-
-
-async def get_user_obj(user_id: int, session: AsyncSession) -> User:
-    user = await UserService.get_user(session, user_id)
-    if not user.is_active:
-        raise HTTPException(403, "User is not active")
-    return user
-
-
 # ---------- Create user ----------
 
 
@@ -30,10 +24,9 @@ async def get_user_obj(user_id: int, session: AsyncSession) -> User:
 async def create_user(
     data: UserCreateRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         if requester.role != UserRole.admin:
             raise HTTPException(403, "Only admins can create users")
 
@@ -53,10 +46,9 @@ async def create_user(
 async def get_user(
     user_id: int,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
     async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
         return await UserService.get_user(session, user_id)
 
 
@@ -67,12 +59,13 @@ async def get_user(
 async def get_users(
     page: int = 1,
     page_size: int = 20,
+    cursor: Optional[str] = None,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
     async with db.sessionmaker() as session:
-        await get_user_obj(requester_id, session)
-        return await UserService.get_users_paginated(session, page, page_size)
+        result = await UserService.get_users_paginated(session, page, page_size, cursor)
+    return RowsJSONResponse(result)
 
 
 # ---------- Update user role ----------
@@ -83,10 +76,9 @@ async def update_user_role(
     user_id: int,
     data: UserUpdateRoleRequest,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         return await UserService.update_role(session, user_id, data.new_role, requester)
 
 
@@ -97,9 +89,8 @@ async def update_user_role(
 async def deactivate_user(
     user_id: int,
     db: DatabaseHandler = Depends(DatabaseMarker),
-    requester_id: int = Depends(check_access_token),
+    requester: CurrentUser = Depends(get_current_user),
 ):
-    async with db.sessionmaker() as session:
-        requester = await get_user_obj(requester_id, session)
+    async with db.sessionmaker() as session, unit_of_work(session):
         await UserService.deactivate(session, user_id, requester)
         return {"detail": "User deactivated"}
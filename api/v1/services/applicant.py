@@ -1,24 +1,60 @@
-from typing import Optional, List
+from typing import List, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from sqlalchemy import select, or_
+from sqlalchemy import (
+    ARRAY,
+    DateTime,
+    Integer,
+    Select,
+    String,
+    any_,
+    column,
+    func,
+    literal,
+    null,
+    or_,
+    select,
+    tuple_,
+    union_all,
+    update,
+)
 from core.db.models import (
+    APPLICANT_FILTER_COLUMNS,
+    SEARCH_TS_CONFIG,
+    applicant_full_name,
+    applicant_name_tsvector,
     Applicant,
+    ApplicantSpecialty,
     ApplicantStatus,
     AuditLog,
     ChangeType,
+    Comment,
     ActionType,
-    User,
+    UserRole,
 )
 from core.db.crud import (
     create_applicant as crud_create_applicant,
     get_applicant as crud_get_applicant,
+    get_applicant_version as crud_get_applicant_version,
     update_applicant as crud_update_applicant,
     delete_applicant as crud_delete_applicant,
 )
-from core.db.crud import create_audit_log
-from datetime import date
+from core.request_models.applicant import ApplicantFilterRequest, ApplicantSortKey
+from core.utilities.audit import log_changes, set_audit_user
+from core.responce_models.applicant import ApplicantResponse
+from core.responce_models.timeline import TimelineKind
+from core.utilities.pagination import decode_cursor, encode_cursor, paginate_query
+from core.utilities.responses import response_columns
+from core.utilities.security import CurrentUser
+from datetime import date, datetime
+
+# Ключ keyset-пагинации ленты абитуриента (см. get_applicant_timeline)
+TIMELINE_KEY = (
+    column("timestamp", DateTime()),
+    column("kind", String()),
+    column("id", Integer()),
+)
 
 
 class ApplicantService:
@@ -38,25 +74,12 @@ class ApplicantService:
         gender: Optional[str],
         intake_period: Optional[str],
         status: ApplicantStatus,
-        created_by: User,  # Кто создаёт
+        created_by: CurrentUser,  # Кто создаёт
     ) -> Applicant:
 
-        # Проверка уникальности national_id/passport_number
-        if national_id or passport_number:
-            stmt = select(Applicant).where(
-                or_(
-                    Applicant.national_id == national_id,
-                    Applicant.passport_number == passport_number,
-                )
-            )
-            existing = await session.scalar(stmt)
-            if existing:
-                raise HTTPException(
-                    409,
-                    "Applicant with provided national ID or passport already exists",
-                )
-
-        applicant = await crud_create_applicant(
+        # Запись аудита создаёт flush (см. core.utilities.audit)
+        set_audit_user(session, created_by.id)
+        return await crud_create_applicant(
             session=session,
             first_name=first_name,
             last_name=last_name,
@@ -72,93 +95,276 @@ class ApplicantService:
             status=status,
         )
 
-        # Логируем создание
-        await create_audit_log(
-            session=session,
-            applicant_id=applicant.id,
-            changed_by_user_id=created_by.id,
-            change_type=ChangeType.applicant_data,
-            action=ActionType.create,
-            before_data=None,
-            after_data={"first_name": first_name, "last_name": last_name},
-        )
-
-        return applicant
-
     @staticmethod
     async def get_applicant(session: AsyncSession, applicant_id: int) -> Applicant:
         return await crud_get_applicant(session, applicant_id)
 
+    @staticmethod
+    async def get_applicant_version(
+        session: AsyncSession, applicant_id: int
+    ) -> Optional[int]:
+        return await crud_get_applicant_version(session, applicant_id)
+
     @staticmethod
     async def update_applicant(
-        session: AsyncSession, applicant_id: int, updates: dict, updated_by: User
+        session: AsyncSession,
+        applicant_id: int,
+        updates: dict,
+        updated_by: CurrentUser,
     ) -> Applicant:
 
-        applicant = await crud_get_applicant(session, applicant_id)
+        # Присваивание прежнего значения не попадает ни в UPDATE, ни в аудит:
+        # flush пишет только поля, которые действительно изменились
+        set_audit_user(session, updated_by.id)
+        return await crud_update_applicant(
+            session=session, applicant_id=applicant_id, updates=updates
+        )
 
-        # before_data для аудита
-        before = {field: getattr(applicant, field) for field in updates}
+    @staticmethod
+    async def delete_applicant(
+        session: AsyncSession, applicant_id: int, deleted_by: CurrentUser
+    ):
 
-        updated_applicant = await crud_update_applicant(
-            session=session, applicant_id=applicant_id, updates=updates
+        set_audit_user(session, deleted_by.id)
+        await crud_delete_applicant(session, applicant_id)
+
+    @staticmethod
+    def filter_applicants(stmt: Select, filters: ApplicantFilterRequest) -> Select:
+        for column in APPLICANT_FILTER_COLUMNS:
+            value = getattr(filters, column)
+            if value is not None:
+                stmt = stmt.where(getattr(Applicant, column) == value)
+
+        if filters.registered_from is not None:
+            stmt = stmt.where(Applicant.registration_date >= filters.registered_from)
+        if filters.registered_to is not None:
+            stmt = stmt.where(Applicant.registration_date < filters.registered_to)
+
+        if filters.specialty_id is not None:
+            # id = ANY(ARRAY(...)): абитуриенты специальности выбираются по
+            # индексу specialty_id заранее, а не проверкой каждой строки при
+            # проходе по индексу сортировки (для редкой специальности — весь)
+            applicant_ids = select(ApplicantSpecialty.applicant_id).where(
+                ApplicantSpecialty.specialty_id == filters.specialty_id
+            )
+            stmt = stmt.where(
+                Applicant.id
+                == any_(
+                    func.array(applicant_ids.scalar_subquery(), type_=ARRAY(Integer))
+                )
+            )
+        return stmt
+
+    @staticmethod
+    def applicant_order_by(sort: ApplicantSortKey) -> tuple:
+        if sort == ApplicantSortKey.id:
+            return (Applicant.id,)
+        return getattr(Applicant, sort.value), Applicant.id
+
+    @staticmethod
+    async def get_applicants_paginated(
+        session: AsyncSession,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        filters: Optional[ApplicantFilterRequest] = None,
+        sort: ApplicantSortKey = ApplicantSortKey.id,
+        descending: bool = False,
+    ) -> dict:
+        stmt = ApplicantService.filter_applicants(
+            select(*response_columns(Applicant, ApplicantResponse)),
+            filters or ApplicantFilterRequest(),
+        )
+        return await paginate_query(
+            session,
+            stmt,
+            order_by=ApplicantService.applicant_order_by(sort),
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            descending=descending,
         )
 
-        # after_data для аудита
-        after = {field: getattr(updated_applicant, field) for field in updates}
+    @staticmethod
+    async def search_applicants(
+        session: AsyncSession, q: str, limit: int = 20
+    ) -> dict:
+        # ILIKE по триграммным GIN-индексам + полнотекстовый поиск по ФИО,
+        # ранжирование по similarity() среди найденных кандидатов
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
 
-        await create_audit_log(
-            session=session,
-            applicant_id=applicant_id,
-            changed_by_user_id=updated_by.id,
-            change_type=ChangeType.applicant_data,
-            action=ActionType.update,
-            before_data=before,
-            after_data=after,
+        rank = func.greatest(
+            func.similarity(applicant_full_name, q),
+            func.similarity(Applicant.email, q),
+            func.similarity(Applicant.phone_number, q),
+            func.similarity(Applicant.passport_number, q),
+        )
+        stmt = (
+            select(*response_columns(Applicant, ApplicantResponse))
+            .where(
+                or_(
+                    applicant_full_name.ilike(pattern, escape="\\"),
+                    applicant_name_tsvector.op("@@")(
+                        func.plainto_tsquery(SEARCH_TS_CONFIG, q)
+                    ),
+                    Applicant.email.ilike(pattern, escape="\\"),
+                    Applicant.phone_number.ilike(pattern, escape="\\"),
+                    Applicant.passport_number.ilike(pattern, escape="\\"),
+                )
+            )
+            .order_by(rank.desc(), Applicant.id)
+            .limit(limit)
         )
 
-        return updated_applicant
+        result = await session.execute(stmt)
+        return {"items": result.all()}
 
     @staticmethod
-    async def delete_applicant(
-        session: AsyncSession, applicant_id: int, deleted_by: User
-    ):
-
-        applicant = await crud_get_applicant(session, applicant_id)
+    async def bulk_update_status(
+        session: AsyncSession,
+        status: ApplicantStatus,
+        updated_by: CurrentUser,
+        ids: Optional[List[int]] = None,
+        filters: Optional[ApplicantFilterRequest] = None,
+    ) -> dict:
+        if updated_by.role != UserRole.admin:
+            raise HTTPException(403, "Only admins can change status in bulk")
+        if not ids and (filters is None or filters.is_empty()):
+            raise HTTPException(400, "Provide applicant ids or at least one filter")
 
-        before_data = {
-            "first_name": applicant.first_name,
-            "last_name": applicant.last_name,
-        }
+        target = ApplicantStatus(status.value)
 
-        await crud_delete_applicant(session, applicant_id)
+        # Блокируем выбранные строки и запоминаем прежний статус для аудита
+        selected = ApplicantService.filter_applicants(
+            select(Applicant.id, Applicant.status), filters or ApplicantFilterRequest()
+        ).where(Applicant.status != target)
+        if ids:
+            selected = selected.where(Applicant.id.in_(ids))
+        selected = selected.with_for_update().cte("selected")
 
-        await create_audit_log(
-            session=session,
-            applicant_id=applicant_id,
-            changed_by_user_id=deleted_by.id,
-            change_type=ChangeType.applicant_data,
-            action=ActionType.delete,
-            before_data=before_data,
-            after_data=None,
+        applicants = Applicant.__table__
+        result = await session.execute(
+            update(applicants)
+            .where(applicants.c.id == selected.c.id)
+            .values(
+                status=target,
+                updated_at=datetime.utcnow(),
+                version=applicants.c.version + 1,
+            )
+            .returning(applicants.c.id, selected.c.status)
         )
+        changed = result.all()
+
+        if changed:
+            await log_changes(
+                session,
+                [
+                    {
+                        "applicant_id": applicant_id,
+                        "changed_by_user_id": updated_by.id,
+                        "change_type": ChangeType.status,
+                        "action": ActionType.update,
+                        "before_data": {"status": previous.value},
+                        "after_data": {"status": target.value},
+                    }
+                    for applicant_id, previous in changed
+                ],
+            )
+
+        return {"updated": len(changed)}
 
     @staticmethod
-    async def get_applicants_paginated(
-        session: AsyncSession, page: int = 1, page_size: int = 20
+    async def get_applicant_timeline(
+        session: AsyncSession,
+        applicant_id: int,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
     ) -> dict:
+        """
+        Комментарии и журнал изменений абитуриента одной лентой, от новых к старым.
 
-        if page < 1:
-            raise HTTPException(400, "Page number must be 1 or higher")
+        Каждая ветка UNION ALL ограничивается своим индексом
+        (applicant_id, created_at/changed_at, id) и LIMIT, внешний запрос
+        лишь сливает две короткие отсортированные выборки.
+        Ключ пагинации — (timestamp, kind, id).
+        """
+        if page_size < 1:
+            raise HTTPException(400, "Page size must be 1 or higher")
 
-        stmt = select(Applicant).offset((page - 1) * page_size).limit(page_size + 1)
+        await crud_get_applicant(session, applicant_id)
 
-        result = await session.execute(stmt)
-        users: List[User] = result.scalars().all()
+        bound = (
+            decode_cursor(cursor, TIMELINE_KEY, descending=True) if cursor else None
+        )
 
-        next_page = len(users) > page_size
+        def branch(kind: TimelineKind, ts, id_column, stmt: Select) -> Select:
+            if bound:
+                bound_ts, bound_kind, bound_id = bound
+                # kind внутри ветки постоянен, поэтому кортежное сравнение
+                # (ts, kind, id) < bound сводится к условию по (ts, id)
+                if kind.value < bound_kind:
+                    stmt = stmt.where(ts <= bound_ts)
+                elif kind.value == bound_kind:
+                    stmt = stmt.where(tuple_(ts, id_column) < tuple_(bound_ts, bound_id))
+                else:
+                    stmt = stmt.where(ts < bound_ts)
+            return stmt.order_by(ts.desc(), id_column.desc()).limit(page_size + 1)
+
+        # Ветка аудита идёт первой: по ней UNION берёт имена и типы колонок
+        # (enum, JSONB), а у комментариев на этих местах NULL
+        audit = branch(
+            TimelineKind.audit,
+            AuditLog.changed_at,
+            AuditLog.id,
+            select(
+                literal(TimelineKind.audit.value).label("kind"),
+                AuditLog.id.label("id"),
+                AuditLog.changed_at.label("timestamp"),
+                AuditLog.changed_by_user_id.label("user_id"),
+                null().label("text"),
+                AuditLog.change_type.label("change_type"),
+                AuditLog.action.label("action"),
+                AuditLog.before_data.label("before_data"),
+                AuditLog.after_data.label("after_data"),
+            ).where(AuditLog.applicant_id == applicant_id),
+        )
+        comments = branch(
+            TimelineKind.comment,
+            Comment.created_at,
+            Comment.id,
+            select(
+                literal(TimelineKind.comment.value),
+                Comment.id,
+                Comment.created_at,
+                Comment.user_id,
+                Comment.text,
+                null(),
+                null(),
+                null(),
+                null(),
+            ).where(Comment.applicant_id == applicant_id),
+        )
+
+        timeline = union_all(audit, comments).subquery("timeline")
+        stmt = (
+            select(timeline)
+            .order_by(
+                timeline.c.timestamp.desc(), timeline.c.kind.desc(), timeline.c.id.desc()
+            )
+            .limit(page_size + 1)
+        )
+        rows = (await session.execute(stmt)).mappings().all()
+
+        next_page = len(rows) > page_size
+        items = [dict(row) for row in rows[:page_size]]
+        next_cursor = None
+        if next_page:
+            last = items[-1]
+            next_cursor = encode_cursor(
+                [last["timestamp"], last["kind"], last["id"]],
+                TIMELINE_KEY,
+                descending=True,
+            )
 
-        return {
-            "page": page,
-            "next_page": next_page,
-            "items": users[:page_size],  # Возвращаем ровно page_size пользователей
-        }
+        return {"next_page": next_page, "next_cursor": next_cursor, "items": items}
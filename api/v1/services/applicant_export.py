@@ -0,0 +1,72 @@
+import csv
+import io
+from datetime import date, datetime
+from enum import Enum
+from typing import AsyncIterator, Union
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.services.applicant import ApplicantService
+from core.db.models import Applicant
+from core.request_models.applicant import ApplicantFileFormat, ApplicantFilterRequest
+from core.responce_models.applicant import ApplicantResponse
+from core.utilities.responses import response_columns
+
+EXPORT_COLUMNS = tuple(ApplicantResponse.model_fields)
+
+# Сколько строк за раз забирать из серверного курсора
+EXPORT_BATCH_SIZE = 1000
+
+
+def _to_text(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class ApplicantExportService:
+
+    @staticmethod
+    async def stream_applicants(
+        session: AsyncSession,
+        filters: ApplicantFilterRequest,
+        file_format: ApplicantFileFormat,
+    ) -> AsyncIterator[Union[str, bytes]]:
+        """
+        Выгрузка абитуриентов порциями из серверного курсора.
+
+        В память попадает не больше EXPORT_BATCH_SIZE строк, поэтому расход
+        памяти не зависит от размера таблицы.
+        """
+        stmt = ApplicantService.filter_applicants(
+            select(*response_columns(Applicant, ApplicantResponse)), filters
+        ).order_by(Applicant.id)
+
+        result = await session.stream(
+            stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+
+        if file_format == ApplicantFileFormat.csv:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+
+            async for rows in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_to_text(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield b"".join(
+                    orjson.dumps(
+                        row._asdict(),
+                        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE,
+                    )
+                    for row in rows
+                )
@@ -0,0 +1,285 @@
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, TextIO, Tuple, Union
+
+from asyncpg import DataError, PostgresError, UniqueViolationError
+from pydantic import ValidationError
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from core.db.crud import unit_of_work
+from core.db.models import ActionType, Applicant, ApplicantStatus, ChangeType
+from core.request_models.applicant import ApplicantCreateRequest, ApplicantFileFormat
+from core.utilities.audit import log_changes
+
+# Порядок колонок для COPY в таблицу applicants
+COPY_COLUMNS = (
+    "id",
+    "first_name",
+    "last_name",
+    "middle_name",
+    "phone_number",
+    "email",
+    "national_id",
+    "passport_number",
+    "citizenship",
+    "birth_date",
+    "gender",
+    "registration_date",
+    "intake_period",
+    "status",
+    "created_at",
+    "updated_at",
+)
+
+DUPLICATE_ERROR = "Applicant with provided national ID or passport already exists"
+
+# Ошибки загрузки строк: COPY идёт через asyncpg напрямую, аудит — через
+# SQLAlchemy, которая оборачивает ошибку драйвера в DBAPIError
+LOAD_ERRORS = (PostgresError, DataError, DBAPIError)
+
+RawRow = Union[str, dict]
+
+
+def iter_rows(stream: TextIO, file_format: ApplicantFileFormat) -> Iterator[RawRow]:
+    """
+    Построчное чтение файла импорта без загрузки целиком в память.
+
+    CSV отдаётся словарями (пустые ячейки -> None), JSONL — сырыми строками,
+    которые разбираются при валидации, чтобы битая строка попала в отчёт.
+    """
+    if file_format == ApplicantFileFormat.csv:
+        for row in csv.DictReader(stream):
+            yield {key: value or None for key, value in row.items()}
+    else:
+        for line in stream:
+            if line.strip():
+                yield line
+
+
+def _parse_row(raw: RawRow) -> ApplicantCreateRequest:
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+        if not isinstance(raw, dict):
+            raise ValueError("Row must be a JSON object")
+
+    data = {name: None for name in ApplicantCreateRequest.model_fields}
+    data.pop("status")
+    data.update({key: value for key, value in raw.items() if value is not None})
+    return ApplicantCreateRequest.model_validate(data)
+
+
+def _format_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, item['loc']))}: {item['msg']}"
+            for item in error.errors()
+        )
+    return str(error)
+
+
+def _load_error(error: Exception) -> str:
+    if isinstance(error, DBAPIError):
+        error = error.orig.__cause__ or error.orig
+    if getattr(error, "sqlstate", None) == UniqueViolationError.sqlstate:
+        return DUPLICATE_ERROR
+    return str(error)
+
+
+async def _copy(session: AsyncSession, records: List[tuple], audit_rows: List[dict]):
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        Applicant.__tablename__, records=records, columns=COPY_COLUMNS
+    )
+    await log_changes(session, audit_rows)
+
+
+class ApplicantImportService:
+
+    @staticmethod
+    async def import_applicants(
+        session: AsyncSession,
+        rows: Iterable[RawRow],
+        imported_by_id: int,
+        batch_size: int = 1000,
+    ) -> dict:
+        """
+        Массовый импорт абитуриентов.
+
+        Строки валидируются схемой ApplicantCreateRequest, пачками
+        проверяются на дубли national_id/passport_number (внутри файла и в БД),
+        загружаются через COPY и сопровождаются пачкой записей AuditLog.
+        Каждая пачка — отдельная транзакция.
+        """
+        report = {"imported": 0, "errors": []}
+        batch: List[Tuple[int, ApplicantCreateRequest]] = []
+        rows = iter(rows)
+        row_number = 0
+
+        while True:
+            # Файл читается блокирующе, поэтому порциями в пуле потоков
+            chunk = await run_in_threadpool(lambda: list(islice(rows, batch_size)))
+            if not chunk:
+                break
+
+            for raw in chunk:
+                row_number += 1
+                try:
+                    batch.append((row_number, _parse_row(raw)))
+                except ValueError as error:
+                    report["errors"].append(
+                        {"row": row_number, "error": _format_error(error)}
+                    )
+
+                if len(batch) >= batch_size:
+                    await ApplicantImportService._load_batch(
+                        session, batch, imported_by_id, report
+                    )
+                    batch = []
+
+        if batch:
+            await ApplicantImportService._load_batch(
+                session, batch, imported_by_id, report
+            )
+
+        return report
+
+    @staticmethod
+    async def _load_batch(
+        session: AsyncSession,
+        batch: List[Tuple[int, ApplicantCreateRequest]],
+        imported_by_id: int,
+        report: dict,
+    ):
+        national_ids = {row.national_id for _, row in batch if row.national_id}
+        passports = {row.passport_number for _, row in batch if row.passport_number}
+
+        taken_ids, taken_passports = set(), set()
+        if national_ids or passports:
+            existing = await session.execute(
+                select(Applicant.national_id, Applicant.passport_number).where(
+                    or_(
+                        Applicant.national_id.in_(national_ids),
+                        Applicant.passport_number.in_(passports),
+                    )
+                )
+            )
+            for national_id, passport_number in existing:
+                taken_ids.add(national_id)
+                taken_passports.add(passport_number)
+            taken_ids.discard(None)
+            taken_passports.discard(None)
+
+        accepted: List[Tuple[int, ApplicantCreateRequest]] = []
+        for row_number, row in batch:
+            if row.national_id in taken_ids or row.passport_number in taken_passports:
+                report["errors"].append({"row": row_number, "error": DUPLICATE_ERROR})
+                continue
+            if row.national_id:
+                taken_ids.add(row.national_id)
+            if row.passport_number:
+                taken_passports.add(row.passport_number)
+            accepted.append((row_number, row))
+
+        if not accepted:
+            await session.rollback()
+            return
+
+        # id берём из последовательности заранее: COPY не умеет RETURNING,
+        # а id нужны для записей аудита
+        ids = (
+            await session.scalars(
+                select(func.nextval("applicants_id_seq")).select_from(
+                    func.generate_series(1, len(accepted))
+                )
+            )
+        ).all()
+
+        now = datetime.utcnow()
+        records = []
+        audit_rows = []
+        for applicant_id, (_, row) in zip(ids, accepted):
+            records.append(
+                (
+                    applicant_id,
+                    row.first_name,
+                    row.last_name,
+                    row.middle_name,
+                    row.phone_number,
+                    row.email,
+                    row.national_id,
+                    row.passport_number,
+                    row.citizenship,
+                    row.birth_date,
+                    row.gender,
+                    now,
+                    row.intake_period,
+                    ApplicantStatus(row.status.value).name,
+                    now,
+                    now,
+                )
+            )
+            audit_rows.append(
+                {
+                    "applicant_id": applicant_id,
+                    "changed_by_user_id": imported_by_id,
+                    "change_type": ChangeType.applicant_data,
+                    "action": ActionType.create,
+                    "before_data": None,
+                    "after_data": {
+                        "first_name": row.first_name,
+                        "last_name": row.last_name,
+                    },
+                    "changed_at": now,
+                }
+            )
+
+        try:
+            async with unit_of_work(session):
+                await _copy(session, records, audit_rows)
+        except LOAD_ERRORS:
+            # Пачка не легла целиком: дубль появился параллельно, между
+            # проверкой и COPY, или строка нарушает ограничение БД
+            await ApplicantImportService._load_rows(
+                session,
+                [
+                    (row_number, record, audit_row)
+                    for (row_number, _), record, audit_row in zip(
+                        accepted, records, audit_rows
+                    )
+                ],
+                report,
+            )
+            return
+
+        report["imported"] += len(accepted)
+
+    @staticmethod
+    async def _load_rows(
+        session: AsyncSession,
+        rows: List[Tuple[int, tuple, dict]],
+        report: dict,
+    ):
+        """
+        Построчная загрузка пачки, каждая строка под своим SAVEPOINT:
+        в отчёт попадают только строки, которые БД действительно отвергла.
+        """
+        imported = 0
+        errors = []
+        async with unit_of_work(session):
+            for row_number, record, audit_row in rows:
+                try:
+                    async with session.begin_nested():
+                        await _copy(session, [record], [audit_row])
+                except LOAD_ERRORS as error:
+                    errors.append({"row": row_number, "error": _load_error(error)})
+                else:
+                    imported += 1
+
+        report["imported"] += imported
+        report["errors"].extend(errors)
@@ -1,13 +1,39 @@
+import json
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from core.db.models import AuditLog, ChangeType, ActionType, Applicant, User
+from core.db.models import AuditLog, ChangeType, ActionType
 from core.db.crud import (
     create_audit_log as crud_create_audit_log,
     get_audit_log as crud_get_audit_log,
 )
+from core.request_models.auditlog import AuditLogQueryRequest
+from core.responce_models.auditlog import AuditLogResponse
+from core.utilities.audit_archive import AuditArchive
+from core.utilities.pagination import decode_cursor, encode_cursor, paginate_query
+from core.utilities.responses import response_columns
+
+
+def _value(item, name: str):
+    # Элемент страницы — либо строка AuditLog, либо запись из архива
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+def _contains_value(data, field: str, value: str):
+    """
+    ``data @> {field: value}``: значение из запроса читается как JSON
+    (числа, true/false, null), а если это не JSON или поле хранит строку —
+    сравнивается как строка. ``"5"`` найдёт и ``5``, и ``"5"``.
+    """
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return data.contains({field: value})
+    if parsed == value:
+        return data.contains({field: value})
+    return or_(data.contains({field: parsed}), data.contains({field: value}))
 
 
 class AuditLogService:
@@ -23,14 +49,6 @@ class AuditLogService:
         after_data: Optional[dict],
     ) -> AuditLog:
 
-        applicant = await session.get(Applicant, applicant_id)
-        if not applicant:
-            raise HTTPException(404, "Applicant not found")
-
-        user = await session.get(User, changed_by_user_id)
-        if not user:
-            raise HTTPException(404, "User not found")
-
         return await crud_create_audit_log(
             session=session,
             applicant_id=applicant_id,
@@ -47,23 +65,127 @@ class AuditLogService:
 
     @staticmethod
     async def get_applicant_audit_logs_paginated(
-        session: AsyncSession, applicant_id: int, page: int = 1, page_size: int = 20
+        session: AsyncSession,
+        applicant_id: int,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        archive: Optional[AuditArchive] = None,
     ) -> dict:
+        """
+        Журнал абитуриента от новых записей к старым.
 
-        if page < 1:
-            raise HTTPException(400, "Page number must be 1 or higher")
+        Если передан ``archive`` и живые секции закончились, страница
+        дочитывается из архивных файлов; курсор при этом сквозной.
+        """
+        order_by = (AuditLog.changed_at, AuditLog.id)
+        result = await paginate_query(
+            session,
+            select(*response_columns(AuditLog, AuditLogResponse)).where(
+                AuditLog.applicant_id == applicant_id
+            ),
+            order_by=order_by,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            descending=True,
+        )
+        if archive is None or result["next_page"]:
+            return result
 
-        stmt = (
-            select(AuditLog)
-            .where(AuditLog.applicant_id == applicant_id)
-            .order_by(AuditLog.changed_at.desc())
-            .offset((page - 1) * page_size)
-            .limit(page_size + 1)
+        items = result["items"]
+        if items:
+            before = (items[-1].changed_at, items[-1].id)
+        elif cursor:
+            before = decode_cursor(cursor, order_by, descending=True)
+        elif page > 1:
+            # Без курсора смещение в архиве неизвестно
+            return result
+        else:
+            before = None
+
+        remaining = page_size - len(items)
+        archived = await archive.applicant_entries(
+            applicant_id, limit=remaining + 1, before=before
         )
+        items = items + archived[:remaining]
+        next_page = len(archived) > remaining
+        return {
+            "page": page,
+            "next_page": next_page,
+            "next_cursor": (
+                encode_cursor(
+                    [_value(items[-1], "changed_at"), _value(items[-1], "id")],
+                    order_by,
+                    descending=True,
+                )
+                if next_page
+                else None
+            ),
+            "items": items,
+        }
+
+    @staticmethod
+    async def query_audit_logs(
+        session: AsyncSession,
+        filters: AuditLogQueryRequest,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """
+        Выборка по всему журналу: кто, когда и как менял поле.
+
+        Условия по полю и значениям — операторы ``?`` и ``@>`` по JSONB,
+        которые обслуживаются GIN-индексами before_data/after_data.
+        """
+        if (filters.old_value is not None or filters.new_value is not None) and (
+            filters.field is None
+        ):
+            raise HTTPException(400, "old_value and new_value require field")
 
-        result = await session.execute(stmt)
-        logs = result.scalars().all()
+        stmt = select(*response_columns(AuditLog, AuditLogResponse))
 
-        next_page = len(logs) > page_size
+        if filters.old_value is not None:
+            stmt = stmt.where(
+                _contains_value(AuditLog.before_data, filters.field, filters.old_value)
+            )
+        if filters.new_value is not None:
+            stmt = stmt.where(
+                _contains_value(AuditLog.after_data, filters.field, filters.new_value)
+            )
+        if (
+            filters.field is not None
+            and filters.old_value is None
+            and filters.new_value is None
+        ):
+            stmt = stmt.where(
+                or_(
+                    AuditLog.before_data.has_key(filters.field),
+                    AuditLog.after_data.has_key(filters.field),
+                )
+            )
 
-        return {"page": page, "next_page": next_page, "items": logs[:page_size]}
+        if filters.change_type is not None:
+            stmt = stmt.where(AuditLog.change_type == filters.change_type)
+        if filters.action is not None:
+            stmt = stmt.where(AuditLog.action == filters.action)
+        if filters.applicant_id is not None:
+            stmt = stmt.where(AuditLog.applicant_id == filters.applicant_id)
+        if filters.changed_by_user_id is not None:
+            stmt = stmt.where(AuditLog.changed_by_user_id == filters.changed_by_user_id)
+        # Диапазон по changed_at ещё и отсекает лишние секции
+        if filters.changed_from is not None:
+            stmt = stmt.where(AuditLog.changed_at >= filters.changed_from)
+        if filters.changed_to is not None:
+            stmt = stmt.where(AuditLog.changed_at < filters.changed_to)
+
+        return await paginate_query(
+            session,
+            stmt,
+            order_by=(AuditLog.changed_at, AuditLog.id),
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            descending=True,
+        )
@@ -1,3 +1,4 @@
+import math
 from datetime import timedelta, datetime, timezone
 from typing import Dict, Any
 from uuid import uuid4
@@ -5,22 +6,37 @@ from uuid import uuid4
 import jwt
 from fastapi import Depends, HTTPException
 from jwt import InvalidTokenError
-from passlib.handlers.argon2 import argon2
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.dialects.postgresql import insert
 from starlette.requests import Request
 
 from core.db import DatabaseHandler
-from core.db.models import User
+from core.db.models import User, UserRole
 from core.request_models.auth import RefreshTokenModel, SignInModel, SignUpModel
 from core.responce_models.auth import (
     RefreshTokenResponseModel,
     SignInResponseModel,
     SignUpResponseModel,
 )
-from deps import SettingsMarker
+from core.utilities.password import password_hasher
+from core.utilities.rate_limit import RateLimit, TokenBuckets, client_ip
+from core.utilities.security import (
+    CurrentUser,
+    RevokedTokens,
+    SecurityEpochs,
+    family_key,
+    grace_key,
+    jti_key,
+)
+from deps import RevokedTokensMarker, SecurityEpochsMarker, SettingsMarker
 from settings import Settings
 
+ACCESS_TTL = timedelta(minutes=15)
+REFRESH_TTL = timedelta(days=30)
+# Сколько после обмена refresh-токен можно обменять ещё один раз: две вкладки
+# или повтор после 401 не должны выглядеть как утечка токена
+REUSE_GRACE = timedelta(seconds=10)
+
 
 async def sign_token(
     jwt_type: str,
@@ -68,21 +84,54 @@ async def encode_password(password: str, jwt_secret: str) -> str:
     return jwt.encode({"password": password}, key=jwt_secret, algorithm="HS256")
 
 
-async def check_access_token(
-    request: Request,
-    settings: Settings = Depends(SettingsMarker),
-) -> int | None:
+def access_claims(user: User) -> Dict[str, Any]:
     """
-    Функция для проверки токена
+    Функция для формирования полезной нагрузки access-токена
 
-    Эта функция проверяет валидность токена доступа, переданного в заголовке авторизации.
+    Роль и эпоха безопасности кладутся в токен, чтобы проверка запроса
+    обходилась без чтения пользователя из базы данных.
 
-    :param request: Заголовок авторизации, содержащий токен доступа.
-    :param settings: Объект настроек, содержащий секретный ключ для декодирования токена.
-    :return: Идентификатор пользователя, если токен валиден.
-    :raises HTTPException: Если токен отсутствует, имеет неверный формат или недействителен.
+    :param user: Пользователь, для которого выпускается токен.
+    :return: Дополнительные поля access-токена.
     """
+    return {"role": user.role.value, "epoch": user.security_epoch}
+
 
+async def issue_tokens(
+    user_id: int, claims: Dict[str, Any], family: str, jwt_secret: str
+) -> SignInResponseModel:
+    """
+    Функция для выпуска пары токенов
+
+    Оба токена несут идентификатор семейства ротации (``fam``): при выходе
+    или повторном предъявлении refresh-токена отзывается всё семейство.
+    Refresh-токен дополнительно несёт роль и эпоху, чтобы обновление
+    обходилось без чтения пользователя из базы данных.
+
+    :param user_id: Идентификатор пользователя.
+    :param claims: Роль и эпоха безопасности пользователя (см. access_claims).
+    :param family: Идентификатор семейства ротации refresh-токенов.
+    :param jwt_secret: Секретный ключ, используемый для подписи токенов.
+    :return: Объект SignInResponseModel с токенами доступа и обновления.
+    """
+    access = await sign_token(
+        "access",
+        str(user_id),
+        jwt_secret,
+        payload={**claims, "fam": family},
+        ttl=ACCESS_TTL,
+    )
+    refresh = await sign_token(
+        "refresh",
+        str(user_id),
+        jwt_secret,
+        payload={**claims, "fam": family},
+        ttl=REFRESH_TTL,
+    )
+    return SignInResponseModel(access_token=access, refresh_token=refresh)
+
+
+def _decode_access_token(request: Request, settings: Settings) -> Dict[str, Any]:
     if request.cookies.get("access_token") is None:
         raise HTTPException(status_code=401, detail="Token is required")
 
@@ -94,6 +143,24 @@ async def check_access_token(
         )
     except InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+async def check_access_token(
+    request: Request,
+    settings: Settings = Depends(SettingsMarker),
+) -> int | None:
+    """
+    Функция для проверки токена
+
+    Эта функция проверяет валидность токена доступа, переданного в заголовке авторизации.
+
+    :param request: Заголовок авторизации, содержащий токен доступа.
+    :param settings: Объект настроек, содержащий секретный ключ для декодирования токена.
+    :return: Идентификатор пользователя, если токен валиден.
+    :raises HTTPException: Если токен отсутствует, имеет неверный формат или недействителен.
+    """
+    payload = _decode_access_token(request, settings)
     user_id = payload.get("sub")
 
     if not user_id:
@@ -102,35 +169,187 @@ async def check_access_token(
     return user_id
 
 
+async def get_current_user(
+    request: Request,
+    settings: Settings = Depends(SettingsMarker),
+    epochs: SecurityEpochs = Depends(SecurityEpochsMarker),
+    revoked: RevokedTokens = Depends(RevokedTokensMarker),
+) -> CurrentUser:
+    """
+    Функция для получения пользователя запроса
+
+    Эта функция собирает пользователя из access-токена без запроса к базе данных.
+    Токен отклоняется, если его эпоха безопасности устарела: роль пользователя
+    сменилась или он был деактивирован после выпуска токена, — или если его
+    семейство отозвано (выход, повторное предъявление refresh-токена).
+
+    :param request: Запрос с cookie access_token.
+    :param settings: Объект настроек, содержащий секретный ключ для декодирования токена.
+    :param epochs: Таблица актуальных эпох безопасности пользователей.
+    :param revoked: Реестр отозванных токенов с фильтром Блума в памяти.
+    :return: Объект CurrentUser с идентификатором, ролью и эпохой пользователя.
+    :raises HTTPException: Если токен недействителен или отозван.
+    """
+    payload = _decode_access_token(request, settings)
+    try:
+        user = CurrentUser(
+            id=int(payload["sub"]),
+            role=UserRole(payload["role"]),
+            security_epoch=int(payload["epoch"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if not epochs.is_current(user.id, user.security_epoch):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    family = payload.get("fam")
+    if family and await revoked.is_revoked(family_key(family)):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    return user
+
+
 async def renew(
-    data: RefreshTokenModel, db: DatabaseHandler, jwt_secret: str
+    data: RefreshTokenModel,
+    db: DatabaseHandler,
+    jwt_secret: str,
+    epochs: SecurityEpochs,
+    revoked: RevokedTokens,
 ) -> RefreshTokenResponseModel:
     """
     Функция для обновления токена
 
-    Эта функция обрабатывает процесс обновления токена. Она проверяет действительность
-    токена обновления и генерирует новый токен доступа, если токен обновления действителен.
+    Эта функция обрабатывает процесс обновления токена с ротацией: предъявленный
+    refresh-токен отзывается по jti, а взамен выпускается новая пара токенов
+    того же семейства. Повторное предъявление уже обменянного токена означает
+    его утечку — тогда отзывается всё семейство. Исключение — один повторный
+    обмен в пределах REUSE_GRACE после первого (параллельные запросы).
+
+    Проверка отзыва и повторного предъявления идёт по фильтру Блума в памяти,
+    роль и эпоха берутся из токена: обычное обновление обходится без запросов
+    к базе данных. База читается при срабатывании фильтра и если эпоха
+    безопасности пользователя сменилась; использованный jti пишется фоном.
 
-    :param db: Объект DatabaseHandler для взаимодействия с базой данных.
     :param data: Объект RefreshTokenModel, содержащий токен обновления, предоставленный пользователем.
+    :param db: Объект DatabaseHandler для взаимодействия с базой данных.
     :param jwt_secret: Секретный ключ, используемый для кодирования JWT токенов.
-    :return: Объект RefreshTokenResponseModel, содержащий новый токен доступа и старый токен обновления.
-    :raises HTTPException: Если токен обновления недействителен или пользователь не найден.
+    :param epochs: Таблица актуальных эпох безопасности пользователей.
+    :param revoked: Реестр отозванных токенов с фильтром Блума в памяти.
+    :return: Объект RefreshTokenResponseModel, содержащий новые токены доступа и обновления.
+    :raises HTTPException: Если токен обновления недействителен, отозван или пользователь не найден.
     """
-    user_id = jwt.decode(
-        jwt=data.refresh_token, key=jwt_secret, algorithms=["HS256"]
-    ).get("sub")
-    async with db.sessionmaker() as session:
-        query = select(User).where(User.id == user_id)
-        result = await session.execute(query)
-        exists = result.scalars().first()
-
-    if not exists:
+    try:
+        payload = jwt.decode(
+            jwt=data.refresh_token, key=jwt_secret, algorithms=["HS256"]
+        )
+        user_id = int(payload["sub"])
+        family = payload["fam"]
+        claims = {"role": payload["role"], "epoch": int(payload["epoch"])}
+    except (InvalidTokenError, KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") != "refresh":
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    access = await sign_token("access", user_id, jwt_secret, ttl=timedelta(minutes=15))
+    if await revoked.is_revoked(family_key(family)):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    if not epochs.is_current(user_id, claims["epoch"]):
+        # Роль сменилась или пользователь деактивирован — перечитываем
+        async with db.sessionmaker() as session:
+            user = await session.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if not user.is_active:
+            raise HTTPException(status_code=403, detail="User is not active")
+        claims = access_claims(user)
+
+    expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc).replace(
+        tzinfo=None
+    )
+    used_at = await revoked.mark_used(jti_key(payload["jti"]), expires_at)
+    if used_at is not None and (
+        datetime.utcnow() - used_at > REUSE_GRACE
+        or await revoked.mark_used(grace_key(payload["jti"]), expires_at) is not None
+    ):
+        await revoked.revoke(family_key(family), datetime.utcnow() + REFRESH_TTL)
+        raise HTTPException(status_code=401, detail="Refresh token reuse detected")
+
+    tokens = await issue_tokens(user_id, claims, family, jwt_secret)
+    return RefreshTokenResponseModel(
+        access_token=tokens.access_token, refresh_token=tokens.refresh_token
+    )
 
-    return RefreshTokenResponseModel(access_token=access)
+
+async def sign_out(refresh_token: str | None, jwt_secret: str, revoked: RevokedTokens):
+    """
+    Функция для выхода
+
+    Эта функция отзывает семейство refresh-токена: ни он, ни выпущенные
+    из него токены доступа больше не принимаются.
+
+    :param refresh_token: Токен обновления из cookie, если он есть.
+    :param jwt_secret: Секретный ключ, используемый для декодирования JWT токенов.
+    :param revoked: Реестр отозванных токенов.
+    """
+    if not refresh_token:
+        return
+    try:
+        payload = jwt.decode(jwt=refresh_token, key=jwt_secret, algorithms=["HS256"])
+    except InvalidTokenError:
+        # Просроченный или чужой токен отзывать незачем
+        return
+    family = payload.get("fam")
+    if payload.get("type") == "refresh" and family:
+        await revoked.revoke(family_key(family), datetime.utcnow() + REFRESH_TTL)
+
+
+async def check_login_rate(
+    request: Request,
+    username: str,
+    settings: Settings,
+    limiter: TokenBuckets,
+):
+    """
+    Функция для ограничения частоты попыток входа
+
+    Эта функция снимает по токену с bucket'ов имени пользователя и IP клиента
+    до любых обращений к базе данных и хэширования пароля.
+
+    :param request: Запрос, из которого берётся IP клиента (за доверенным
+        прокси — из X-Forwarded-For).
+    :param username: Имя пользователя из формы входа.
+    :param settings: Объект настроек с лимитами попыток входа.
+    :param limiter: Хранилище token bucket'ов (в памяти или в Postgres).
+    :raises HTTPException: 429 с заголовком Retry-After, если лимит исчерпан.
+    """
+    ip = client_ip(
+        request.client.host if request.client else None,
+        request.headers.get("x-forwarded-for"),
+        settings.trusted_proxies,
+    )
+    retry_after = await limiter.take(
+        [
+            (
+                f"login:user:{username.lower()}",
+                RateLimit.per_minute(
+                    settings.login_limit_per_username, settings.login_refill_per_minute
+                ),
+            ),
+            (
+                f"login:ip:{ip}",
+                RateLimit.per_minute(
+                    settings.login_limit_per_ip, settings.login_refill_per_minute
+                ),
+            ),
+        ]
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
 
 
 async def sign_in(
@@ -156,18 +375,29 @@ async def sign_in(
             raise HTTPException(status_code=401, detail="Invalid username or password")
         if not user.is_active:
             raise HTTPException(status_code=403, detail="User is not active")
-        decoded_password = argon2.verify(data.password, user.password_hash)
-        if not decoded_password:
-            raise HTTPException(status_code=401, detail="Invalid username or password")
 
-        user_id = user.id
-    if not user_id:
+    # Соединение уже возвращено в пул: проверка пароля идёт в пуле потоков
+    # и не должна держать соединение с базой
+    decoded_password = await password_hasher.verify(data.password, user.password_hash)
+    if not decoded_password:
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
-    access = await sign_token("access", user_id, jwt_secret, ttl=timedelta(minutes=15))
-    refresh = await sign_token("refresh", user_id, jwt_secret, ttl=timedelta(days=30))
+    # Хэш со старыми (более слабыми) параметрами argon2 обновляем при входе
+    if password_hasher.needs_update(user.password_hash):
+        password_hash = await password_hasher.hash(data.password)
+        async with db.sessionmaker() as session:
+            await session.execute(
+                update(User)
+                .where(User.id == user.id)
+                .values(password_hash=password_hash)
+            )
+            await session.commit()
 
-    return SignInResponseModel(access_token=access, refresh_token=refresh)
+    user_id = user.id
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+
+    return await issue_tokens(user_id, access_claims(user), str(uuid4()), jwt_secret)
 
 
 async def sign_up(data: SignUpModel, jwt_secret: str, db: DatabaseHandler):
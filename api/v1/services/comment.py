@@ -1,12 +1,19 @@
+from typing import Optional
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from core.db.models import Comment, Applicant, User, UserRole
+from core.db.models import Comment, UserRole
 from core.db.crud import (
     create_comment as crud_create_comment,
     get_comment as crud_get_comment,
     delete_comment as crud_delete_comment,
 )
+from core.responce_models.comment import CommentResponse
+from core.utilities.audit import set_audit_user
+from core.utilities.pagination import paginate_query
+from core.utilities.responses import response_columns
+from core.utilities.security import CurrentUser
 
 
 class CommentService:
@@ -16,14 +23,7 @@ class CommentService:
         session: AsyncSession, applicant_id: int, user_id: int, text: str
     ) -> Comment:
 
-        applicant = await session.get(Applicant, applicant_id)
-        if not applicant:
-            raise HTTPException(404, "Applicant not found")
-
-        user = await session.get(User, user_id)
-        if not user:
-            raise HTTPException(404, "User not found")
-
+        set_audit_user(session, user_id)
         return await crud_create_comment(
             session=session, applicant_id=applicant_id, user_id=user_id, text=text
         )
@@ -34,7 +34,7 @@ class CommentService:
 
     @staticmethod
     async def delete_comment(
-        session: AsyncSession, comment_id: int, current_user: User
+        session: AsyncSession, comment_id: int, current_user: CurrentUser
     ):
         comment = await crud_get_comment(session, comment_id)
 
@@ -43,27 +43,24 @@ class CommentService:
                 403, "Only the comment author or admins can delete this comment"
             )
 
+        set_audit_user(session, current_user.id)
         await crud_delete_comment(session, comment_id)
 
     @staticmethod
     async def get_comments_paginated(
-        session: AsyncSession, applicant_id: int, page: int = 1, page_size: int = 20
+        session: AsyncSession,
+        applicant_id: int,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
     ) -> dict:
-
-        if page < 1:
-            raise HTTPException(400, "Page number must be 1 or higher")
-
-        stmt = (
-            select(Comment)
-            .where(Comment.applicant_id == applicant_id)
-            .order_by(Comment.created_at.asc())
-            .offset((page - 1) * page_size)
-            .limit(page_size + 1)
+        return await paginate_query(
+            session,
+            select(*response_columns(Comment, CommentResponse)).where(
+                Comment.applicant_id == applicant_id
+            ),
+            order_by=(Comment.created_at, Comment.id),
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
         )
-
-        result = await session.execute(stmt)
-        comments = result.scalars().all()
-
-        next_page = len(comments) > page_size
-
-        return {"page": page, "next_page": next_page, "items": comments[:page_size]}
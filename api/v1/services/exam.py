@@ -10,6 +10,9 @@ from core.db.crud import (
     update_exam as crud_update_exam,
     delete_exam as crud_delete_exam,
 )
+from core.responce_models.exam import ExamResponse
+from core.utilities.catalog import CatalogCache
+from core.utilities.pagination import paginate_items, paginate_query
 
 
 class ExamService:
@@ -22,12 +25,6 @@ class ExamService:
         min_score: Optional[int] = None,
     ) -> Exam:
 
-        existing = await session.scalar(
-            select(Exam).where((Exam.name == name) & (Exam.type == type_))
-        )
-        if existing:
-            raise HTTPException(409, "Exam with this name and type already exists")
-
         return await crud_create_exam(
             session=session, name=name, type_=type_, min_score=min_score
         )
@@ -36,6 +33,10 @@ class ExamService:
     async def get_exam(session: AsyncSession, exam_id: int) -> Exam:
         return await crud_get_exam(session, exam_id)
 
+    @staticmethod
+    def get_cached_exam(catalog: CatalogCache, exam_id: int) -> ExamResponse:
+        return catalog.snapshot.exam(exam_id)
+
     @staticmethod
     async def update_exam(session: AsyncSession, exam_id: int, updates: dict) -> Exam:
 
@@ -53,16 +54,31 @@ class ExamService:
 
     @staticmethod
     async def get_exams_paginated(
-        session: AsyncSession, page: int = 1, page_size: int = 20
+        session: AsyncSession,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
     ) -> dict:
+        return await paginate_query(
+            session,
+            select(Exam),
+            order_by=(Exam.id,),
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+        )
 
-        if page < 1:
-            raise HTTPException(400, "Page number must be 1 or higher")
-
-        stmt = select(Exam).offset((page - 1) * page_size).limit(page_size + 1)
-        result = await session.execute(stmt)
-        exams = result.scalars().all()
-
-        next_page = len(exams) > page_size
-
-        return {"page": page, "next_page": next_page, "items": exams[:page_size]}
+    @staticmethod
+    def get_cached_exams_paginated(
+        catalog: CatalogCache,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        return paginate_items(
+            catalog.snapshot.exams,
+            order_by=(Exam.id,),
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+        )
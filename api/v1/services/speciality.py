@@ -10,6 +10,9 @@ from core.db.crud import (
     update_specialty as crud_update_specialty,
     delete_specialty as crud_delete_specialty,
 )
+from core.responce_models.specialty import SpecialtyResponse
+from core.utilities.catalog import CatalogCache
+from core.utilities.pagination import paginate_items, paginate_query
 
 
 class SpecialtyService:
@@ -23,12 +26,6 @@ class SpecialtyService:
         degree_level: Optional[str],
     ) -> Specialty:
 
-        existing = await session.scalar(
-            select(Specialty).where((Specialty.name == name) | (Specialty.code == code))
-        )
-        if existing:
-            raise HTTPException(409, "Specialty with this name or code already exists")
-
         return await crud_create_specialty(
             session=session,
             name=name,
@@ -41,6 +38,12 @@ class SpecialtyService:
     async def get_specialty(session: AsyncSession, specialty_id: int) -> Specialty:
         return await crud_get_specialty(session, specialty_id)
 
+    @staticmethod
+    def get_cached_specialty(
+        catalog: CatalogCache, specialty_id: int
+    ) -> SpecialtyResponse:
+        return catalog.snapshot.specialty(specialty_id)
+
     @staticmethod
     async def update_specialty(
         session: AsyncSession, specialty_id: int, updates: dict
@@ -62,16 +65,31 @@ class SpecialtyService:
 
     @staticmethod
     async def get_specialties_paginated(
-        session: AsyncSession, page: int = 1, page_size: int = 20
+        session: AsyncSession,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
     ) -> dict:
+        return await paginate_query(
+            session,
+            select(Specialty),
+            order_by=(Specialty.id,),
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+        )
 
-        if page < 1:
-            raise HTTPException(400, "Page number must be 1 or higher")
-
-        stmt = select(Specialty).offset((page - 1) * page_size).limit(page_size + 1)
-        result = await session.execute(stmt)
-        specialties = result.scalars().all()
-
-        next_page = len(specialties) > page_size
-
-        return {"page": page, "next_page": next_page, "items": specialties[:page_size]}
+    @staticmethod
+    def get_cached_specialties_paginated(
+        catalog: CatalogCache,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        return paginate_items(
+            catalog.snapshot.specialties,
+            order_by=(Specialty.id,),
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+        )
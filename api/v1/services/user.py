@@ -1,9 +1,8 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
-from passlib.hash import argon2
 from core.db.crud import (
     create_user as crud_create_user,
     get_user as crud_get_user,
@@ -12,7 +11,11 @@ from core.db.crud import (
 )
 
 from core.db.models import UserRole, User
-from core.responce_models.user import UserResponse, UserPaginatedResponse
+from core.responce_models.user import UserResponse
+from core.utilities.pagination import paginate_query
+from core.utilities.responses import response_columns
+from core.utilities.password import password_hasher
+from core.utilities.security import CurrentUser
 
 
 class UserService:
@@ -31,34 +34,34 @@ class UserService:
 
     @staticmethod
     async def update_role(
-        session: AsyncSession, user_id: int, new_role: UserRole, current_user: User
+        session: AsyncSession,
+        user_id: int,
+        new_role: UserRole,
+        current_user: CurrentUser,
     ) -> User:
         if current_user.role != UserRole.admin:
             raise HTTPException(403, "Only admins can change user roles")
         return await crud_update_user_role(session, user_id, new_role, current_user)
 
     @staticmethod
-    async def deactivate(session: AsyncSession, user_id: int, current_user: User):
+    async def deactivate(
+        session: AsyncSession, user_id: int, current_user: CurrentUser
+    ):
         return await crud_deactivate_user(session, user_id, current_user)
 
     @staticmethod
     async def verify_password(user: User, password: str) -> bool:
-        return argon2.verify(password, user.password_hash)
+        return await password_hasher.verify(password, user.password_hash)
 
     @staticmethod
     async def get_users_paginated(
-        session: AsyncSession, page: int, page_size: int
-    ) -> UserPaginatedResponse:
-        next_page = False
-        offset = (page - 1) * page_size
-        query = select(User).offset(offset).limit(page_size + 1)
-        result = await session.execute(query)
-        users = result.scalars().all()
-        if len(users) > page_size:
-            next_page = True
-            users = users[:-1]
-        return UserPaginatedResponse(
-            items=[UserResponse(**user.__dict__) for user in users],
-            next_page=next_page,
+        session: AsyncSession, page: int, page_size: int, cursor: Optional[str] = None
+    ) -> dict:
+        return await paginate_query(
+            session,
+            select(*response_columns(User, UserResponse)),
+            order_by=(User.id,),
             page=page,
+            page_size=page_size,
+            cursor=cursor,
         )
@@ -1,22 +1,107 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from typing import Sequence
 
-from core.db.models import Base
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from core.db.migrations import migrate
+from core.db.pool import InstrumentedPool
+from core.db.replicas import ReplicaSet, RoutingSession
+from core.db.warmup import warmup
 
 
 class DatabaseHandler:
-    def __init__(self, url: str):
+    """
+    Подключение к primary и (необязательно) к репликам для чтения.
+
+    ``sessionmaker`` — основной: SELECT уходят на реплику, только если это
+    разрешено контекстом запроса (см. core.utilities.read_routing), всё
+    остальное — на primary. ``writer`` всегда работает с primary,
+    ``reader`` читает с реплики, пока есть годная.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        statement_cache_size: int = 100,
+        replica_urls: Sequence[str] = (),
+        replica_max_lag: float = 5.0,
+        replica_poll_interval: float = 1.0,
+    ):
         self.url = url
-        self.engine = create_async_engine(
-            self.url,
+        self.pool_size = pool_size
+        self.engine_options = dict(
             echo=False,
+            poolclass=InstrumentedPool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            # Кэш подготовленных выражений asyncpg на каждое соединение
+            connect_args={"prepared_statement_cache_size": statement_cache_size},
         )
+        self.engine = self._create_engine(self.url)
+
+        self.replicas = (
+            ReplicaSet(
+                self.engine,
+                [self._create_engine(replica_url) for replica_url in replica_urls],
+                max_lag=replica_max_lag,
+                poll_interval=replica_poll_interval,
+            )
+            if replica_urls
+            else None
+        )
+        session_options = dict(autoflush=False, autocommit=False, expire_on_commit=False)
         self.sessionmaker = async_sessionmaker(
-            self.engine, autoflush=False, autocommit=False
+            self.engine,
+            sync_session_class=self._routing_session(always_replica=False),
+            **session_options,
+        )
+        self.reader = async_sessionmaker(
+            self.engine,
+            sync_session_class=self._routing_session(always_replica=True),
+            **session_options,
         )
+        self.writer = async_sessionmaker(self.engine, **session_options)
+
+    def _create_engine(self, url: str) -> AsyncEngine:
+        return create_async_engine(url, **self.engine_options)
+
+    def _routing_session(self, always_replica: bool) -> type:
+        return type(
+            "RoutingSession",
+            (RoutingSession,),
+            {"replicas": self.replicas, "always_replica": always_replica},
+        )
+
+    def configure_sessions(self, **kwargs):
+        for maker in (self.sessionmaker, self.reader, self.writer):
+            maker.configure(**kwargs)
+
+    async def init(self, audit_partitions_ahead: int = 3):
+        """
+        Подготовка воркера к приёму запросов: миграции (их применяет один
+        воркер под advisory lock), затем прогрев пулов primary и реплик.
+        """
+        await migrate(self.engine, audit_partitions_ahead=audit_partitions_ahead)
+        await warmup(self.engine, self.pool_size)
+        if self.replicas is not None:
+            await self.replicas.start()
+            for engine in self.replicas.healthy():
+                await warmup(engine, self.pool_size)
 
-    async def init(self):
-        async with self.engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+    def pool_metrics(self) -> dict:
+        metrics = self.engine.pool.metrics()
+        if self.replicas is not None:
+            metrics["read_replicas"] = self.replicas.metrics()
+        return metrics
 
     async def close_connection(self):
+        if self.replicas is not None:
+            await self.replicas.stop()
         await self.engine.dispose()
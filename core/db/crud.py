@@ -1,16 +1,20 @@
+from contextlib import asynccontextmanager
 from datetime import date
-from typing import Optional
+from typing import AsyncIterator, List, Optional
 
-from sqlalchemy import select, or_
-from passlib.hash import argon2
+from sqlalchemy import String, cast, exists, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
 from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
 from core.db.models import (
     User,
     UserRole,
     ApplicantStatus,
     Applicant,
+    ApplicantSpecialty,
     Specialty,
     ExamType,
     Exam,
@@ -18,7 +22,131 @@ from core.db.models import (
     ChangeType,
     ActionType,
     AuditLog,
+    AuditOutbox,
+    CatalogVersion,
 )
+from core.utilities.catalog import CATALOG_CHANNEL
+from core.utilities.password import password_hasher
+from core.utilities.security import SECURITY_EPOCH_CHANNEL, CurrentUser
+
+
+# ---------- Unit of work ----------
+
+
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    Одна транзакция на весь блок.
+
+    Внутри блока crud-функции только делают ``flush()`` (id и значения по
+    умолчанию приходят через ``INSERT ... RETURNING``), а единственный
+    ``commit()`` выполняется при выходе. При исключении транзакция
+    откатывается целиком.
+    """
+    session.info["unit_of_work"] = True
+    try:
+        yield session
+        await session.commit()
+    except BaseException:
+        await session.rollback()
+        raise
+    finally:
+        session.info.pop("unit_of_work", None)
+
+
+# Уникальность проверяет сама БД: имя нарушенного ограничения -> ответ 409
+UNIQUE_VIOLATIONS = {
+    "ix_users_username": "Username already exists",
+    "uq_applicants_national_id": (
+        "Applicant with provided national ID or passport already exists"
+    ),
+    "uq_applicants_passport_number": (
+        "Applicant with provided national ID or passport already exists"
+    ),
+    "uq_specialties_name": "Specialty with this name or code already exists",
+    "uq_specialties_code": "Specialty with this name or code already exists",
+    "uq_exams_name_type": "Exam with this name and type already exists",
+}
+
+# Ссылки проверяет сам FK, без предварительных SELECT
+FOREIGN_KEY_VIOLATIONS = {
+    "comments_applicant_id_fkey": "Applicant not found",
+    "comments_user_id_fkey": "User not found",
+    "audit_log_changed_by_user_id_fkey": "User not found",
+}
+
+
+def _constraint_name(error: IntegrityError) -> Optional[str]:
+    # asyncpg-исключение лежит в __cause__ у DBAPI-обёртки SQLAlchemy
+    cause = getattr(error.orig, "__cause__", None)
+    return getattr(cause, "constraint_name", None)
+
+
+def integrity_error_to_http(error: IntegrityError) -> HTTPException:
+    detail = UNIQUE_VIOLATIONS.get(_constraint_name(error))
+    if detail:
+        return HTTPException(409, detail)
+    detail = FOREIGN_KEY_VIOLATIONS.get(_constraint_name(error))
+    if detail:
+        return HTTPException(404, detail)
+    return HTTPException(500, "Database error occurred")
+
+
+async def _save(session: AsyncSession):
+    try:
+        if session.info.get("unit_of_work"):
+            await session.flush()
+        else:
+            await session.commit()
+    except IntegrityError as error:
+        await session.rollback()
+        raise integrity_error_to_http(error)
+    except StaleDataError:
+        # Строку изменили параллельно: версия в UPDATE ... WHERE не совпала
+        await session.rollback()
+        raise HTTPException(409, "Resource was modified concurrently")
+
+
+async def _bump_security_epoch(session: AsyncSession, user: User):
+    # Старые access-токены пользователя перестают приниматься; NOTIFY
+    # доставляется воркерам только после commit этой же транзакции.
+    # Инкремент в самом UPDATE: параллельные смены не теряют ни одного шага
+    bumped = (
+        update(User)
+        .where(User.id == user.id)
+        .values(security_epoch=User.security_epoch + 1)
+        .returning(User.id, User.security_epoch)
+        .cte("bumped")
+    )
+    epoch = await session.scalar(
+        select(
+            bumped.c.security_epoch,
+            func.pg_notify(
+                SECURITY_EPOCH_CHANNEL,
+                func.concat(bumped.c.id, ":", bumped.c.security_epoch),
+            ),
+        )
+    )
+    # Значение уже в БД, flush не должен его перезаписывать
+    set_committed_value(user, "security_epoch", epoch)
+
+
+async def _bump_catalog_version(session: AsyncSession):
+    # Снимки справочников в воркерах перечитываются по NOTIFY, который
+    # доставляется только после commit этой же транзакции
+    bumped = (
+        insert(CatalogVersion)
+        .values(id=1, version=1)
+        .on_conflict_do_update(
+            index_elements=[CatalogVersion.id],
+            set_={"version": CatalogVersion.version + 1},
+        )
+        .returning(CatalogVersion.version)
+        .cte("bumped")
+    )
+    await session.execute(
+        select(func.pg_notify(CATALOG_CHANNEL, cast(bumped.c.version, String)))
+    )
 
 
 async def create_user(
@@ -27,20 +155,15 @@ async def create_user(
     if role not in UserRole.__dict__:
         raise HTTPException(400, "Invalid role")
 
-    existing = await session.scalar(select(User).where(User.username == username))
-    if existing:
-        raise HTTPException(409, "Username already exists")
-
-    user = User(username=username, password_hash=argon2.hash(password), role=role)
+    user = User(
+        username=username,
+        password_hash=await password_hasher.hash(password),
+        role=role,
+    )
     session.add(user)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _save(session)
 
-    await session.refresh(user)
     return user
 
 
@@ -52,7 +175,10 @@ async def get_user(session: AsyncSession, user_id: int) -> User:
 
 
 async def update_user_role(
-    session: AsyncSession, user_id: int, new_role: UserRole, current_user: User
+    session: AsyncSession,
+    user_id: int,
+    new_role: UserRole,
+    current_user: CurrentUser,
 ) -> User:
     if user_id == current_user.id:
         raise HTTPException(400, "You cannot change your own role")
@@ -67,12 +193,14 @@ async def update_user_role(
         raise HTTPException(400, "Invalid role")
 
     user.role = new_role
-    await session.commit()
-    await session.refresh(user)
+    await _bump_security_epoch(session, user)
+    await _save(session)
     return user
 
 
-async def deactivate_user(session: AsyncSession, user_id: int, current_user: User):
+async def deactivate_user(
+    session: AsyncSession, user_id: int, current_user: CurrentUser
+):
     user = await session.get(User, user_id)
     if not user:
         raise HTTPException(404, "User not found")
@@ -84,7 +212,8 @@ async def deactivate_user(session: AsyncSession, user_id: int, current_user: Use
         raise HTTPException(403, "Only admins can deactivate users")
 
     user.is_active = False
-    await session.commit()
+    await _bump_security_epoch(session, user)
+    await _save(session)
 
 
 async def create_applicant(
@@ -103,20 +232,6 @@ async def create_applicant(
     status: ApplicantStatus = ApplicantStatus.new,
 ) -> Applicant:
 
-    # Проверка уникальности national_id и passport_number
-    if national_id or passport_number:
-        stmt = select(Applicant).where(
-            or_(
-                Applicant.national_id == national_id,
-                Applicant.passport_number == passport_number,
-            )
-        )
-        existing = await session.scalar(stmt)
-        if existing:
-            raise HTTPException(
-                409, "Applicant with provided national ID or passport already exists"
-            )
-
     applicant = Applicant(
         first_name=first_name,
         last_name=last_name,
@@ -133,13 +248,8 @@ async def create_applicant(
     )
     session.add(applicant)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _save(session)
 
-    await session.refresh(applicant)
     return applicant
 
 
@@ -150,6 +260,14 @@ async def get_applicant(session: AsyncSession, applicant_id: int) -> Applicant:
     return applicant
 
 
+async def get_applicant_version(
+    session: AsyncSession, applicant_id: int
+) -> Optional[int]:
+    return await session.scalar(
+        select(Applicant.version).where(Applicant.id == applicant_id)
+    )
+
+
 async def update_applicant(
     session: AsyncSession, applicant_id: int, updates: dict
 ) -> Applicant:
@@ -175,15 +293,14 @@ async def update_applicant(
     for field, value in updates.items():
         if field not in allowed_fields:
             raise HTTPException(400, f"Field '{field}' cannot be updated")
+        if field == "status" and value is not None:
+            # В запросе enum из request_models: с enum колонки он не равен,
+            # и тот же статус выглядел бы изменением
+            value = ApplicantStatus(value.value)
         setattr(applicant, field, value)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _save(session)
 
-    await session.refresh(applicant)
     return applicant
 
 
@@ -193,19 +310,24 @@ async def delete_applicant(session: AsyncSession, applicant_id: int):
         raise HTTPException(404, "Applicant not found")
 
     # Защита: если есть комментарии или связанная история — запрет
-    if applicant.comments:
+    has_comments, has_specialties = (
+        await session.execute(
+            select(
+                exists().where(Comment.applicant_id == applicant_id),
+                exists().where(ApplicantSpecialty.applicant_id == applicant_id),
+            )
+        )
+    ).one()
+
+    if has_comments:
         raise HTTPException(400, "Cannot delete applicant with existing comments")
 
-    if applicant.applicant_specialties:
+    if has_specialties:
         raise HTTPException(400, "Cannot delete applicant linked to specialties")
 
-    session.delete(applicant)
+    await session.delete(applicant)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _save(session)
 
 
 async def create_specialty(
@@ -216,24 +338,14 @@ async def create_specialty(
     degree_level: Optional[str],
 ) -> Specialty:
 
-    existing = await session.scalar(
-        select(Specialty).where((Specialty.name == name) | (Specialty.code == code))
-    )
-    if existing:
-        raise HTTPException(409, "Specialty with this name or code already exists")
-
     specialty = Specialty(
         name=name, code=code, faculty=faculty, degree_level=degree_level
     )
     session.add(specialty)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _bump_catalog_version(session)
+    await _save(session)
 
-    await session.refresh(specialty)
     return specialty
 
 
@@ -258,13 +370,9 @@ async def update_specialty(
             raise HTTPException(400, f"Field '{field}' cannot be updated")
         setattr(specialty, field, value)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _bump_catalog_version(session)
+    await _save(session)
 
-    await session.refresh(specialty)
     return specialty
 
 
@@ -279,35 +387,22 @@ async def delete_specialty(session: AsyncSession, specialty_id: int):
     if specialty.specialty_exams:
         raise HTTPException(400, "Cannot delete specialty linked to exams")
 
-    session.delete(specialty)
+    await session.delete(specialty)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _bump_catalog_version(session)
+    await _save(session)
 
 
 async def create_exam(
     session: AsyncSession, name: str, type_: ExamType, min_score: Optional[int] = None
 ) -> Exam:
 
-    existing = await session.scalar(
-        select(Exam).where((Exam.name == name) & (Exam.type == type_))
-    )
-    if existing:
-        raise HTTPException(409, "Exam with this name and type already exists")
-
     exam = Exam(name=name, type=type_, min_score=min_score)
     session.add(exam)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _bump_catalog_version(session)
+    await _save(session)
 
-    await session.refresh(exam)
     return exam
 
 
@@ -330,13 +425,9 @@ async def update_exam(session: AsyncSession, exam_id: int, updates: dict) -> Exa
             raise HTTPException(400, f"Field '{field}' cannot be updated")
         setattr(exam, field, value)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _bump_catalog_version(session)
+    await _save(session)
 
-    await session.refresh(exam)
     return exam
 
 
@@ -348,37 +439,21 @@ async def delete_exam(session: AsyncSession, exam_id: int):
     if exam.specialty_exams:
         raise HTTPException(400, "Cannot delete exam linked to specialties")
 
-    session.delete(exam)
+    await session.delete(exam)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _bump_catalog_version(session)
+    await _save(session)
 
 
 async def create_comment(
     session: AsyncSession, applicant_id: int, user_id: int, text: str
 ) -> Comment:
 
-    applicant = await session.get(Applicant, applicant_id)
-    if not applicant:
-        raise HTTPException(404, "Applicant not found")
-
-    user = await session.get(User, user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
-
     comment = Comment(applicant_id=applicant_id, user_id=user_id, text=text)
     session.add(comment)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _save(session)
 
-    await session.refresh(comment)
     return comment
 
 
@@ -389,7 +464,9 @@ async def get_comment(session: AsyncSession, comment_id: int) -> Comment:
     return comment
 
 
-async def delete_comment(session: AsyncSession, comment_id: int, current_user: User):
+async def delete_comment(
+    session: AsyncSession, comment_id: int, current_user: CurrentUser
+):
     comment = await session.get(Comment, comment_id)
     if not comment:
         raise HTTPException(404, "Comment not found")
@@ -400,13 +477,9 @@ async def delete_comment(session: AsyncSession, comment_id: int, current_user: U
             403, "Only the comment author or admins can delete this comment"
         )
 
-    session.delete(comment)
+    await session.delete(comment)
 
-    try:
-        await session.commit()
-    except IntegrityError:
-        await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+    await _save(session)
 
 
 async def create_audit_log(
@@ -419,36 +492,54 @@ async def create_audit_log(
     after_data: Optional[dict],
 ) -> AuditLog:
 
-    applicant = await session.get(Applicant, applicant_id)
-    if not applicant:
-        raise HTTPException(404, "Applicant not found")
-
-    user = await session.get(User, changed_by_user_id)
-    if not user:
-        raise HTTPException(404, "User not found")
-
-    audit = AuditLog(
-        applicant_id=applicant_id,
-        changed_by_user_id=changed_by_user_id,
-        change_type=change_type,
-        action=action,
-        before_data=before_data,
-        after_data=after_data,
+    values = {
+        "applicant_id": applicant_id,
+        "changed_by_user_id": changed_by_user_id,
+        "change_type": change_type,
+        "action": action,
+        "before_data": before_data,
+        "after_data": after_data,
+    }
+    # У audit_log нет FK на applicants: существование абитуриента проверяет
+    # WHERE EXISTS в том же INSERT, пользователя — FK
+    stmt = (
+        insert(AuditLog)
+        .from_select(
+            list(values),
+            select(
+                *(
+                    literal(value, getattr(AuditLog, key).type)
+                    for key, value in values.items()
+                )
+            ).where(exists().where(Applicant.id == applicant_id)),
+        )
+        .returning(AuditLog)
     )
-    session.add(audit)
-
     try:
-        await session.commit()
-    except IntegrityError:
+        audit = (await session.scalars(stmt)).one_or_none()
+    except IntegrityError as error:
         await session.rollback()
-        raise HTTPException(500, "Database error occurred")
+        raise integrity_error_to_http(error)
+    if audit is None:
+        raise HTTPException(404, "Applicant not found")
+
+    await _save(session)
 
-    await session.refresh(audit)
     return audit
 
 
+async def create_audit_entries(
+    session: AsyncSession, entries: List[dict], outbox: bool = False
+):
+    # Один многострочный INSERT на все записи
+    model = AuditOutbox if outbox else AuditLog
+    await session.execute(insert(model), entries)
+    await _save(session)
+
+
 async def get_audit_log(session: AsyncSession, audit_id: int) -> AuditLog:
-    audit = await session.get(AuditLog, audit_id)
+    # Первичный ключ составной (id, changed_at), поэтому ищем по id
+    audit = await session.scalar(select(AuditLog).where(AuditLog.id == audit_id))
     if not audit:
         raise HTTPException(404, "Audit log entry not found")
     return audit
@@ -0,0 +1,403 @@
+"""
+Версионированные миграции схемы.
+
+При старте каждый воркер сравнивает хэш схемы из кода с сохранённым в
+schema_migrations — это один запрос. Если хэш не совпал, воркер берёт
+advisory lock, и миграции применяет только тот, кто взял его первым;
+остальные дожидаются блокировки, видят свежий хэш и идут дальше.
+
+Хэш считается по структуре моделей (таблицы, колонки с типом и NULL,
+имена индексов и ограничений), а не по тексту DDL. После миграций схема
+базы сверяется с моделями через reflection: если модели изменили без
+миграции, воркер не стартует.
+
+Новая миграция — функция ``async def _xxxx(conn)`` и запись в ``MIGRATIONS``
+с очередным номером. Каждая миграция выполняется в своей транзакции.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import (
+    Connection,
+    Table,
+    UniqueConstraint,
+    func,
+    inspect,
+    insert,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.schema import AddConstraint
+from sqlalchemy.types import Enum, TypeEngine
+
+from core.db.models import (
+    APPLICANT_FILTER_COLUMNS,
+    APPLICANT_SORT_COLUMNS,
+    Applicant,
+    AuditDeadLetter,
+    AuditLog,
+    AuditOutbox,
+    Base,
+    CatalogVersion,
+    Exam,
+    SchemaMigration,
+    Specialty,
+    User,
+)
+from core.db.partitions import audit_log_is_partitioned, ensure_audit_partitions
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory lock миграций (pg_advisory_lock принимает bigint)
+MIGRATION_LOCK_ID = 7_145_892_301
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[AsyncConnection], Awaitable[None]]
+
+
+# ---------- Миграции ----------
+
+
+async def _baseline(conn: AsyncConnection):
+    # Пустая база получает схему целиком; в существующей создаются
+    # только отсутствующие таблицы
+    await conn.run_sync(Base.metadata.create_all)
+
+
+async def _convert_json_to_jsonb(conn: AsyncConnection, table: Table):
+    result = await conn.execute(
+        text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table "
+            "AND data_type = 'json'"
+        ),
+        {"table": table.name},
+    )
+    for column in result.scalars().all():
+        await conn.execute(
+            text(
+                f"ALTER TABLE {table.name} ALTER COLUMN {column} "
+                f"TYPE jsonb USING {column}::jsonb"
+            )
+        )
+
+
+async def _partition_audit_log(conn: AsyncConnection):
+    """
+    Перенос несекционированного audit_log в секционированную таблицу.
+
+    Старая таблица переименовывается вместе с индексами и последовательностью
+    id (их имена нужны новой), строки копируются в месячные секции с
+    приведением JSON к JSONB, внешний ключ на applicants уходит вместе
+    со старой таблицей.
+    """
+    table = AuditLog.__tablename__
+    legacy = f"{table}_legacy"
+
+    await conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+    indexes = await conn.scalars(
+        text(
+            "SELECT c.relname FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = to_regclass(:t)"
+        ),
+        {"t": legacy},
+    )
+    for index in indexes.all():
+        await conn.execute(text(f"ALTER INDEX {index} RENAME TO {index}_legacy"))
+    sequence = await conn.scalar(
+        text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": legacy}
+    )
+    if sequence:
+        await conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {legacy}_id_seq"))
+
+    await conn.run_sync(AuditLog.__table__.create)
+
+    oldest = await conn.scalar(text(f"SELECT min(changed_at) FROM {legacy}"))
+    now = datetime.utcnow()
+    months_back = (
+        (now.year - oldest.year) * 12 + now.month - oldest.month if oldest else 0
+    )
+    await ensure_audit_partitions(conn, months_back=months_back)
+
+    columns = [column.name for column in AuditLog.__table__.columns]
+    values = [
+        f"{name}::jsonb" if name in ("before_data", "after_data") else name
+        for name in columns
+    ]
+    await conn.execute(
+        text(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"SELECT {', '.join(values)} FROM {legacy}"
+        )
+    )
+    await conn.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"coalesce(max(id), 0) + 1, false) FROM {table}"
+        )
+    )
+    await conn.execute(text(f"DROP TABLE {legacy}"))
+
+
+def _create_missing_constraints(conn: Connection):
+    # Уникальные ограничения и индексы, добавленные в модели после
+    # создания таблиц: create_all для существующих таблиц их не создаёт
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {
+            constraint["name"]
+            for constraint in inspector.get_unique_constraints(table.name)
+        }
+        for constraint in table.constraints:
+            if (
+                isinstance(constraint, UniqueConstraint)
+                and constraint.name
+                and constraint.name not in existing
+            ):
+                conn.execute(AddConstraint(constraint))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+async def _legacy_upgrade(conn: AsyncConnection):
+    """
+    Приведение базы, созданной до появления миграций, к текущим моделям.
+    На новой базе ничего не делает.
+    """
+    await conn.execute(
+        text(
+            f"ALTER TABLE {User.__tablename__} ADD COLUMN IF NOT EXISTS "
+            "security_epoch integer NOT NULL DEFAULT 0"
+        )
+    )
+    await _convert_json_to_jsonb(conn, AuditOutbox.__table__)
+    if not await audit_log_is_partitioned(conn):
+        await _partition_audit_log(conn)
+    await conn.run_sync(_create_missing_constraints)
+
+
+async def _catalog_version(conn: AsyncConnection):
+    await conn.run_sync(CatalogVersion.__table__.create, checkfirst=True)
+
+
+async def _row_versions(conn: AsyncConnection):
+    for model in (Applicant, Specialty, Exam):
+        await conn.execute(
+            text(
+                f"ALTER TABLE {model.__tablename__} ADD COLUMN IF NOT EXISTS "
+                "version integer NOT NULL DEFAULT 1"
+            )
+        )
+
+
+async def _audit_dead_letter(conn: AsyncConnection):
+    await conn.run_sync(AuditDeadLetter.__table__.create, checkfirst=True)
+
+
+async def _drop_applicant_filter_indexes(conn: AsyncConnection):
+    # Составные индексы "фильтр + сортировка" списка абитуриентов
+    for column in APPLICANT_FILTER_COLUMNS:
+        for sort in APPLICANT_SORT_COLUMNS:
+            await conn.execute(
+                text(f"DROP INDEX IF EXISTS ix_applicants_{column}_{sort}")
+            )
+
+
+async def _applicant_list_indexes(conn: AsyncConnection):
+    # Возврат индексов, удалённых миграцией 6
+    for index in Applicant.__table__.indexes:
+        await conn.run_sync(index.create, checkfirst=True)
+
+
+MIGRATIONS = (
+    Migration(1, "baseline", _baseline),
+    Migration(2, "legacy_upgrade", _legacy_upgrade),
+    Migration(3, "catalog_version", _catalog_version),
+    Migration(4, "row_versions", _row_versions),
+    Migration(5, "audit_dead_letter", _audit_dead_letter),
+    Migration(6, "drop_applicant_filter_indexes", _drop_applicant_filter_indexes),
+    Migration(7, "applicant_list_indexes", _applicant_list_indexes),
+)
+
+
+# ---------- Применение ----------
+
+
+def _type_name(type_: TypeEngine) -> str:
+    # Тип с точностью до семейства: reflection отдаёт VARCHAR вместо String,
+    # ENUM диалекта вместо Enum
+    if isinstance(type_, Enum):
+        return "Enum"
+    return (type_._type_affinity or type(type_)).__name__
+
+
+def model_structure() -> dict:
+    """Структура схемы по моделям: то, что сверяется с базой и хэшируется."""
+    return {
+        table.name: {
+            "columns": {
+                column.name: [_type_name(column.type), column.nullable]
+                for column in table.columns
+            },
+            "indexes": sorted(index.name for index in table.indexes),
+            "unique": sorted(
+                constraint.name
+                for constraint in table.constraints
+                if isinstance(constraint, UniqueConstraint) and constraint.name
+            ),
+        }
+        for table in Base.metadata.sorted_tables
+    }
+
+
+def database_structure(conn: Connection) -> dict:
+    """Та же структура, прочитанная из базы, для таблиц моделей."""
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    structure = {}
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            continue
+        structure[table.name] = {
+            "columns": {
+                column["name"]: [_type_name(column["type"]), column["nullable"]]
+                for column in inspector.get_columns(table.name)
+            },
+            # Индексы уникальных ограничений Postgres тоже показывает как индексы
+            "indexes": sorted(
+                index["name"]
+                for index in inspector.get_indexes(table.name)
+                if "duplicates_constraint" not in index
+            ),
+            "unique": sorted(
+                constraint["name"]
+                for constraint in inspector.get_unique_constraints(table.name)
+            ),
+        }
+    return structure
+
+
+def schema_drift(expected: dict, actual: dict) -> List[str]:
+    """Расхождения схемы базы с моделями, по строке на расхождение."""
+    drift = []
+    for table, model in expected.items():
+        found = actual.get(table)
+        if found is None:
+            drift.append(f"{table}: missing table")
+            continue
+        for name in sorted(model["columns"].keys() | found["columns"].keys()):
+            want, have = model["columns"].get(name), found["columns"].get(name)
+            if want != have:
+                drift.append(f"{table}.{name}: model {want}, database {have}")
+        for kind in ("indexes", "unique"):
+            for name in sorted(set(model[kind]) - set(found[kind])):
+                drift.append(f"{table}: missing {kind} {name}")
+            for name in sorted(set(found[kind]) - set(model[kind])):
+                drift.append(f"{table}: unexpected {kind} {name}")
+    return drift
+
+
+def schema_hash() -> str:
+    """Хэш списка миграций и структуры моделей."""
+    digest = hashlib.sha256()
+    for migration in MIGRATIONS:
+        digest.update(f"{migration.version}:{migration.name}\n".encode())
+    digest.update(json.dumps(model_structure(), sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+async def _stored_hash(conn: AsyncConnection) -> Optional[str]:
+    exists = await conn.scalar(
+        text("SELECT to_regclass(:name) IS NOT NULL"),
+        {"name": SchemaMigration.__tablename__},
+    )
+    if not exists:
+        return None
+    return await conn.scalar(
+        select(SchemaMigration.schema_hash)
+        .order_by(SchemaMigration.version.desc())
+        .limit(1)
+    )
+
+
+async def migrate(engine: AsyncEngine, audit_partitions_ahead: int = 3) -> bool:
+    """
+    Приводит схему к текущей версии.
+
+    :return: True, если этот воркер держал блокировку и обновлял схему.
+    """
+    expected = schema_hash()
+    async with engine.connect() as conn:
+        if await _stored_hash(conn) == expected:
+            return False
+
+        await conn.execute(select(func.pg_advisory_lock(MIGRATION_LOCK_ID)))
+        await conn.commit()
+        try:
+            # Пока ждали блокировку, миграции мог применить другой воркер
+            stored = await _stored_hash(conn)
+            if stored == expected:
+                return False
+            await conn.commit()
+
+            async with conn.begin():
+                await conn.run_sync(SchemaMigration.__table__.create, checkfirst=True)
+                applied = set(
+                    (await conn.scalars(select(SchemaMigration.version))).all()
+                )
+
+            pending = [m for m in MIGRATIONS if m.version not in applied]
+            for migration in pending:
+                logger.info(
+                    "Applying migration %04d_%s", migration.version, migration.name
+                )
+                async with conn.begin():
+                    await migration.apply(conn)
+                    await conn.execute(
+                        insert(SchemaMigration).values(
+                            version=migration.version,
+                            name=migration.name,
+                            applied_at=datetime.utcnow(),
+                        )
+                    )
+
+            # И после новых миграций, и без них схема базы должна совпасть
+            # с моделями. Иначе модели изменили без миграции: create_all не
+            # добавит колонки, а штамп хэша спрятал бы расхождение до ошибок
+            # в рантайме. Если расхождений нет, хэш просто перештамповывается
+            async with conn.begin():
+                drift = schema_drift(
+                    model_structure(), await conn.run_sync(database_structure)
+                )
+            if drift:
+                raise RuntimeError(
+                    "Database schema does not match the models, add a migration "
+                    "to MIGRATIONS: " + "; ".join(drift)
+                )
+
+            async with conn.begin():
+                await ensure_audit_partitions(
+                    conn, months_ahead=audit_partitions_ahead
+                )
+                latest = max(migration.version for migration in MIGRATIONS)
+                await conn.execute(
+                    update(SchemaMigration)
+                    .where(SchemaMigration.version == latest)
+                    .values(schema_hash=expected)
+                )
+        finally:
+            await conn.execute(select(func.pg_advisory_unlock(MIGRATION_LOCK_ID)))
+            await conn.commit()
+    return True
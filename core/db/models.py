@@ -1,11 +1,18 @@
 from sqlalchemy import (
+    DDL,
     ForeignKey,
     Enum,
-    JSON,
     Integer,
     String,
     Date,
+    Index,
+    UniqueConstraint,
+    cast,
+    event,
+    func,
+    literal,
 )
+from sqlalchemy.dialects.postgresql import JSONB, REGCONFIG
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from enum import Enum as PyEnum
 from datetime import datetime, date
@@ -18,6 +25,12 @@ class Base(DeclarativeBase):
     pass
 
 
+# pg_trgm нужен для GIN-индексов поиска абитуриентов
+event.listen(
+    Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+)
+
+
 # --- Enum'ы ---
 
 
@@ -67,14 +80,43 @@ class User(Base):
     password_hash: Mapped[str]
     role: Mapped[UserRole]
     is_active: Mapped[bool] = mapped_column(default=True)
+    # Увеличивается при смене роли и деактивации; access-токены со старой
+    # эпохой перестают приниматься (см. core.utilities.security)
+    security_epoch: Mapped[int] = mapped_column(default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
 
 # --- Applicant ---
 
+# Фильтры (равенство) и ключи сортировки списка абитуриентов.
+# На каждую комбинацию "фильтр + сортировка" есть составной индекс
+# (filter, sort_key, id), чтобы keyset-пагинация шла по индексу без сортировки;
+# (sort_key, id) обслуживает список без фильтров и диапазон дат регистрации.
+# Проверка: python -m scripts.check_query_plans --seed
+APPLICANT_FILTER_COLUMNS = ("status", "intake_period", "citizenship", "gender")
+APPLICANT_SORT_COLUMNS = ("id", "registration_date", "first_name")
+
+
+def _applicant_list_indexes() -> list:
+    indexes = [
+        Index(f"ix_applicants_{sort}", sort, "id")
+        for sort in APPLICANT_SORT_COLUMNS
+        if sort != "id"
+    ]
+    for column in APPLICANT_FILTER_COLUMNS:
+        for sort in APPLICANT_SORT_COLUMNS:
+            columns = (column, "id") if sort == "id" else (column, sort, "id")
+            indexes.append(Index(f"ix_applicants_{column}_{sort}", *columns))
+    return indexes
+
 
 class Applicant(Base):
     __tablename__ = "applicants"
+    __table_args__ = (
+        UniqueConstraint("national_id", name="uq_applicants_national_id"),
+        UniqueConstraint("passport_number", name="uq_applicants_passport_number"),
+        *_applicant_list_indexes(),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -100,6 +142,9 @@ class Applicant(Base):
     updated_at: Mapped[datetime] = mapped_column(
         default=datetime.utcnow, onupdate=datetime.utcnow
     )
+    # Растёт при каждом изменении строки: ETag и защита от потерянных обновлений
+    version: Mapped[int] = mapped_column(server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     comments: Mapped[List["Comment"]] = relationship(
         back_populates="applicant", cascade="all, delete-orphan"
@@ -109,11 +154,48 @@ class Applicant(Base):
     )
 
 
+# --- Поиск абитуриентов ---
+
+# ФИО одной строкой. Выражение IMMUTABLE, а литералы подставляются в SQL
+# напрямую (literal_execute), чтобы запрос совпадал с выражением индекса.
+_applicants = Applicant.__table__.c
+_empty = literal("", String, literal_execute=True)
+_space = literal(" ", String, literal_execute=True)
+SEARCH_TS_CONFIG = cast(literal("simple", literal_execute=True), REGCONFIG)
+applicant_full_name = (
+    func.coalesce(_applicants.first_name, _empty)
+    + _space
+    + func.coalesce(_applicants.middle_name, _empty)
+    + _space
+    + func.coalesce(_applicants.last_name, _empty)
+)
+applicant_name_tsvector = func.to_tsvector(SEARCH_TS_CONFIG, applicant_full_name)
+
+Index(
+    "ix_applicants_full_name_trgm",
+    applicant_full_name.label("full_name"),
+    postgresql_using="gin",
+    postgresql_ops={"full_name": "gin_trgm_ops"},
+)
+Index("ix_applicants_name_tsv", applicant_name_tsvector, postgresql_using="gin")
+for _column in ("email", "phone_number", "passport_number"):
+    Index(
+        f"ix_applicants_{_column}_trgm",
+        _applicants[_column],
+        postgresql_using="gin",
+        postgresql_ops={_column: "gin_trgm_ops"},
+    )
+
+
 # --- Specialty ---
 
 
 class Specialty(Base):
     __tablename__ = "specialties"
+    __table_args__ = (
+        UniqueConstraint("name", name="uq_specialties_name"),
+        UniqueConstraint("code", name="uq_specialties_code"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
@@ -121,6 +203,9 @@ class Specialty(Base):
 
     faculty: Mapped[Optional[str]]
     degree_level: Mapped[Optional[str]]
+    # Растёт при каждом изменении строки: ETag и защита от потерянных обновлений
+    version: Mapped[int] = mapped_column(server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     applicant_specialties: Mapped[List["ApplicantSpecialty"]] = relationship(
         back_populates="specialty", cascade="all, delete-orphan"
@@ -135,11 +220,15 @@ class Specialty(Base):
 
 class Exam(Base):
     __tablename__ = "exams"
+    __table_args__ = (UniqueConstraint("name", "type", name="uq_exams_name_type"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
     type: Mapped[ExamType]
     min_score: Mapped[Optional[int]]
+    # Растёт при каждом изменении строки: ETag и защита от потерянных обновлений
+    version: Mapped[int] = mapped_column(server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
     specialty_exams: Mapped[List["SpecialtyExam"]] = relationship(
         back_populates="exam", cascade="all, delete-orphan"
@@ -151,6 +240,12 @@ class Exam(Base):
 
 class ApplicantSpecialty(Base):
     __tablename__ = "applicant_specialties"
+    # PK (applicant_id, specialty_id) покрывает поиск по applicant_id
+    __table_args__ = (
+        Index(
+            "ix_applicant_specialties_specialty_id", "specialty_id", "applicant_id"
+        ),
+    )
 
     applicant_id: Mapped[int] = mapped_column(
         ForeignKey("applicants.id"), primary_key=True
@@ -174,6 +269,8 @@ class ApplicantSpecialty(Base):
 
 class SpecialtyExam(Base):
     __tablename__ = "specialty_exams"
+    # PK (specialty_id, exam_id) покрывает поиск по specialty_id
+    __table_args__ = (Index("ix_specialty_exams_exam_id", "exam_id", "specialty_id"),)
 
     specialty_id: Mapped[int] = mapped_column(
         ForeignKey("specialties.id"), primary_key=True
@@ -191,6 +288,11 @@ class SpecialtyExam(Base):
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        Index(
+            "ix_comments_applicant_id_created_at", "applicant_id", "created_at", "id"
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     applicant_id: Mapped[int] = mapped_column(ForeignKey("applicants.id"))
@@ -205,13 +307,154 @@ class Comment(Base):
 
 
 class AuditLog(Base):
+    """
+    Журнал изменений, секционированный по месяцам (RANGE по changed_at).
+
+    Секции audit_log_yYYYYmMM создаются заранее (см. core.db.partitions),
+    старые отсоединяются и уходят в архив скриптом scripts.archive_audit_log.
+    Ключ секционирования обязан входить в первичный ключ.
+    """
+
     __tablename__ = "audit_log"
+    __table_args__ = (
+        Index(
+            "ix_audit_log_applicant_id_changed_at", "applicant_id", "changed_at", "id"
+        ),
+        # Для выборок по всему журналу (GET /v1/auditlogs/query)
+        Index("ix_audit_log_changed_at", "changed_at", "id"),
+        Index(
+            "ix_audit_log_changed_by_user_id_changed_at",
+            "changed_by_user_id",
+            "changed_at",
+            "id",
+        ),
+        # jsonb_ops: поиск по ключу (?) и по паре ключ-значение (@>)
+        Index("ix_audit_log_before_data", "before_data", postgresql_using="gin"),
+        Index("ix_audit_log_after_data", "after_data", postgresql_using="gin"),
+        {"postgresql_partition_by": "RANGE (changed_at)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
-    applicant_id: Mapped[int] = mapped_column(ForeignKey("applicants.id"))
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # Без внешнего ключа: история остаётся и после удаления абитуриента
+    applicant_id: Mapped[int]
     changed_by_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     change_type: Mapped[ChangeType]
     action: Mapped[ActionType]
-    before_data: Mapped[Optional[dict]] = mapped_column(JSON)
-    after_data: Mapped[Optional[dict]] = mapped_column(JSON)
+    before_data: Mapped[Optional[dict]] = mapped_column(JSONB)
+    after_data: Mapped[Optional[dict]] = mapped_column(JSONB)
+    changed_at: Mapped[datetime] = mapped_column(
+        primary_key=True, default=datetime.utcnow
+    )
+
+
+# --- AuditOutbox ---
+
+
+class AuditOutbox(Base):
+    """
+    Transactional outbox для аудита: запись пишется в одной транзакции с
+    изменением, а фоновый ретранслятор пачками переносит её в audit_log.
+    Таблица без индексов и внешних ключей, чтобы вставка была дешёвой.
+    """
+
+    __tablename__ = "audit_outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    applicant_id: Mapped[int]
+    changed_by_user_id: Mapped[int]
+    change_type: Mapped[ChangeType]
+    action: Mapped[ActionType]
+    before_data: Mapped[Optional[dict]] = mapped_column(JSONB)
+    after_data: Mapped[Optional[dict]] = mapped_column(JSONB)
     changed_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+
+# --- AuditDeadLetter ---
+
+
+class AuditDeadLetter(Base):
+    """
+    Записи аудита, которые audit_log стабильно отвергает (например, абитуриент
+    уже удалён). AuditSink откладывает их сюда, чтобы одна плохая запись не
+    останавливала запись остальных; payload — запись как есть, в JSON.
+    """
+
+    __tablename__ = "audit_dead_letter"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    payload: Mapped[dict] = mapped_column(JSONB)
+    error: Mapped[str]
+    failed_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+
+# --- RateLimitBucket ---
+
+
+class RateLimitBucket(Base):
+    """
+    Общие для всех воркеров token bucket'ы (см. core.utilities.rate_limit).
+    UNLOGGED: потеря состояния при падении базы лишь сбрасывает лимиты.
+    """
+
+    __tablename__ = "rate_limit_buckets"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+    tokens: Mapped[float]
+    capacity: Mapped[float]
+    # Пополнение, токенов в секунду
+    rate: Mapped[float]
+    # Время последнего обращения, секунды epoch
+    updated_at: Mapped[float]
+    allowed: Mapped[bool]
+
+
+# --- RevokedToken ---
+
+
+class RevokedToken(Base):
+    """
+    Отозванные refresh-токены (``jti:<jti>``) и целые семейства ротации
+    (``family:<family>``). Строка нужна только до истечения срока токена.
+    """
+
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (Index("ix_revoked_tokens_expires_at", "expires_at"),)
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+    expires_at: Mapped[datetime]
+    revoked_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+
+# --- CatalogVersion ---
+
+
+class CatalogVersion(Base):
+    """
+    Версия справочников (специальности, экзамены и их связи) — одна строка.
+    Растёт при каждом изменении; воркеры держат снимок справочников в
+    памяти и перечитывают его при смене версии (см. core.utilities.catalog).
+    """
+
+    __tablename__ = "catalog_version"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    version: Mapped[int]
+
+
+# --- SchemaMigration ---
+
+
+class SchemaMigration(Base):
+    """
+    Применённые миграции (см. core.db.migrations). ``schema_hash`` ставится
+    последней строке, когда применены все миграции, и по нему остальные
+    воркеры при старте понимают, что схема актуальна.
+    """
+
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str]
+    schema_hash: Mapped[Optional[str]]
+    applied_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
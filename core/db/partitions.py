@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from core.db.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_PARTITION_PATTERN = re.compile(r"^audit_log_y(\d{4})m(\d{2})$")
+
+
+# ---------- Месяцы и имена секций ----------
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def audit_partition_name(month: date) -> str:
+    return f"{AuditLog.__tablename__}_y{month.year:04d}m{month.month:02d}"
+
+
+def audit_partition_month(name: str) -> date:
+    match = AUDIT_PARTITION_PATTERN.match(name)
+    if not match:
+        raise ValueError(f"Not an audit_log partition: {name}")
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+# ---------- Обслуживание секций ----------
+
+
+async def audit_log_is_partitioned(conn: AsyncConnection) -> bool:
+    relkind = await conn.scalar(
+        # "char" asyncpg отдаёт как bytes, поэтому приводим к text
+        text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": AuditLog.__tablename__},
+    )
+    return relkind == "p"
+
+
+async def ensure_audit_partitions(
+    conn: AsyncConnection, months_ahead: int = 3, months_back: int = 0
+) -> List[str]:
+    """
+    Создаёт недостающие месячные секции audit_log
+    от ``months_back`` месяцев назад до ``months_ahead`` вперёд.
+    """
+    if not await audit_log_is_partitioned(conn):
+        logger.warning("audit_log is not partitioned, skipping partition upkeep")
+        return []
+
+    # Воркеры обслуживают секции параллельно: создаёт их кто-то один
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext('audit_log_partitions'))")
+    )
+
+    current = month_start(datetime.utcnow().date())
+    created = []
+    for offset in range(-months_back, months_ahead + 1):
+        month = add_months(current, offset)
+        name = audit_partition_name(month)
+        exists = await conn.scalar(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}
+        )
+        if exists:
+            continue
+        # IF NOT EXISTS — на случай создателя, не берущего блокировку
+        await conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                f"PARTITION OF {AuditLog.__tablename__} "
+                f"FOR VALUES FROM ('{month.isoformat()}') "
+                f"TO ('{add_months(month, 1).isoformat()}')"
+            )
+        )
+        created.append(name)
+    return created
+
+
+async def attached_audit_partitions(conn: AsyncConnection) -> List[str]:
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ),
+        {"name": AuditLog.__tablename__},
+    )
+    return sorted(
+        name for name in result.scalars() if AUDIT_PARTITION_PATTERN.match(name)
+    )
+
+
+async def detached_audit_partitions(conn: AsyncConnection) -> List[str]:
+    # Отсоединённые, но ещё не заархивированные секции
+    # (например, если прошлый запуск архивации упал посередине)
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_class c "
+            "WHERE c.relkind = 'r' AND c.relnamespace = current_schema()::regnamespace "
+            "AND c.relname LIKE 'audit\\_log\\_y%' "
+            "AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)"
+        )
+    )
+    return sorted(
+        name for name in result.scalars() if AUDIT_PARTITION_PATTERN.match(name)
+    )
+
+
+async def maintain_audit_partitions(
+    engine: AsyncEngine, months_ahead: int, interval: float = 3600.0
+):
+    """Фоновая задача: раз в ``interval`` секунд досоздаёт будущие секции."""
+    while True:
+        try:
+            async with engine.begin() as conn:
+                created = await ensure_audit_partitions(conn, months_ahead)
+            if created:
+                logger.info("Created audit_log partitions: %s", ", ".join(created))
+        except Exception:
+            logger.exception("Audit partition upkeep failed")
+        await asyncio.sleep(interval)
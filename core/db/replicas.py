@@ -0,0 +1,186 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Можно ли читать с реплики в текущем контексте. По умолчанию — нет:
+# фоновые задачи, скрипты и изменяющие запросы работают с primary
+use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+
+# Позиции WAL в байтах: текущая запись на primary и применённая на реплике.
+# Реплика сравнивается с primary, а не сама с собой: у реплики с оборванным
+# WAL receiver полученное и применённое совпадают, хотя данные устаревают
+PRIMARY_LSN_SQL = text("SELECT pg_current_wal_lsn() - '0/0'::pg_lsn")
+REPLICA_LSN_SQL = text("SELECT pg_last_wal_replay_lsn() - '0/0'::pg_lsn")
+
+
+@contextmanager
+def read_from_replica(enabled: bool = True) -> Iterator[None]:
+    token = use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        use_replica.reset(token)
+
+
+class ReplicaSet:
+    """
+    Реплики для чтения с контролем отставания.
+
+    Фоновая задача раз в ``poll_interval`` секунд запоминает позицию WAL на
+    primary и сравнивает с ней позицию, применённую каждой репликой.
+    Отставание — сколько секунд назад primary впервые ушёл дальше реплики;
+    0, если реплика догнала последний замер. Недоступная реплика и реплика,
+    отставшая больше ``max_lag`` секунд, не выдаются; если годных нет,
+    чтение идёт с primary.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        engines: Sequence[AsyncEngine],
+        max_lag: float = 5.0,
+        poll_interval: float = 1.0,
+    ):
+        self.primary = primary
+        self.engines: List[AsyncEngine] = list(engines)
+        self.max_lag = max_lag
+        self.poll_interval = poll_interval
+        # None — реплика недоступна или ещё не опрошена
+        self.lag: Dict[int, Optional[float]] = {
+            index: None for index in range(len(self.engines))
+        }
+        self.fallbacks = 0
+        # (monotonic время замера, позиция WAL на primary), от старых к новым
+        self._primary_lsns: Deque[Tuple[float, int]] = deque()
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        await self.poll()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+    def healthy(self) -> List[AsyncEngine]:
+        return [
+            engine
+            for index, engine in enumerate(self.engines)
+            if self.lag[index] is not None and self.lag[index] <= self.max_lag
+        ]
+
+    def pick(self) -> Optional[AsyncEngine]:
+        healthy = self.healthy()
+        if not healthy:
+            self.fallbacks += 1
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def _lag_behind(self, replayed: int, now: float) -> float:
+        for measured_at, lsn in self._primary_lsns:
+            if lsn > replayed:
+                return now - measured_at
+        return 0.0
+
+    async def _measure_primary(self):
+        try:
+            async with self.primary.connect() as conn:
+                lsn = int(await conn.scalar(PRIMARY_LSN_SQL))
+        except Exception as error:
+            logger.warning("Cannot read WAL position of the primary: %s", error)
+            return
+        now = time.monotonic()
+        self._primary_lsns.append((now, lsn))
+        # Старше окна замеры не нужны: реплика, не догнавшая самый старый
+        # из оставшихся, и так отстаёт больше max_lag
+        window = max(self.max_lag, 0) + 2 * self.poll_interval
+        while len(self._primary_lsns) > 1 and self._primary_lsns[0][0] < now - window:
+            self._primary_lsns.popleft()
+
+    async def _measure(self, index: int, engine: AsyncEngine):
+        try:
+            async with engine.connect() as conn:
+                replayed = await conn.scalar(REPLICA_LSN_SQL)
+            if replayed is None:
+                raise RuntimeError("server is not a streaming replica")
+            self.lag[index] = self._lag_behind(int(replayed), time.monotonic())
+        except Exception as error:
+            if self.lag[index] is not None:
+                logger.warning("Replica %s is unavailable: %s", index, error)
+            self.lag[index] = None
+
+    async def poll(self):
+        # Сначала primary: всё, что он записал до замера, реплика обязана иметь
+        await self._measure_primary()
+        await asyncio.gather(
+            *(self._measure(index, engine) for index, engine in enumerate(self.engines))
+        )
+
+    def metrics(self) -> dict:
+        return {
+            "replicas": [
+                {
+                    "lag_seconds": self.lag[index],
+                    "healthy": self.lag[index] is not None
+                    and self.lag[index] <= self.max_lag,
+                    "pool": engine.pool.metrics(),
+                }
+                for index, engine in enumerate(self.engines)
+            ],
+            "max_lag": self.max_lag,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.poll()
+
+
+class RoutingSession(Session):
+    """
+    Сессия, которая отправляет SELECT на реплику, если это разрешено
+    контекстом (``use_replica``) и есть годная реплика. Запись, flush и
+    сырой ``session.connection()`` всегда идут на primary.
+
+    Реплика выбирается один раз на сессию, чтобы запросы одной страницы
+    (выборка и подсчёт) видели один и тот же снимок.
+    """
+
+    replicas: Optional[ReplicaSet] = None
+    # Читать с реплики независимо от контекста (DatabaseHandler.reader)
+    always_replica: bool = False
+
+    _replica: Optional[AsyncEngine]
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.replicas is not None
+            and (self.always_replica or use_replica.get())
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+        ):
+            if not hasattr(self, "_replica"):
+                self._replica = self.replicas.pick()
+            if self._replica is not None:
+                return self._replica.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from core.db.models import Applicant, Comment
+from core.responce_models.comment import CommentResponse
+from core.utilities.pagination import paginate_query
+from core.utilities.responses import response_columns
+
+logger = logging.getLogger(__name__)
+
+HotQuery = Callable[[AsyncSession], Awaitable]
+
+# Самые частые запросы API в том виде, в каком их строят crud и сервисы:
+# asyncpg кэширует подготовленные выражения по тексту SQL, так что
+# значения параметров не важны. Справочники читаются из CatalogCache,
+# пользователь запроса — из access-токена
+HOT_QUERIES: Sequence[HotQuery] = (
+    lambda session: session.get(Applicant, 0),
+    lambda session: session.get(Comment, 0),
+    lambda session: paginate_query(
+        session,
+        select(*response_columns(Comment, CommentResponse)).where(
+            Comment.applicant_id == 0
+        ),
+        order_by=(Comment.created_at, Comment.id),
+    ),
+)
+
+
+async def _prepare(conn: AsyncConnection, queries: Sequence[HotQuery]):
+    async with AsyncSession(bind=conn) as session:
+        for query in queries:
+            await query(session)
+        await session.rollback()
+
+
+async def warmup(
+    engine: AsyncEngine, connections: int, queries: Sequence[HotQuery] = HOT_QUERIES
+):
+    """
+    Прогрев пула до приёма запросов: открывает ``connections`` соединений
+    одновременно (каждое — отдельное соединение пула) и готовит на каждом
+    горячие запросы. Ошибка прогрева не мешает старту.
+    """
+    try:
+        async with AsyncExitStack() as stack:
+            opened = await asyncio.gather(
+                *(
+                    stack.enter_async_context(engine.connect())
+                    for _ in range(connections)
+                )
+            )
+            await asyncio.gather(*(_prepare(conn, queries) for conn in opened))
+    except Exception:
+        logger.exception("Connection pool warmup failed")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, constr, EmailStr
+from pydantic import BaseModel, constr, EmailStr, model_validator
 from enum import Enum
 from datetime import datetime, date
 from typing import Optional
@@ -33,6 +33,43 @@ class ApplicantCreateRequest(BaseModel):
     status: ApplicantStatus = ApplicantStatus.new
 
 
+class ApplicantFileFormat(str, Enum):
+    csv = "csv"
+    jsonl = "jsonl"
+
+
+class ApplicantSortKey(str, Enum):
+    id = "id"
+    registration_date = "registration_date"
+    first_name = "first_name"
+
+
+class ApplicantFilterRequest(BaseModel):
+    status: Optional[ApplicantStatus] = None
+    intake_period: Optional[str] = None
+    citizenship: Optional[str] = None
+    gender: Optional[str] = None
+    registered_from: Optional[datetime] = None
+    registered_to: Optional[datetime] = None
+    specialty_id: Optional[int] = None
+
+    def is_empty(self) -> bool:
+        return not self.model_dump(exclude_none=True)
+
+
+class ApplicantBulkStatusRequest(BaseModel):
+    status: ApplicantStatus
+    ids: Optional[list[int]] = None
+    filters: Optional[ApplicantFilterRequest] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        # Пустой набор фильтров выбрал бы всю таблицу
+        if not self.ids and (self.filters is None or self.filters.is_empty()):
+            raise ValueError("Provide applicant ids or at least one filter")
+        return self
+
+
 class ApplicantUpdateRequest(BaseModel):
     first_name: Optional[str]
     last_name: Optional[str]
@@ -28,3 +28,20 @@ class AuditLogCreateRequest(BaseModel):
     action: ActionType
     before_data: Optional[dict]
     after_data: Optional[dict]
+
+
+# ---------- Фильтры выборки по журналу ----------
+
+
+class AuditLogQueryRequest(BaseModel):
+    # Изменённое поле (ключ в before_data/after_data)
+    field: Optional[str] = None
+    # Значения поля до/после изменения: JSON (5, true, null) или строка
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+    change_type: Optional[ChangeType] = None
+    action: Optional[ActionType] = None
+    applicant_id: Optional[int] = None
+    changed_by_user_id: Optional[int] = None
+    changed_from: Optional[datetime] = None
+    changed_to: Optional[datetime] = None
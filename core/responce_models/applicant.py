@@ -2,7 +2,7 @@
 from datetime import datetime, date
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 from core.request_models.applicant import ApplicantStatus
 
@@ -30,9 +30,9 @@ class ApplicantResponse(BaseModel):
     status: ApplicantStatus
     created_at: datetime
     updated_at: datetime
+    version: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ---------- Пагинированный ответ ----------
@@ -41,4 +41,32 @@ class ApplicantResponse(BaseModel):
 class ApplicantPaginatedResponse(BaseModel):
     page: int
     next_page: bool
+    next_cursor: Optional[str] = None
     items: list[ApplicantResponse]
+
+
+# ---------- Массовая смена статуса ----------
+
+
+class ApplicantBulkStatusResponse(BaseModel):
+    updated: int
+
+
+# ---------- Результаты поиска ----------
+
+
+class ApplicantSearchResponse(BaseModel):
+    items: list[ApplicantResponse]
+
+
+# ---------- Отчёт об импорте ----------
+
+
+class ApplicantImportError(BaseModel):
+    row: int
+    error: str
+
+
+class ApplicantImportResponse(BaseModel):
+    imported: int
+    errors: list[ApplicantImportError]
@@ -2,7 +2,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from core.db.models import ChangeType, ActionType
 
@@ -17,8 +17,7 @@ class AuditLogResponse(BaseModel):
     after_data: Optional[dict]
     changed_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ---------- Пагинированный ответ ----------
@@ -27,4 +26,5 @@ class AuditLogResponse(BaseModel):
 class AuditLogPaginatedResponse(BaseModel):
     page: int
     next_page: bool
+    next_cursor: Optional[str] = None
     items: list[AuditLogResponse]
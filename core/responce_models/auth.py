@@ -12,3 +12,4 @@ class SignUpResponseModel(SignInResponseModel):
 
 class RefreshTokenResponseModel(BaseModel):
     access_token: str
+    refresh_token: str
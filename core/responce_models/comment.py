@@ -1,6 +1,7 @@
 from datetime import datetime
+from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 # ---------- Response схемы ----------
@@ -13,8 +14,7 @@ class CommentResponse(BaseModel):
     text: str
     created_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ---------- Пагинированный ответ ----------
@@ -23,4 +23,5 @@ class CommentResponse(BaseModel):
 class CommentPaginatedResponse(BaseModel):
     page: int
     next_page: bool
+    next_cursor: Optional[str] = None
     items: list[CommentResponse]
@@ -1,7 +1,7 @@
 # ---------- Response схемы ----------
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 from core.request_models.exam import ExamType
 
@@ -11,9 +11,9 @@ class ExamResponse(BaseModel):
     name: str
     type: ExamType
     min_score: Optional[int]
+    version: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ---------- Пагинированный ответ ----------
@@ -22,4 +22,5 @@ class ExamResponse(BaseModel):
 class ExamPaginatedResponse(BaseModel):
     page: int
     next_page: bool
+    next_cursor: Optional[str] = None
     items: list[ExamResponse]
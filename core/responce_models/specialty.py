@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class SpecialtyResponse(BaseModel):
@@ -9,9 +9,9 @@ class SpecialtyResponse(BaseModel):
     code: str
     faculty: Optional[str]
     degree_level: Optional[str]
+    version: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ---------- Пагинированный ответ ----------
@@ -20,4 +20,5 @@ class SpecialtyResponse(BaseModel):
 class SpecialtyPaginatedResponse(BaseModel):
     page: int
     next_page: bool
+    next_cursor: Optional[str] = None
     items: list[SpecialtyResponse]
@@ -0,0 +1,38 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+from core.db.models import ActionType, ChangeType
+
+
+class TimelineKind(str, Enum):
+    audit = "audit"
+    comment = "comment"
+
+
+# ---------- Response схемы ----------
+
+
+class TimelineItemResponse(BaseModel):
+    kind: TimelineKind
+    id: int
+    timestamp: datetime
+    user_id: int
+    # Только для комментариев
+    text: Optional[str] = None
+    # Только для записей аудита
+    change_type: Optional[ChangeType] = None
+    action: Optional[ActionType] = None
+    before_data: Optional[dict] = None
+    after_data: Optional[dict] = None
+
+
+# ---------- Пагинированный ответ ----------
+
+
+class TimelinePaginatedResponse(BaseModel):
+    next_page: bool
+    next_cursor: Optional[str] = None
+    items: list[TimelineItemResponse]
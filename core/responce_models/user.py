@@ -1,7 +1,9 @@
 # ---------- Response схемы ----------
 from datetime import datetime
 
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
 
 from core.request_models.user import UserRole
 
@@ -13,9 +15,7 @@ class UserResponse(BaseModel):
     is_active: bool
     created_at: datetime
 
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # ---------- Пагинированный ответ ----------
@@ -24,4 +24,5 @@ class UserResponse(BaseModel):
 class UserPaginatedResponse(BaseModel):
     page: int
     next_page: bool
+    next_cursor: Optional[str] = None
     items: list[UserResponse]
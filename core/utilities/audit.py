@@ -1,26 +1,494 @@
-from typing import Optional
-
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from core.db.crud import create_audit_log
-from core.db.models import ChangeType, ActionType
-
-
-async def log_change(
-    session: AsyncSession,
-    applicant_id: int,
-    changed_by_user_id: int,
-    change_type: ChangeType,
-    action: ActionType,
-    before_data: Optional[dict],
-    after_data: Optional[dict],
-):
-    await create_audit_log(
-        session=session,
-        applicant_id=applicant_id,
-        changed_by_user_id=changed_by_user_id,
-        change_type=change_type,
-        action=action,
-        before_data=before_data,
-        after_data=after_data,
-    )
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, exc, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from core.db.crud import create_audit_entries
+from core.db.models import (
+    ActionType,
+    Applicant,
+    ApplicantSpecialty,
+    AuditDeadLetter,
+    AuditLog,
+    AuditOutbox,
+    ChangeType,
+    Comment,
+)
+from core.db.pool import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы длительности записи пачки, миллисекунды
+FLUSH_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+AUDIT_COLUMNS = (
+    "applicant_id",
+    "changed_by_user_id",
+    "change_type",
+    "action",
+    "before_data",
+    "after_data",
+    "changed_at",
+)
+
+
+class AuditSinkMode(str, Enum):
+    # Запись в audit_log в той же транзакции (поведение по умолчанию)
+    sync = "sync"
+    # Буфер в памяти, многострочные INSERT по размеру/времени; записи
+    # попадают в очередь только после commit, но теряются при падении процесса
+    buffered = "buffered"
+    # Дешёвая вставка в audit_outbox в той же транзакции, фоновый перенос
+    # в audit_log пачками; записи не теряются
+    outbox = "outbox"
+
+
+def _is_transient(error: Exception) -> bool:
+    # БД недоступна или соединение потеряно — запись стоит просто повторить;
+    # остальные ошибки (ограничения, данные) повтор не исправит
+    return isinstance(
+        error, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError, OSError)
+    ) or getattr(error, "connection_invalidated", False)
+
+
+class AuditSink:
+    """
+    Отложенная пакетная запись аудита.
+
+    Подключается к сессиям через ``info={"audit_sink": sink}`` у sessionmaker,
+    после чего flush сессии и ``log_changes`` пишут записи согласно ``mode``.
+
+    Неудачная пачка повторяется с экспоненциальной задержкой. Если БД
+    доступна, но пачку отвергает ``max_attempts`` раз подряд, пачка делится
+    пополам, пока не останутся отдельные плохие записи, — они уходят в
+    audit_dead_letter, остальные пишутся как обычно.
+
+    ``queue_size`` ограничивает все записи в памяти — и очередь, и ждущие
+    повтора: при долгой недоступности БД новые записи отбрасываются.
+    """
+
+    def __init__(
+        self,
+        sessionmaker: async_sessionmaker,
+        mode: AuditSinkMode = AuditSinkMode.sync,
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+        queue_size: int = 100_000,
+        max_attempts: int = 3,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0,
+    ):
+        self.sessionmaker = sessionmaker
+        self.mode = AuditSinkMode(mode)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._retry: List[dict] = []
+        # Неудачных попыток подряд и время, до которого запись отложена
+        self._attempts = 0
+        self._resume_at = 0.0
+
+        self.flushes = 0
+        self.flushed_entries = 0
+        self.flush_errors = 0
+        self.dropped_entries = 0
+        self.dead_letters = 0
+        self.flush_ms = Histogram(FLUSH_BUCKETS_MS)
+
+    async def start(self):
+        if self.mode != AuditSinkMode.sync:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+        # Дописываем то, что осталось в буфере
+        batch = self._retry + self._drain(self.queue.qsize())
+        if batch:
+            await self._flush(batch)
+        if self.mode == AuditSinkMode.outbox:
+            await self._relay_outbox()
+
+    def submit(self, entry: dict):
+        # Ждущие повтора занимают место в очереди наравне с новыми записями
+        if self.queue.qsize() + len(self._retry) >= self.queue_size:
+            self.dropped_entries += 1
+            logger.error("Audit queue is full, entry dropped: %s", entry)
+            return
+        self.queue.put_nowait(entry)
+
+    def metrics(self) -> dict:
+        return {
+            "mode": self.mode.value,
+            "queue_depth": self.queue.qsize() + len(self._retry),
+            "flushes": self.flushes,
+            "flushed_entries": self.flushed_entries,
+            "flush_errors": self.flush_errors,
+            "dropped_entries": self.dropped_entries,
+            "dead_letters": self.dead_letters,
+            "failed_attempts": self._attempts,
+            "flush_ms": self.flush_ms.snapshot(),
+        }
+
+    def _drain(self, limit: int) -> List[dict]:
+        batch = []
+        while len(batch) < limit and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _collect(self) -> List[dict]:
+        batch = self._retry[: self.flush_size]
+        self._retry = self._retry[self.flush_size :]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+
+        while len(batch) < self.flush_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+            batch.extend(self._drain(self.flush_size - len(batch)))
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while not self._stopping.is_set():
+            # Пауза после неудачной записи; новые записи копятся в очереди
+            delay = self._resume_at - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), delay)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+
+            if self.mode == AuditSinkMode.outbox:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    await self._relay_outbox()
+                continue
+
+            batch = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+    async def _timed(self, coro) -> Optional[Exception]:
+        started = time.perf_counter()
+        try:
+            await coro
+        except Exception as error:
+            self.flush_errors += 1
+            logger.exception("Audit flush failed")
+            return error
+
+        self.flushes += 1
+        self.flush_ms.observe((time.perf_counter() - started) * 1000)
+        return None
+
+    def _failed(self):
+        self._attempts += 1
+        delay = min(
+            self.retry_delay * 2 ** (self._attempts - 1), self.max_retry_delay
+        )
+        self._resume_at = asyncio.get_running_loop().time() + delay
+
+    def _succeeded(self):
+        self._attempts = 0
+        self._resume_at = 0.0
+
+    async def _write(self, batch: List[dict]):
+        async with self.sessionmaker() as session:
+            await session.execute(insert(AuditLog), batch)
+            await session.commit()
+
+    async def _flush(self, batch: List[dict]):
+        error = await self._timed(self._write(batch))
+        if error is None:
+            self.flushed_entries += len(batch)
+            self._succeeded()
+            return
+
+        self._failed()
+        if _is_transient(error) or self._attempts < self.max_attempts:
+            # Повторим после паузы вместе со следующей пачкой
+            self._retry = batch + self._retry
+            return
+
+        # БД доступна, но пачку стабильно отвергает: ищем плохие записи
+        self._succeeded()
+        await self._isolate(batch)
+
+    async def _isolate(self, batch: List[dict]):
+        middle = len(batch) // 2
+        halves = (batch[:middle], batch[middle:])
+        for index, half in enumerate(halves):
+            if not half:
+                continue
+            error = await self._timed(self._write(half))
+            if error is None:
+                self.flushed_entries += len(half)
+            elif _is_transient(error):
+                # БД пропала посреди поиска: остаток — в обычный повтор
+                rest = half + (halves[1] if index == 0 else [])
+                self._retry = rest + self._retry
+                self._failed()
+                return
+            elif len(half) == 1:
+                await self._dead_letter(half[0], error)
+            else:
+                await self._isolate(half)
+
+    async def _dead_letter(self, entry: dict, error: Exception):
+        payload = {key: encode_audit_value(value) for key, value in entry.items()}
+        try:
+            async with self.sessionmaker() as session:
+                await session.execute(
+                    insert(AuditDeadLetter).values(
+                        payload=payload, error=str(error), failed_at=datetime.utcnow()
+                    )
+                )
+                await session.commit()
+        except Exception:
+            self.dropped_entries += 1
+            logger.exception("Audit entry lost: %s", payload)
+            return
+        self.dead_letters += 1
+        logger.error("Audit entry moved to dead letter: %s", payload)
+
+    async def _relay_outbox(self):
+        # DELETE ... RETURNING из outbox и INSERT в audit_log одним запросом;
+        # SKIP LOCKED позволяет нескольким воркерам переносить параллельно
+        locked = (
+            select(AuditOutbox.id)
+            .order_by(AuditOutbox.id)
+            .limit(self.flush_size)
+            .with_for_update(skip_locked=True)
+        )
+        moved = (
+            delete(AuditOutbox)
+            .where(AuditOutbox.id.in_(locked.scalar_subquery()))
+            .returning(*(getattr(AuditOutbox, column) for column in AUDIT_COLUMNS))
+            .cte("moved")
+        )
+        stmt = insert(AuditLog).from_select(
+            list(AUDIT_COLUMNS), select(*(moved.c[column] for column in AUDIT_COLUMNS))
+        )
+
+        while True:
+            moved_rows = 0
+
+            async def relay():
+                nonlocal moved_rows
+                async with self.sessionmaker() as session:
+                    result = await session.execute(stmt)
+                    await session.commit()
+                    moved_rows = result.rowcount
+
+            if await self._timed(relay()) is not None:
+                self._failed()
+                return
+            self._succeeded()
+            self.flushed_entries += moved_rows
+            if moved_rows < self.flush_size:
+                return
+
+
+# ---------- Полезная нагрузка аудита ----------
+
+
+def encode_audit_value(value):
+    """Компактное JSON-представление: enum -> value, дата -> ISO-строка."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+@dataclass(frozen=True)
+class AuditSpec:
+    change_type: ChangeType
+    # Атрибут, в котором лежит id абитуриента
+    applicant_key: str
+    # Поля для before/after при создании и удалении
+    summary: Tuple[str, ...]
+    # Поля, изменения которых пишутся отдельной записью своего типа
+    separate: Dict[str, ChangeType] = field(default_factory=dict)
+
+
+AUDITED_MODELS: Dict[type, AuditSpec] = {
+    Applicant: AuditSpec(
+        ChangeType.applicant_data,
+        "id",
+        ("first_name", "last_name"),
+        separate={"status": ChangeType.status},
+    ),
+    Comment: AuditSpec(ChangeType.comment, "applicant_id", ("text",)),
+    ApplicantSpecialty: AuditSpec(
+        ChangeType.specialty, "applicant_id", ("specialty_id", "priority")
+    ),
+}
+
+
+def _summary(obj, spec: AuditSpec) -> dict:
+    return {name: encode_audit_value(getattr(obj, name)) for name in spec.summary}
+
+
+def _updates(obj, spec: AuditSpec) -> List[Tuple[ChangeType, dict, dict]]:
+    """
+    before/after по истории атрибутов: только поля, значение которых
+    действительно изменилось (присваивание того же значения не в счёт).
+    """
+    groups: Dict[ChangeType, Tuple[dict, dict]] = {}
+    state = inspect(obj)
+    for attr in state.mapper.column_attrs:
+        history = state.attrs[attr.key].history
+        if not history.has_changes():
+            continue
+        old = encode_audit_value(history.deleted[0]) if history.deleted else None
+        new = encode_audit_value(history.added[0]) if history.added else None
+        if old == new:
+            continue
+        change_type = spec.separate.get(attr.key, spec.change_type)
+        before, after = groups.setdefault(change_type, ({}, {}))
+        before[attr.key] = old
+        after[attr.key] = new
+    return [(change_type, *payload) for change_type, payload in groups.items()]
+
+
+@event.listens_for(Session, "before_flush")
+def _capture_changes(session: Session, flush_context, instances):
+    # История атрибутов доступна только до flush, а id новых объектов —
+    # только после, поэтому здесь собираем изменения, а записи строим в after_flush
+    captured = session.info.setdefault("audit_captured", [])
+    for obj in session.new:
+        spec = AUDITED_MODELS.get(type(obj))
+        if spec:
+            captured.append((obj, spec, spec.change_type, ActionType.create, None))
+    for obj in session.dirty:
+        spec = AUDITED_MODELS.get(type(obj))
+        if spec and session.is_modified(obj, include_collections=False):
+            captured.extend(
+                (obj, spec, change_type, ActionType.update, (before, after))
+                for change_type, before, after in _updates(obj, spec)
+            )
+    for obj in session.deleted:
+        spec = AUDITED_MODELS.get(type(obj))
+        if spec:
+            captured.append(
+                (obj, spec, spec.change_type, ActionType.delete, _summary(obj, spec))
+            )
+
+
+@event.listens_for(Session, "after_flush")
+def _write_changes(session: Session, flush_context):
+    captured = session.info.pop("audit_captured", None)
+    if not captured:
+        return
+
+    user_id = session.info.get("audit_user_id")
+    if user_id is None:
+        logger.warning("Audited flush without audit_user_id, entries skipped")
+        return
+
+    now = datetime.utcnow()
+    entries = []
+    for obj, spec, change_type, action, payload in captured:
+        if action == ActionType.create:
+            before, after = None, _summary(obj, spec)
+        elif action == ActionType.delete:
+            before, after = payload, None
+        else:
+            before, after = payload
+        entries.append(
+            {
+                "applicant_id": getattr(obj, spec.applicant_key),
+                "changed_by_user_id": user_id,
+                "change_type": change_type,
+                "action": action,
+                "before_data": before,
+                "after_data": after,
+                "changed_at": now,
+            }
+        )
+
+    sink: Optional[AuditSink] = session.info.get("audit_sink")
+    mode = sink.mode if sink else AuditSinkMode.sync
+    if mode == AuditSinkMode.buffered:
+        # В очередь только после успешного commit (см. _submit_pending)
+        session.info.setdefault("pending_audit", []).extend(entries)
+    else:
+        # Одним многострочным INSERT в той же транзакции, что и изменения
+        table = AuditOutbox if mode == AuditSinkMode.outbox else AuditLog
+        session.connection().execute(insert(table.__table__), entries)
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_pending(session: Session):
+    entries = session.info.pop("pending_audit", None)
+    sink = session.info.get("audit_sink")
+    if entries and sink:
+        for entry in entries:
+            sink.submit(entry)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session):
+    session.info.pop("pending_audit", None)
+    session.info.pop("audit_captured", None)
+
+
+# ---------- Запись аудита из сервисов ----------
+
+
+def set_audit_user(session: AsyncSession, user_id: int):
+    """Автор изменений для записей аудита, которые пишет flush этой сессии."""
+    session.info["audit_user_id"] = user_id
+
+
+async def log_changes(session: AsyncSession, entries: List[dict]):
+    """
+    Явная запись аудита для изменений в обход ORM
+    (UPDATE ... RETURNING, COPY), которые не видит before_flush.
+    """
+    now = datetime.utcnow()
+    for entry in entries:
+        entry.setdefault("changed_at", now)
+
+    sink: Optional[AuditSink] = session.info.get("audit_sink")
+    mode = sink.mode if sink else AuditSinkMode.sync
+
+    if mode == AuditSinkMode.buffered:
+        if session.info.get("unit_of_work"):
+            # В очередь только после успешного commit (см. _submit_pending)
+            session.info.setdefault("pending_audit", []).extend(entries)
+        else:
+            # Вне unit of work изменение уже закоммичено
+            for entry in entries:
+                sink.submit(entry)
+    else:
+        await create_audit_entries(
+            session, entries, outbox=mode == AuditSinkMode.outbox
+        )
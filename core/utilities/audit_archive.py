@@ -0,0 +1,196 @@
+import asyncio
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from datetime import date, datetime
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from core.db.partitions import AUDIT_PARTITION_PATTERN, audit_partition_month
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".index.json"
+# Строк в одном gzip-члене архива: столько распаковывается ради одной записи
+ARCHIVE_BLOCK_ROWS = 1000
+
+
+def _to_json(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@lru_cache(maxsize=32)
+def _load_index(path: str, mtime_ns: int) -> dict:
+    # mtime в ключе: перезаписанный индекс читается заново
+    with open(path, encoding="utf-8") as stream:
+        return json.load(stream)
+
+
+def _applicant_entries(lines: Iterable[str], applicant_id: int) -> List[dict]:
+    # Строки пишет json.dumps с разделителями по умолчанию: чужие строки
+    # отсеиваются подстрокой без разбора JSON, совпадение проверяется ниже
+    needle = f'"applicant_id": {applicant_id}'
+    entries = []
+    for line in lines:
+        if needle not in line:
+            continue
+        entry = json.loads(line)
+        if entry["applicant_id"] == applicant_id:
+            entry["changed_at"] = datetime.fromisoformat(entry["changed_at"])
+            entries.append(entry)
+    return entries
+
+
+class AuditArchive:
+    """
+    Холодный архив audit_log: по одному файлу gzip JSONL на месячную секцию
+    (``audit_log_y2024m01.jsonl.gz``), строки в порядке (changed_at, id).
+
+    Файл пишется отдельными gzip-членами по ``ARCHIVE_BLOCK_ROWS`` строк
+    (для gzip это по-прежнему один файл), а рядом лежит индекс
+    ``audit_log_y2024m01.index.json``: смещения членов и номера членов со
+    строками каждого абитуриента. Чтение по абитуриенту распаковывает только
+    его члены; архив без индекса читается целиком.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def path(self, partition: str) -> Path:
+        return self.directory / f"{partition}{ARCHIVE_SUFFIX}"
+
+    def index_path(self, partition: str) -> Path:
+        return self.directory / f"{partition}{INDEX_SUFFIX}"
+
+    def partitions(self) -> List[str]:
+        """Заархивированные секции, от новых к старым."""
+        if not self.directory.is_dir():
+            return []
+        names = (
+            entry.name[: -len(ARCHIVE_SUFFIX)]
+            for entry in self.directory.iterdir()
+            if entry.name.endswith(ARCHIVE_SUFFIX)
+        )
+        return sorted(
+            (name for name in names if AUDIT_PARTITION_PATTERN.match(name)),
+            reverse=True,
+        )
+
+    @contextmanager
+    def writer(self, partition: str) -> Iterator[Callable[[Iterable[dict]], None]]:
+        """
+        Запись секции во временный файл с атомарным переименованием в конце,
+        чтобы недописанный архив никогда не выглядел готовым.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.path(partition)
+        temporary = target.with_name(target.name + ".tmp")
+        index_target = self.index_path(partition)
+        index_temporary = index_target.with_name(index_target.name + ".tmp")
+
+        # Смещение каждого gzip-члена и номера членов по абитуриентам
+        offsets: List[int] = []
+        applicants: Dict[int, List[int]] = {}
+        block: List[str] = []
+
+        with open(temporary, "wb") as stream:
+
+            def flush_block():
+                if block:
+                    offsets.append(stream.tell())
+                    stream.write(gzip.compress("".join(block).encode("utf-8")))
+                    block.clear()
+
+            def write(rows: Iterable[dict]):
+                for row in rows:
+                    block.append(
+                        json.dumps(row, default=_to_json, ensure_ascii=False) + "\n"
+                    )
+                    blocks = applicants.setdefault(row["applicant_id"], [])
+                    if not blocks or blocks[-1] != len(offsets):
+                        blocks.append(len(offsets))
+                    if len(block) >= ARCHIVE_BLOCK_ROWS:
+                        flush_block()
+
+            try:
+                yield write
+                flush_block()
+                size = stream.tell()
+            except BaseException:
+                stream.close()
+                temporary.unlink(missing_ok=True)
+                raise
+
+        with open(index_temporary, "w", encoding="utf-8") as stream:
+            json.dump(
+                {"size": size, "offsets": offsets, "applicants": applicants}, stream
+            )
+        os.replace(temporary, target)
+        os.replace(index_temporary, index_target)
+
+    def _index(self, partition: str) -> Optional[dict]:
+        try:
+            stat = self.index_path(partition).stat()
+            index = _load_index(str(self.index_path(partition)), stat.st_mtime_ns)
+            size = self.path(partition).stat().st_size
+        except (OSError, ValueError):
+            return None
+        # Индекс от другой версии файла бесполезен
+        return index if index["size"] == size else None
+
+    def _read_applicant(self, partition: str, applicant_id: int) -> List[dict]:
+        index = self._index(partition)
+        if index is None:
+            with gzip.open(self.path(partition), "rt", encoding="utf-8") as stream:
+                return _applicant_entries(stream, applicant_id)
+
+        offsets = index["offsets"] + [index["size"]]
+        entries = []
+        with open(self.path(partition), "rb") as stream:
+            for block in index["applicants"].get(str(applicant_id), []):
+                stream.seek(offsets[block])
+                data = gzip.decompress(stream.read(offsets[block + 1] - offsets[block]))
+                entries.extend(
+                    _applicant_entries(data.decode("utf-8").splitlines(), applicant_id)
+                )
+        return entries
+
+    async def applicant_entries(
+        self,
+        applicant_id: int,
+        limit: int,
+        before: Optional[Sequence] = None,
+    ) -> List[dict]:
+        """
+        До ``limit`` записей абитуриента из архива в порядке (changed_at, id)
+        по убыванию, строго раньше ключа ``before``.
+
+        Файлы читаются в отдельном потоке и только пока страница не заполнена.
+        """
+        before = tuple(before) if before else None
+        found = []
+        for partition in self.partitions():
+            if before and datetime.combine(
+                audit_partition_month(partition), datetime.min.time()
+            ) > before[0]:
+                # Вся секция новее курсора
+                continue
+            entries = await asyncio.to_thread(
+                self._read_applicant, partition, applicant_id
+            )
+            entries = [
+                entry
+                for entry in entries
+                if before is None or (entry["changed_at"], entry["id"]) < before
+            ]
+            entries.sort(key=lambda entry: (entry["changed_at"], entry["id"]))
+            found.extend(reversed(entries))
+            if len(found) >= limit:
+                break
+        return found[:limit]
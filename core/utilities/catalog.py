@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.db.models import CatalogVersion, Exam, Specialty, SpecialtyExam
+from core.responce_models.exam import ExamResponse
+from core.responce_models.specialty import SpecialtyResponse
+from core.utilities.notifications import NotificationListener
+
+logger = logging.getLogger(__name__)
+
+# Канал NOTIFY, payload — новая версия справочников
+CATALOG_CHANNEL = "catalog_version"
+
+
+class CatalogSnapshot:
+    """
+    Неизменяемый снимок справочников одной версии: специальности и экзамены
+    в порядке id (как в списках API) и требования специальностей к экзаменам.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        specialties: Sequence[SpecialtyResponse],
+        exams: Sequence[ExamResponse],
+        specialty_exams: Dict[int, Dict[int, Optional[int]]],
+    ):
+        self.version = version
+        self.specialties = tuple(specialties)
+        self.exams = tuple(exams)
+        # specialty_id -> {exam_id: required_score}
+        self.specialty_exams = specialty_exams
+        self._specialties = {specialty.id: specialty for specialty in self.specialties}
+        self._exams = {exam.id: exam for exam in self.exams}
+
+    def specialty(self, specialty_id: int) -> SpecialtyResponse:
+        specialty = self._specialties.get(specialty_id)
+        if not specialty:
+            raise HTTPException(404, "Specialty not found")
+        return specialty
+
+    def exam(self, exam_id: int) -> ExamResponse:
+        exam = self._exams.get(exam_id)
+        if not exam:
+            raise HTTPException(404, "Exam not found")
+        return exam
+
+
+class CatalogCache:
+    """
+    Снимок справочников в памяти воркера.
+
+    Снимок загружается при старте и перечитывается целиком, когда меняется
+    версия в catalog_version: по LISTEN/NOTIFY (изменения из всех воркеров),
+    сразу после записи в этом воркере и раз в ``refresh_interval`` секунд
+    на случай пропущенных уведомлений. Чтения обслуживаются без обращения
+    к БД.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        listener: NotificationListener,
+        refresh_interval: float = 60.0,
+    ):
+        self.engine = engine
+        self.refresh_interval = refresh_interval
+        self.snapshot = CatalogSnapshot(0, (), (), {})
+        self.reloads = 0
+        self._changed = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # После (пере)подключения LISTEN — изменения, сделанные без него
+        listener.subscribe(CATALOG_CHANNEL, self._on_notify, self._wake)
+
+    async def start(self):
+        await self.reload(force=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def reload(self, force: bool = False):
+        """Перечитывает снимок, если версия в БД отличается от текущей."""
+        async with self._lock:
+            async with self.engine.connect() as conn:
+                # Версия и строки — из одного снимка базы
+                await conn.execution_options(isolation_level="REPEATABLE READ")
+                version = (
+                    await conn.scalar(
+                        select(CatalogVersion.version).where(CatalogVersion.id == 1)
+                    )
+                    or 0
+                )
+                if not force and version == self.snapshot.version:
+                    return
+
+                specialties = await conn.execute(
+                    select(Specialty.__table__).order_by(Specialty.id)
+                )
+                exams = await conn.execute(select(Exam.__table__).order_by(Exam.id))
+                links = await conn.execute(
+                    select(
+                        SpecialtyExam.specialty_id,
+                        SpecialtyExam.exam_id,
+                        SpecialtyExam.required_score,
+                    )
+                )
+
+                specialty_exams: Dict[int, Dict[int, Optional[int]]] = {}
+                for specialty_id, exam_id, required_score in links:
+                    exams_of = specialty_exams.setdefault(specialty_id, {})
+                    exams_of[exam_id] = required_score
+
+                self.snapshot = CatalogSnapshot(
+                    version,
+                    [SpecialtyResponse.model_validate(row) for row in specialties],
+                    [ExamResponse.model_validate(row) for row in exams],
+                    specialty_exams,
+                )
+                self.reloads += 1
+
+    def metrics(self) -> dict:
+        return {
+            "version": self.snapshot.version,
+            "specialties": len(self.snapshot.specialties),
+            "exams": len(self.snapshot.exams),
+            "reloads": self.reloads,
+        }
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            version = int(payload)
+        except ValueError:
+            logger.warning("Malformed %s payload: %r", channel, payload)
+            return
+        if version != self.snapshot.version:
+            self._changed.set()
+
+    async def _wake(self):
+        self._changed.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.refresh_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Catalog reload failed")
@@ -0,0 +1,36 @@
+import hashlib
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def entity_etag(entity_id: int, version: int) -> str:
+    return f'"{entity_id}-{version}"'
+
+
+def page_etag(page: dict) -> str:
+    """
+    Слабый ETag страницы списка: меняется, если на странице поменялся
+    состав, порядок или версия любой записи, либо продолжение списка.
+    """
+    digest = hashlib.sha1()
+    for item in page["items"]:
+        digest.update(f"{item.id}-{item.version},".encode())
+    digest.update(f"{page['next_page']}:{page.get('next_cursor')}".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    # If-None-Match сравнивается слабо (RFC 9110, 13.1.2)
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy.engine import URL
+
+logger = logging.getLogger(__name__)
+
+NotifyCallback = Callable[[asyncpg.Connection, int, str, str], None]
+OnConnect = Callable[[], Awaitable[None]]
+
+
+class NotificationListener:
+    """
+    Одно LISTEN-соединение на воркер для всех каналов NOTIFY.
+
+    Соединение открывается напрямую через asyncpg, мимо пула: оно занято
+    всё время жизни воркера и иначе навсегда отнимало бы соединение у
+    запросов. После каждого (пере)подключения и LISTEN вызываются
+    ``on_connect`` подписчиков — они перечитывают то, что могло измениться,
+    пока соединения не было.
+    """
+
+    def __init__(
+        self,
+        url: URL,
+        heartbeat_interval: float = 30.0,
+        reconnect_delay: float = 5.0,
+    ):
+        # asyncpg принимает обычный postgresql:// DSN без имени драйвера
+        self.dsn = url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self.reconnects = 0
+        self._callbacks: Dict[str, List[NotifyCallback]] = {}
+        self._on_connect: List[OnConnect] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(
+        self,
+        channel: str,
+        callback: NotifyCallback,
+        on_connect: Optional[OnConnect] = None,
+    ):
+        """Подписка до ``start()``."""
+        self._callbacks.setdefault(channel, []).append(callback)
+        if on_connect is not None:
+            self._on_connect.append(on_connect)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "connected": self.connected,
+            "channels": sorted(self._callbacks),
+            "reconnects": self.reconnects,
+        }
+
+    async def _catch_up(self):
+        for on_connect in self._on_connect:
+            try:
+                await on_connect()
+            except Exception:
+                logger.exception("Catch-up after LISTEN failed")
+
+    async def _listen(self):
+        conn = await asyncpg.connect(self.dsn)
+        try:
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda connection: closed.set())
+            for channel, callbacks in self._callbacks.items():
+                for callback in callbacks:
+                    await conn.add_listener(channel, callback)
+            self.connected = True
+            await self._catch_up()
+
+            while True:
+                try:
+                    await asyncio.wait_for(closed.wait(), self.heartbeat_interval)
+                    raise ConnectionError("LISTEN connection closed")
+                except asyncio.TimeoutError:
+                    # Обрыв без закрытия сокета замечаем только запросом
+                    await conn.fetchval("SELECT 1")
+        finally:
+            self.connected = False
+            await conn.close(timeout=5)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification listener failed, reconnecting")
+                self.reconnects += 1
+                await asyncio.sleep(self.reconnect_delay)
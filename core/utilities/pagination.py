@@ -1,3 +1,174 @@
+import base64
+import bisect
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
 def paginate(items: list, page: int, page_size: int) -> dict:
     next_page = len(items) > page_size
     return {"page": page, "next_page": next_page, "items": items[:page_size]}
+
+
+# ---------- Keyset (cursor) пагинация ----------
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _decode_value(value, column):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def _sort_key(columns: Sequence) -> list:
+    # Имя с таблицей: курсор списка пользователей по id не подойдёт
+    # к списку абитуриентов по id
+    return [str(column) for column in columns]
+
+
+def encode_cursor(values: Sequence, columns: Sequence, descending: bool = False) -> str:
+    """Курсор хранит значения вместе с ключом сортировки и направлением."""
+    raw = json.dumps(
+        {
+            "key": _sort_key(columns),
+            "desc": descending,
+            "values": [_encode_value(value) for value in values],
+        },
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence, descending: bool = False) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, dict):
+            raise ValueError
+        key, desc, values = payload["key"], payload["desc"], payload["values"]
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(400, "Invalid cursor")
+
+    if key != _sort_key(columns) or desc is not descending:
+        raise HTTPException(400, "Cursor does not match the sort order")
+
+    try:
+        return [_decode_value(value, column) for value, column in zip(values, columns)]
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+async def paginate_query(
+    session: AsyncSession,
+    stmt: Select,
+    order_by: Sequence,
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    descending: bool = False,
+) -> dict:
+    """
+    Пагинация запроса по ключу сортировки.
+
+    ``order_by`` — колонки сортировки, последняя из них должна быть уникальной
+    (обычно ``id``). Если передан ``cursor``, страница выбирается предикатом
+    ``(sort_key, id) > (...)`` вместо ``OFFSET``, иначе используется ``page``.
+    Курсор, выданный для другой сортировки или направления, отклоняется.
+
+    Запрос одной сущности даёт страницу объектов, запрос нескольких колонок —
+    страницу строк ``Row``.
+    """
+    if page < 1:
+        raise HTTPException(400, "Page number must be 1 or higher")
+    if page_size < 1:
+        raise HTTPException(400, "Page size must be 1 or higher")
+
+    if cursor:
+        values = decode_cursor(cursor, order_by, descending)
+        key = tuple_(*order_by) if len(order_by) > 1 else order_by[0]
+        bound = tuple_(*values) if len(order_by) > 1 else values[0]
+        stmt = stmt.where(key < bound if descending else key > bound)
+    else:
+        stmt = stmt.offset((page - 1) * page_size)
+
+    stmt = stmt.order_by(
+        *(column.desc() if descending else column.asc() for column in order_by)
+    ).limit(page_size + 1)
+
+    result = await session.execute(stmt)
+    rows = result.all() if len(stmt.column_descriptions) > 1 else result.scalars().all()
+    return _keyset_page(rows, order_by, page, page_size, descending)
+
+
+def paginate_items(
+    items: Sequence,
+    order_by: Sequence,
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+) -> dict:
+    """
+    Та же пагинация, что и ``paginate_query``, но по списку в памяти,
+    уже отсортированному по ``order_by`` по возрастанию. Курсоры у обеих
+    функций взаимозаменяемы.
+    """
+    if page < 1:
+        raise HTTPException(400, "Page number must be 1 or higher")
+    if page_size < 1:
+        raise HTTPException(400, "Page size must be 1 or higher")
+
+    if cursor:
+        bound = tuple(decode_cursor(cursor, order_by))
+        start = bisect.bisect_right(
+            items,
+            bound,
+            key=lambda item: tuple(getattr(item, column.key) for column in order_by),
+        )
+    else:
+        start = (page - 1) * page_size
+
+    return _keyset_page(items[start : start + page_size + 1], order_by, page, page_size)
+
+
+def _keyset_page(
+    rows: Sequence,
+    order_by: Sequence,
+    page: int,
+    page_size: int,
+    descending: bool = False,
+) -> dict:
+    next_page = len(rows) > page_size
+    items = list(rows[:page_size])
+
+    next_cursor = None
+    if next_page:
+        last = items[-1]
+        next_cursor = encode_cursor(
+            [getattr(last, column.key) for column in order_by], order_by, descending
+        )
+
+    return {
+        "page": page,
+        "next_page": next_page,
+        "next_cursor": next_cursor,
+        "items": items,
+    }
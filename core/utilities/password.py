@@ -1,5 +1,15 @@
+import asyncio
+import logging
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
 from passlib.hash import argon2
 
+logger = logging.getLogger(__name__)
+
 
 def hash_password(password: str) -> str:
     return argon2.hash(password)
@@ -7,3 +17,175 @@ def hash_password(password: str) -> str:
 
 def verify_password(password: str, hashed: str) -> bool:
     return argon2.verify(password, hashed)
+
+
+# ---------- Хэширование в пуле потоков ----------
+
+
+class PasswordHasher:
+    """
+    Хэширование и проверка паролей argon2 вне event loop.
+
+    Работа выполняется в отдельном пуле потоков (argon2-cffi отпускает GIL),
+    одновременно — не больше ``max_workers`` операций. Запрос, который ждёт
+    очереди дольше ``max_wait`` секунд, получает 503, а не копит задержку.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_wait: float = 5.0,
+        rounds: int = argon2.default_rounds,
+        memory_cost: int = argon2.memory_cost,
+    ):
+        self.max_workers = max_workers
+        self.max_wait = max_wait
+        self.handler = argon2.using(rounds=rounds, memory_cost=memory_cost)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.operations = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def configure(
+        self,
+        max_workers: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        rounds: Optional[int] = None,
+        memory_cost: Optional[int] = None,
+    ):
+        if max_workers is not None:
+            self.max_workers = max_workers
+        if max_wait is not None:
+            self.max_wait = max_wait
+        if rounds is not None or memory_cost is not None:
+            self.handler = argon2.using(
+                rounds=rounds or self.handler.default_rounds,
+                memory_cost=memory_cost or self.handler.memory_cost,
+            )
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="argon2"
+        )
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+
+    async def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._semaphore = None
+
+    async def calibrate(
+        self, target_seconds: float, max_rounds: int = 10, samples: int = 3
+    ):
+        """
+        Подбор time_cost (rounds) под целевое время одного хэша на этой машине
+        при текущем memory_cost. Выполняется при старте, до приёма запросов.
+
+        Калибровка только усиливает параметры: поиск начинается с настроенных
+        rounds (и не ниже значения passlib по умолчанию), время хэша — медиана
+        ``samples`` замеров. В metrics() калибровочные хэши не попадают.
+        """
+        memory_cost = self.handler.memory_cost
+        rounds = max(self.handler.default_rounds, argon2.default_rounds)
+        while True:
+            handler = argon2.using(rounds=rounds, memory_cost=memory_cost)
+            timings = []
+            for _ in range(samples):
+                started = time.perf_counter()
+                await self._run(handler.hash, "calibration", record=False)
+                timings.append(time.perf_counter() - started)
+            elapsed = statistics.median(timings)
+            if elapsed >= target_seconds or rounds >= max_rounds:
+                break
+            rounds += 1
+
+        self.handler = handler
+        logger.info(
+            "argon2 calibrated: rounds=%s memory_cost=%s (%.0f ms)",
+            rounds,
+            memory_cost,
+            elapsed * 1000,
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.handler.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run(self.handler.verify, password, password_hash)
+
+    def needs_update(self, password_hash: str) -> bool:
+        """
+        Нужно ли перехэшировать пароль при входе.
+
+        Только если сохранённый хэш слабее текущих параметров: воркеры
+        калибруются независимо, и перехэширование "вниз" гоняло бы хэш
+        туда-обратно между ними.
+        """
+        if not self.handler.needs_update(password_hash):
+            return False
+        try:
+            stored = argon2.from_string(password_hash)
+        except ValueError:
+            return True
+        return (
+            stored.type != self.handler.type
+            or stored.rounds < self.handler.default_rounds
+            or stored.memory_cost < self.handler.memory_cost
+        )
+
+    def metrics(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "rounds": self.handler.default_rounds,
+            "memory_cost": self.handler.memory_cost,
+            "waiting": self.waiting,
+            "operations": self.operations,
+            "rejected": self.rejected,
+            "avg_wait_seconds": (
+                self.total_wait_seconds / self.operations if self.operations else 0.0
+            ),
+            "max_wait_seconds": self.max_wait_seconds,
+            "avg_run_seconds": (
+                self.total_run_seconds / self.operations if self.operations else 0.0
+            ),
+        }
+
+    async def _run(self, func, *args, record: bool = True):
+        if self._executor is None:
+            raise RuntimeError("PasswordHasher is not started")
+
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(503, "Too many concurrent password operations")
+        finally:
+            self.waiting -= 1
+
+        try:
+            started = time.perf_counter()
+            wait = started - queued
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+            if record:
+                self.operations += 1
+                self.total_wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+                self.total_run_seconds += time.perf_counter() - started
+            return result
+        finally:
+            self._semaphore.release()
+
+
+# Общий экземпляр на процесс; настраивается и запускается в lifespan
+password_hasher = PasswordHasher()
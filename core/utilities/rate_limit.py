@@ -0,0 +1,182 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from ipaddress import ip_address, ip_network
+from typing import Optional, Sequence, Tuple, Union
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from core.db.models import RateLimitBucket
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    # Размер всплеска
+    capacity: float
+    # Пополнение, токенов в секунду
+    rate: float
+
+    @classmethod
+    def per_minute(cls, capacity: float, per_minute: float) -> "RateLimit":
+        return cls(capacity=capacity, rate=per_minute / 60)
+
+
+class MemoryTokenBuckets:
+    """
+    Token bucket'ы в памяти процесса: без обращений к базе, но каждый
+    воркер считает лимиты сам по себе.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at); порядок — давность обращения
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, limits: Sequence[Tuple[str, RateLimit]]) -> float:
+        """
+        Снимает по токену с каждого bucket'а, но только если токен есть во
+        всех: отказ по одному ключу не тратит попытки по остальным.
+
+        :return: 0, если все bucket'ы пропустили запрос, иначе через сколько
+            секунд имеет смысл повторить попытку.
+        """
+        now = time.monotonic()
+        refilled = {}
+        retry_after = 0.0
+        for key, limit in limits:
+            tokens, updated_at = self.buckets.pop(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / limit.rate)
+            refilled[key] = tokens
+
+        for key, tokens in refilled.items():
+            self.buckets[key] = (tokens if retry_after else tokens - 1, now)
+
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+
+class PostgresTokenBuckets:
+    """
+    Token bucket'ы в таблице rate_limit_buckets, общие для всех воркеров.
+
+    В одной транзакции INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+    пополняет bucket'ы и блокирует их строки, а токены снимаются вторым
+    UPDATE, только если пропустили все bucket'ы.
+    """
+
+    def __init__(self, sessionmaker: async_sessionmaker, prune_every: int = 1000):
+        self.sessionmaker = sessionmaker
+        self.prune_every = prune_every
+        self._calls = 0
+
+    async def take(self, limits: Sequence[Tuple[str, RateLimit]]) -> float:
+        now = func.extract("epoch", func.now())
+        # Один порядок блокировки строк во всех запросах — без взаимоблокировок
+        limits = sorted(limits, key=lambda item: item[0])
+        stmt = insert(RateLimitBucket).values(
+            [
+                {
+                    "key": key,
+                    "tokens": limit.capacity,
+                    "capacity": limit.capacity,
+                    "rate": limit.rate,
+                    "updated_at": now,
+                    "allowed": True,
+                }
+                for key, limit in limits
+            ]
+        )
+        refilled = func.least(
+            stmt.excluded.capacity,
+            RateLimitBucket.tokens
+            + (now - RateLimitBucket.updated_at) * stmt.excluded.rate,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitBucket.key],
+            set_={
+                "tokens": refilled,
+                "allowed": refilled >= 1,
+                "capacity": stmt.excluded.capacity,
+                "rate": stmt.excluded.rate,
+                "updated_at": now,
+            },
+        ).returning(
+            RateLimitBucket.allowed, RateLimitBucket.tokens, RateLimitBucket.rate
+        )
+
+        async with self.sessionmaker() as session:
+            result = await session.execute(stmt)
+            retry_after = max(
+                (
+                    (1 - tokens) / rate
+                    for allowed, tokens, rate in result.all()
+                    if not allowed
+                ),
+                default=0.0,
+            )
+            if not retry_after:
+                await session.execute(
+                    update(RateLimitBucket)
+                    .where(RateLimitBucket.key.in_([key for key, _ in limits]))
+                    .values(tokens=RateLimitBucket.tokens - 1)
+                )
+            await session.commit()
+
+        self._calls += 1
+        if self._calls % self.prune_every == 0:
+            await self.prune()
+
+        return retry_after
+
+    async def prune(self):
+        # Полностью пополнившиеся bucket'ы ничем не отличаются от отсутствующих
+        now = func.extract("epoch", func.now())
+        async with self.sessionmaker() as session:
+            await session.execute(
+                delete(RateLimitBucket).where(
+                    RateLimitBucket.tokens
+                    + (now - RateLimitBucket.updated_at) * RateLimitBucket.rate
+                    >= RateLimitBucket.capacity
+                )
+            )
+            await session.commit()
+
+
+TokenBuckets = Union[MemoryTokenBuckets, PostgresTokenBuckets]
+
+
+def client_ip(
+    host: Optional[str], forwarded_for: Optional[str], trusted_proxies: Sequence[str]
+) -> str:
+    """
+    IP клиента с учётом X-Forwarded-For.
+
+    Заголовку верим только от доверенных прокси: адреса в нём читаются
+    справа налево, и клиентом считается первый не из ``trusted_proxies``.
+    Левее него адреса подставлены самим клиентом и ничего не значат.
+    """
+    networks = [ip_network(proxy, strict=False) for proxy in trusted_proxies]
+
+    def is_trusted(address: str) -> bool:
+        try:
+            parsed = ip_address(address)
+        except ValueError:
+            return False
+        return any(parsed in network for network in networks)
+
+    address = host or "unknown"
+    if not forwarded_for or not is_trusted(address):
+        return address
+    for hop in reversed(forwarded_for.split(",")):
+        hop = hop.strip()
+        if not hop:
+            continue
+        address = hop
+        if not is_trusted(hop):
+            break
+    return address
@@ -0,0 +1,65 @@
+import time
+from http.cookies import SimpleCookie
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.db.replicas import read_from_replica
+
+# Cookie "читать с primary до" (секунды epoch) после изменяющего запроса
+STICKY_COOKIE = "db_primary_until"
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+class ReadRoutingMiddleware:
+    """
+    Маршрутизация чтения на реплики по методу запроса.
+
+    GET и HEAD разрешают сессиям читать с реплики. Успешный изменяющий
+    запрос ставит клиенту cookie на ``sticky_seconds`` секунд, и пока она
+    действует, его GET читают с primary — клиент видит свои же изменения,
+    даже если реплика ещё не догнала primary.
+    """
+
+    def __init__(self, app: ASGIApp, sticky_seconds: float = 5.0, secure: bool = True):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+        self.secure = secure
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in READ_METHODS:
+            with read_from_replica(not self._is_sticky(scope)):
+                await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append("set-cookie", self._sticky_cookie())
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+    def _is_sticky(self, scope: Scope) -> bool:
+        value = HTTPConnection(scope).cookies.get(STICKY_COOKIE)
+        try:
+            return value is not None and float(value) > time.time()
+        except ValueError:
+            return False
+
+    def _sticky_cookie(self) -> str:
+        cookie = SimpleCookie()
+        cookie[STICKY_COOKIE] = f"{time.time() + self.sticky_seconds:.3f}"
+        morsel = cookie[STICKY_COOKIE]
+        morsel["max-age"] = str(int(self.sticky_seconds) + 1)
+        morsel["path"] = "/"
+        morsel["httponly"] = True
+        morsel["samesite"] = "lax"
+        if self.secure:
+            morsel["secure"] = True
+        return morsel.OutputString()
@@ -0,0 +1,35 @@
+from typing import Any, List, Type
+
+import orjson
+from pydantic import BaseModel
+from sqlalchemy.engine import Row
+from starlette.responses import JSONResponse
+
+
+def response_columns(entity, response_model: Type[BaseModel]) -> List:
+    """Колонки ``entity`` под поля ``response_model``, в порядке полей."""
+    return [getattr(entity, name) for name in response_model.model_fields]
+
+
+def _default(value):
+    if isinstance(value, Row):
+        return value._asdict()
+    # Готовые схемы, например из снимка справочников
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class RowsJSONResponse(JSONResponse):
+    """
+    Ответ со списком строк ``Row``, сериализуемый orjson.
+
+    Строки выбираются запросом по ``response_columns`` и отдаются как есть:
+    без ORM-объектов и без валидации каждого элемента схемой ответа.
+    Даты, перечисления и JSONB orjson сериализует сам. Роут, который
+    возвращает такой ответ, оставляет ``response_model`` для OpenAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        # Имена колонок в Row — подкласс str, без опции orjson их не принимает
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
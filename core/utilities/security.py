@@ -0,0 +1,362 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.db.models import RevokedToken, User, UserRole
+from core.utilities.bloom import BloomFilter
+from core.utilities.notifications import NotificationListener
+
+logger = logging.getLogger(__name__)
+
+# Канал NOTIFY, payload — "<user_id>:<security_epoch>"
+SECURITY_EPOCH_CHANNEL = "security_epoch"
+# Канал NOTIFY, payload — ключ отозванного токена или семейства
+REVOKED_TOKENS_CHANNEL = "revoked_tokens"
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Пользователь запроса, собранный из access-токена без обращения к БД."""
+
+    id: int
+    role: UserRole
+    security_epoch: int
+    # Токен деактивированного пользователя отсекается по эпохе
+    is_active: bool = True
+
+
+class SecurityEpochs:
+    """
+    Таблица эпох безопасности пользователей в памяти процесса.
+
+    Хранятся только пользователи с ненулевой эпохой. Таблица загружается
+    при старте, обновляется по LISTEN/NOTIFY (изменения из всех воркеров)
+    и периодически перечитывается целиком на случай пропущенных уведомлений.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        listener: NotificationListener,
+        refresh_interval: float = 60.0,
+    ):
+        self.engine = engine
+        self.refresh_interval = refresh_interval
+        self.epochs: Dict[int, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        # После (пере)подключения LISTEN — всё, что изменилось без него
+        listener.subscribe(SECURITY_EPOCH_CHANNEL, self._on_notify, self.reload)
+
+    async def start(self):
+        await self.reload()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def is_current(self, user_id: int, epoch: int) -> bool:
+        # Эпоха новее известной — токен подписан после смены, а NOTIFY до
+        # этого воркера ещё не дошёл: принимаем и запоминаем её
+        known = self.epochs.get(user_id, 0)
+        if epoch > known:
+            self.epochs[user_id] = epoch
+        return epoch >= known
+
+    def _apply(self, user_id: int, epoch: int):
+        # Эпохи только растут, поэтому устаревшее значение не затирает новое
+        if epoch > self.epochs.get(user_id, 0):
+            self.epochs[user_id] = epoch
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            user_id, epoch = map(int, payload.split(":"))
+        except ValueError:
+            logger.warning("Malformed %s payload: %r", channel, payload)
+            return
+        self._apply(user_id, epoch)
+
+    async def reload(self):
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(User.id, User.security_epoch).where(User.security_epoch > 0)
+            )
+            for user_id, epoch in result:
+                self._apply(user_id, epoch)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.reload()
+            except Exception:
+                logger.exception("Security epoch reload failed")
+
+
+# ---------- Отзыв refresh-токенов ----------
+
+
+def jti_key(jti: str) -> str:
+    return f"jti:{jti}"
+
+
+def family_key(family: str) -> str:
+    return f"family:{family}"
+
+
+def grace_key(jti: str) -> str:
+    # Повторный обмен jti в окне REUSE_GRACE (см. api.v1.services.auth.renew)
+    return f"grace:{jti}"
+
+
+class RevokedTokens:
+    """
+    Отозванные refresh-токены и семейства ротации.
+
+    Источник истины — таблица revoked_tokens, а в памяти процесса держится
+    фильтр Блума по её ключам: отрицательный ответ фильтра окончателен, и
+    обычная проверка токена обходится без запроса к БД. Положительный ответ
+    подтверждается запросом (ложные срабатывания стоят одного SELECT).
+
+    Фильтр пополняется по LISTEN/NOTIFY из всех воркеров и раз в
+    ``refresh_interval`` секунд пересобирается без истёкших записей.
+    Использованные jti (``mark_used``) сразу попадают в фильтр, а в таблицу
+    и другим воркерам уходят фоновыми пачками раз в ``flush_interval``.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        listener: NotificationListener,
+        capacity: int = 100_000,
+        error_rate: float = 0.01,
+        refresh_interval: float = 3600.0,
+        flush_interval: float = 0.1,
+        flush_size: int = 1000,
+        retry_delay: float = 5.0,
+    ):
+        self.engine = engine
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.retry_delay = retry_delay
+        self.filter = BloomFilter(capacity, error_rate)
+        self.confirmations = 0
+        self.false_positives = 0
+        self.flush_failures = 0
+        # Использованные ключи, ещё не записанные в таблицу:
+        # key -> (expires_at, used_at)
+        self._pending: Dict[str, Tuple[datetime, datetime]] = {}
+        self._wake = asyncio.Event()
+        # Ключи, пришедшие по NOTIFY во время пересборки фильтра
+        self._received: Optional[List[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        listener.subscribe(REVOKED_TOKENS_CHANNEL, self._on_notify, self.reload)
+
+    async def start(self):
+        await self.reload()
+        self._task = asyncio.create_task(self._run())
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        for task in (self._task, self._flush_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = self._flush_task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Used tokens flush on shutdown failed")
+
+    async def is_revoked(self, key: str) -> bool:
+        if key not in self.filter:
+            return False
+
+        self.confirmations += 1
+        async with self.engine.connect() as conn:
+            revoked = await conn.scalar(
+                select(
+                    exists().where(
+                        RevokedToken.key == key,
+                        RevokedToken.expires_at > datetime.utcnow(),
+                    )
+                )
+            )
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    async def revoke(self, key: str, expires_at: datetime) -> bool:
+        """
+        Отзыв токена или семейства до ``expires_at``.
+
+        Вставка и NOTIFY — один запрос; уведомление уходит только если ключ
+        не был отозван раньше. Возвращает False, если ключ уже был отозван:
+        для jti это значит, что токен предъявили повторно.
+        """
+        revoked = (
+            insert(RevokedToken)
+            .values(key=key, expires_at=expires_at, revoked_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=[RevokedToken.key])
+            .returning(RevokedToken.key)
+            .cte("revoked")
+        )
+        async with self.engine.begin() as conn:
+            inserted = await conn.scalar(
+                select(
+                    revoked.c.key, func.pg_notify(REVOKED_TOKENS_CHANNEL, revoked.c.key)
+                )
+            )
+        self._add(key)
+        return inserted is not None
+
+    async def mark_used(self, key: str, expires_at: datetime) -> Optional[datetime]:
+        """
+        Отметка одноразового ключа (jti обменянного refresh-токена).
+
+        Если ключа нет в фильтре, запросов к БД нет: ключ сразу попадает в
+        фильтр, а запись и NOTIFY уходят фоном. Только при срабатывании
+        фильтра прежняя отметка ищется в очереди записи и в таблице.
+        Другой воркер увидит ключ после NOTIFY, то есть через доли секунды;
+        обмены в этом окне укладываются в REUSE_GRACE.
+
+        Возвращает None, если ключ отмечен впервые, иначе — когда его
+        отметили раньше.
+        """
+        if key in self.filter:
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending[1]
+            used_at = await self._used_at(key)
+            if used_at is not None:
+                return used_at
+            # Пока ждали ответа, ключ мог отметить параллельный запрос
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending[1]
+            self.false_positives += 1
+
+        self._pending[key] = (expires_at, datetime.utcnow())
+        self._add(key)
+        self._wake.set()
+        return None
+
+    async def _used_at(self, key: str) -> Optional[datetime]:
+        self.confirmations += 1
+        async with self.engine.connect() as conn:
+            return await conn.scalar(
+                select(RevokedToken.revoked_at).where(
+                    RevokedToken.key == key,
+                    RevokedToken.expires_at > datetime.utcnow(),
+                )
+            )
+
+    async def flush(self):
+        """Запись отмеченных ключей в таблицу и рассылка их по NOTIFY."""
+        while self._pending:
+            batch = dict(list(self._pending.items())[: self.flush_size])
+            inserted = (
+                insert(RevokedToken)
+                .values(
+                    [
+                        {"key": key, "expires_at": expires_at, "revoked_at": used_at}
+                        for key, (expires_at, used_at) in batch.items()
+                    ]
+                )
+                .on_conflict_do_nothing(index_elements=[RevokedToken.key])
+                .returning(RevokedToken.key)
+                .cte("inserted")
+            )
+            async with self.engine.begin() as conn:
+                await conn.execute(
+                    select(func.pg_notify(REVOKED_TOKENS_CHANNEL, inserted.c.key))
+                )
+            for key in batch:
+                self._pending.pop(key, None)
+
+    def metrics(self) -> dict:
+        return {
+            "size_bits": self.filter.size,
+            "hashes": self.filter.hashes,
+            "entries": self.filter.count,
+            "confirmations": self.confirmations,
+            "false_positives": self.false_positives,
+            "pending": len(self._pending),
+            "flush_failures": self.flush_failures,
+        }
+
+    def _add(self, key: str):
+        self.filter.add(key)
+        if self._received is not None:
+            self._received.append(key)
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        self._add(payload)
+
+    async def reload(self):
+        self._received = []
+        try:
+            async with self.engine.connect() as conn:
+                keys = (
+                    await conn.scalars(
+                        select(RevokedToken.key).where(
+                            RevokedToken.expires_at > datetime.utcnow()
+                        )
+                    )
+                ).all()
+            rebuilt = BloomFilter(max(self.capacity, 2 * len(keys)), self.error_rate)
+            rebuilt.update(keys)
+            rebuilt.update(self._received)
+            rebuilt.update(self._pending)
+            self.filter = rebuilt
+        finally:
+            self._received = None
+
+    async def prune(self):
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+            )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.prune()
+                await self.reload()
+            except Exception:
+                logger.exception("Revoked tokens reload failed")
+
+    async def _flush_loop(self):
+        while True:
+            await self._wake.wait()
+            # Копим пачку; неудачная запись повторяется через retry_delay
+            await asyncio.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                self.flush_failures += 1
+                self._wake.set()
+                logger.exception("Used tokens flush failed")
+                await asyncio.sleep(self.retry_delay)
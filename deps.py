@@ -4,3 +4,27 @@ class SettingsMarker:
 
 class DatabaseMarker:
     pass
+
+
+class AuditSinkMarker:
+    pass
+
+
+class SecurityEpochsMarker:
+    pass
+
+
+class RateLimiterMarker:
+    pass
+
+
+class RevokedTokensMarker:
+    pass
+
+
+class CatalogMarker:
+    pass
+
+
+class NotificationListenerMarker:
+    pass
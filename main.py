@@ -6,8 +6,25 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api import router
-from deps import DatabaseMarker, SettingsMarker
+from deps import (
+    AuditSinkMarker,
+    CatalogMarker,
+    DatabaseMarker,
+    NotificationListenerMarker,
+    RateLimiterMarker,
+    RevokedTokensMarker,
+    SecurityEpochsMarker,
+    SettingsMarker,
+)
 from core.db import DatabaseHandler
+from core.db.partitions import maintain_audit_partitions
+from core.utilities.audit import AuditSink
+from core.utilities.catalog import CatalogCache
+from core.utilities.notifications import NotificationListener
+from core.utilities.password import password_hasher
+from core.utilities.read_routing import ReadRoutingMiddleware
+from core.utilities.rate_limit import MemoryTokenBuckets, PostgresTokenBuckets
+from core.utilities.security import RevokedTokens, SecurityEpochs
 import dotenv
 import os
 
@@ -18,15 +35,82 @@ from settings import Settings
 async def lifespan(app: FastAPI):
     settings = app.dependency_overrides[SettingsMarker]()
     db = DatabaseHandler(
-        url=f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.db_name}"
+        url=f"postgresql+asyncpg://{settings.db_user}:{settings.db_password}@{settings.db_host}:{settings.db_port}/{settings.db_name}",
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        statement_cache_size=settings.db_statement_cache_size,
+        replica_urls=settings.db_replica_urls,
+        replica_max_lag=settings.replica_max_lag,
+        replica_poll_interval=settings.replica_poll_interval,
+    )
+
+    audit_sink = AuditSink(
+        db.writer,
+        mode=settings.audit_sink_mode,
+        flush_size=settings.audit_flush_size,
+        flush_interval=settings.audit_flush_interval,
+        queue_size=settings.audit_queue_size,
+    )
+    db.configure_sessions(info={"audit_sink": audit_sink})
+
+    # Одно LISTEN-соединение на воркер вне пула, общее для всех каналов
+    listener = NotificationListener(db.engine.url)
+    security_epochs = SecurityEpochs(db.engine, listener)
+    catalog = CatalogCache(db.engine, listener)
+    revoked_tokens = RevokedTokens(
+        db.engine, listener, capacity=settings.revoked_tokens_capacity
+    )
+    rate_limiter = (
+        PostgresTokenBuckets(db.writer)
+        if settings.rate_limit_backend == "postgres"
+        else MemoryTokenBuckets()
     )
 
-    app.dependency_overrides.update({DatabaseMarker: lambda: db})
-    await db.init()
+    app.dependency_overrides.update(
+        {
+            DatabaseMarker: lambda: db,
+            AuditSinkMarker: lambda: audit_sink,
+            SecurityEpochsMarker: lambda: security_epochs,
+            CatalogMarker: lambda: catalog,
+            RevokedTokensMarker: lambda: revoked_tokens,
+            RateLimiterMarker: lambda: rate_limiter,
+            NotificationListenerMarker: lambda: listener,
+        }
+    )
+    password_hasher.configure(
+        max_workers=settings.password_hash_workers,
+        max_wait=settings.password_hash_max_wait,
+    )
+    await password_hasher.start()
+    await password_hasher.calibrate(settings.password_hash_target_ms / 1000)
+
+    await db.init(audit_partitions_ahead=settings.audit_partitions_ahead)
+    await audit_sink.start()
+    await security_epochs.start()
+    await revoked_tokens.start()
+    await catalog.start()
+    await listener.start()
+    partitions_task = asyncio.create_task(
+        maintain_audit_partitions(db.engine, settings.audit_partitions_ahead)
+    )
 
     yield
 
+    partitions_task.cancel()
+    try:
+        await partitions_task
+    except asyncio.CancelledError:
+        pass
+    await listener.stop()
+    await catalog.stop()
+    await revoked_tokens.stop()
+    await security_epochs.stop()
+    await audit_sink.stop()
     await db.close_connection()
+    await password_hasher.stop()
 
 
 def register_app(settings: Settings) -> FastAPI:
@@ -35,6 +119,11 @@ def register_app(settings: Settings) -> FastAPI:
 
     app.dependency_overrides.update({SettingsMarker: lambda: settings})
 
+    app.add_middleware(
+        ReadRoutingMiddleware,
+        sticky_seconds=settings.replica_sticky_seconds,
+        secure=settings.is_prod,
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_allowed_origins,
@@ -61,6 +150,31 @@ settings = Settings(
         "JWT_SECRET", "VSJntWUYE_Gw(L;M[=$cDbdrC`p,>8a4Q^e.Hx}9jq&?*g+sKy"
     ),
     is_prod=os.getenv("IS_PROD", True),
+    db_pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+    db_max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    db_pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    db_pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "-1")),
+    db_pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+    db_statement_cache_size=int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")),
+    db_replica_urls=[
+        url.strip()
+        for url in os.getenv("DB_REPLICA_URLS", "").split(",")
+        if url.strip()
+    ],
+    replica_max_lag=float(os.getenv("REPLICA_MAX_LAG", "5")),
+    replica_poll_interval=float(os.getenv("REPLICA_POLL_INTERVAL", "1")),
+    replica_sticky_seconds=float(os.getenv("REPLICA_STICKY_SECONDS", "7")),
+    audit_sink_mode=os.getenv("AUDIT_SINK_MODE", "sync"),
+    audit_retention_months=int(os.getenv("AUDIT_RETENTION_MONTHS", "12")),
+    audit_archive_dir=os.getenv("AUDIT_ARCHIVE_DIR", "archive/audit_log"),
+    password_hash_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+    rate_limit_backend=os.getenv("RATE_LIMIT_BACKEND", "memory"),
+    # По умолчанию — loopback и сети docker, где стоит nginx из docker-compose
+    trusted_proxies=[
+        proxy.strip()
+        for proxy in os.getenv("TRUSTED_PROXIES", "127.0.0.1,172.16.0.0/12").split(",")
+        if proxy.strip()
+    ],
 )
 
 app = register_app(settings=settings)
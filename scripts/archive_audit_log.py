@@ -0,0 +1,104 @@
+"""
+Архивация старых секций audit_log.
+
+    python -m scripts.archive_audit_log --keep-months 12
+
+Секции старше ``--keep-months`` месяцев отсоединяются от audit_log,
+выгружаются в ``<archive-dir>/audit_log_yYYYYmMM.jsonl.gz`` (рядом —
+индекс по абитуриентам ``.index.json``) и удаляются.
+Если прошлый запуск упал после DETACH, отсоединённые секции дорабатываются
+при следующем. Архив читается API по ``include_archived=true``.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import dotenv
+from sqlalchemy import column, select, table, text
+
+from core.db import DatabaseHandler
+from core.db.models import AuditLog
+from core.db.partitions import (
+    add_months,
+    attached_audit_partitions,
+    audit_partition_month,
+    detached_audit_partitions,
+    month_start,
+)
+from core.utilities.audit_archive import AuditArchive
+
+EXPORT_BATCH_SIZE = 10_000
+
+
+def _partition_table(name: str):
+    # Та же схема, что у audit_log, — чтобы enum и JSON разбирались типами
+    return table(
+        name, *(column(col.name, col.type) for col in AuditLog.__table__.columns)
+    )
+
+
+async def archive_partition(db: DatabaseHandler, archive: AuditArchive, name: str):
+    partition = _partition_table(name)
+    stmt = select(partition).order_by(partition.c.changed_at, partition.c.id)
+
+    async with db.engine.connect() as conn:
+        result = await conn.stream(
+            stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        with archive.writer(name) as write:
+            async for rows in result.partitions():
+                write(dict(row._mapping) for row in rows)
+
+    async with db.engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE {name}"))
+
+
+async def main(args: argparse.Namespace) -> int:
+    cutoff = add_months(month_start(datetime.utcnow().date()), -args.keep_months)
+    archive = AuditArchive(args.archive_dir)
+    db = DatabaseHandler(url=args.url)
+    try:
+        async with db.engine.begin() as conn:
+            for name in await attached_audit_partitions(conn):
+                if audit_partition_month(name) < cutoff:
+                    await conn.execute(
+                        text(f"ALTER TABLE {AuditLog.__tablename__} DETACH PARTITION {name}")
+                    )
+                    print(f"detached {name}")
+
+        async with db.engine.connect() as conn:
+            pending = await detached_audit_partitions(conn)
+
+        for name in pending:
+            await archive_partition(db, archive, name)
+            print(f"archived {name} -> {archive.path(name)}")
+    finally:
+        await db.close_connection()
+    return 0
+
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--keep-months",
+        type=int,
+        default=int(os.getenv("AUDIT_RETENTION_MONTHS", "12")),
+        help="сколько месяцев держать в живых секциях",
+    )
+    parser.add_argument(
+        "--archive-dir",
+        default=os.getenv("AUDIT_ARCHIVE_DIR", "archive/audit_log"),
+    )
+    parser.add_argument(
+        "--url",
+        default=(
+            f"postgresql+asyncpg://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+            f"@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '5432')}"
+            f"/{os.getenv('DB_NAME')}"
+        ),
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,145 @@
+"""
+Сравнение стоимости страницы списка абитуриентов на элемент.
+
+"before" — прежний путь: ``select(Applicant)`` с ORM-объектами, затем то,
+что FastAPI делает с ``response_model``: валидация каждого элемента схемой
+из атрибутов, dump в JSON-типы и ``json.dumps``. "after" — текущий сервис:
+строки ``Row`` только с нужными колонками и ``RowsJSONResponse`` (orjson).
+
+Нужна база, в которой абитуриентов не меньше ``--page-size``, например
+наполненная ``python -m scripts.check_query_plans --seed``:
+
+    python -m scripts.bench_serialization --page-size 1000 --repeat 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import dotenv
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import JSONResponse
+
+from api.v1.services.applicant import ApplicantService
+from core.db import DatabaseHandler
+from core.db.models import Applicant
+from core.request_models.applicant import ApplicantFilterRequest
+from core.responce_models.applicant import ApplicantPaginatedResponse
+from core.utilities.pagination import paginate_query
+from core.utilities.responses import RowsJSONResponse
+
+PAGE_SCHEMA = TypeAdapter(ApplicantPaginatedResponse)
+
+
+async def fetch_orm(session: AsyncSession, page_size: int) -> dict:
+    stmt = ApplicantService.filter_applicants(
+        select(Applicant), ApplicantFilterRequest()
+    )
+    return await paginate_query(
+        session, stmt, order_by=(Applicant.id,), page_size=page_size
+    )
+
+
+def render_validated(page: dict) -> bytes:
+    model = PAGE_SCHEMA.validate_python(page, from_attributes=True)
+    return JSONResponse(PAGE_SCHEMA.dump_python(model, mode="json")).body
+
+
+async def fetch_rows(session: AsyncSession, page_size: int) -> dict:
+    return await ApplicantService.get_applicants_paginated(
+        session, page_size=page_size
+    )
+
+
+def render_rows(page: dict) -> bytes:
+    return RowsJSONResponse(page).body
+
+
+async def measure(
+    db: DatabaseHandler,
+    fetch: Callable[[AsyncSession, int], Awaitable[dict]],
+    render: Callable[[dict], bytes],
+    page_size: int,
+    repeat: int,
+) -> Dict[str, float]:
+    fetch_us: List[float] = []
+    render_us: List[float] = []
+    for _ in range(repeat):
+        # Новая сессия на каждый прогон: identity map не должна отдавать
+        # уже загруженные объекты
+        async with db.sessionmaker() as session:
+            started = time.perf_counter()
+            page = await fetch(session, page_size)
+            fetched = time.perf_counter()
+            render(page)
+            rendered = time.perf_counter()
+        items = len(page["items"])
+        fetch_us.append((fetched - started) * 1e6 / items)
+        render_us.append((rendered - fetched) * 1e6 / items)
+
+    fetch_median = statistics.median(fetch_us)
+    render_median = statistics.median(render_us)
+    return {
+        "fetch": fetch_median,
+        "serialize": render_median,
+        "total": fetch_median + render_median,
+    }
+
+
+async def main(args: argparse.Namespace) -> int:
+    db = DatabaseHandler(url=args.url)
+    try:
+        async with db.sessionmaker() as session:
+            count = await session.scalar(select(func.count()).select_from(Applicant))
+        if count < args.page_size:
+            print(
+                f"need at least {args.page_size} applicants, found {count}",
+                file=sys.stderr,
+            )
+            return 1
+
+        results = {}
+        for name, fetch, render in (
+            ("before", fetch_orm, render_validated),
+            ("after", fetch_rows, render_rows),
+        ):
+            # Прогрев: подготовленные выражения и ленивые импорты
+            await measure(db, fetch, render, args.page_size, 2)
+            results[name] = await measure(
+                db, fetch, render, args.page_size, args.repeat
+            )
+    finally:
+        await db.close_connection()
+
+    print(f"median per item, page of {args.page_size}, {args.repeat} runs")
+    print(f"{'':8}{'fetch, us':>12}{'serialize, us':>16}{'total, us':>12}")
+    for name, result in results.items():
+        print(
+            f"{name:8}{result['fetch']:12.2f}{result['serialize']:16.2f}"
+            f"{result['total']:12.2f}"
+        )
+    speedup = results["before"]["total"] / results["after"]["total"]
+    print(f"speedup: {speedup:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--url",
+        default=(
+            f"postgresql+asyncpg://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+            f"@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '5432')}"
+            f"/{os.getenv('DB_NAME')}"
+        ),
+    )
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,339 @@
+"""
+Проверка планов запросов сервисного слоя.
+
+Скрипт (опционально) наполняет локальную базу большим объёмом данных,
+выполняет методы сервисов, перехватывает их SQL и прогоняет каждый запрос
+через ``EXPLAIN (ANALYZE, FORMAT JSON)``. Если в плане встречается
+``Seq Scan`` по большой таблице или запрос прочитал из больших таблиц больше
+``MAX_ROWS_READ`` строк (например, прошёл индекс сортировки целиком,
+отбрасывая строки фильтром), скрипт завершается с кодом 1.
+
+Запуск (только на отдельной, тестовой базе — ``--seed`` очищает таблицы):
+
+    python -m scripts.check_query_plans --seed --applicants 200000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Tuple
+
+import dotenv
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.v1.services.applicant import ApplicantService
+from api.v1.services.auditlog import AuditLogService
+from api.v1.services.comment import CommentService
+from api.v1.services.exam import ExamService
+from api.v1.services.speciality import SpecialtyService
+from api.v1.services.user import UserService
+from core.db import DatabaseHandler
+from core.db.migrations import migrate
+from core.db.partitions import ensure_audit_partitions
+from core.request_models.applicant import ApplicantFilterRequest, ApplicantSortKey
+from core.request_models.auditlog import AuditLogQueryRequest
+
+# Таблицы, в которых строк больше порога, считаются "большими"
+LARGE_TABLE_ROWS = 10_000
+# Сколько строк больших таблиц может прочитать один запрос страницы
+MAX_ROWS_READ = 2_000
+
+SEED_SQL = [
+    """
+    TRUNCATE audit_log, comments, applicant_specialties, specialty_exams,
+        applicants, specialties, exams, users RESTART IDENTITY CASCADE
+    """,
+    """
+    INSERT INTO users (username, password_hash, role, is_active, created_at)
+    SELECT 'user_' || g, 'x',
+        (ARRAY['admin', 'editor', 'viewer']::userrole[])[1 + g % 3],
+        true, now()
+    FROM generate_series(1, 1000) AS g
+    """,
+    """
+    INSERT INTO specialties (name, code, faculty, degree_level)
+    SELECT 'Specialty ' || g, 'S' || g, 'Faculty ' || (g % 10), 'bachelor'
+    FROM generate_series(1, 200) AS g
+    """,
+    """
+    INSERT INTO exams (name, type, min_score)
+    SELECT 'Exam ' || g,
+        (ARRAY['utbk', 'tes_mandiri', 'interview', 'portfolio',
+               'international']::examtype[])[1 + g % 5],
+        g % 100
+    FROM generate_series(1, 50) AS g
+    """,
+    """
+    INSERT INTO specialty_exams (specialty_id, exam_id, required_score)
+    SELECT s, 1 + (s + k) % 50, 60
+    FROM generate_series(1, 200) AS s, generate_series(0, 2) AS k
+    """,
+    """
+    INSERT INTO applicants (
+        first_name, last_name, middle_name, phone_number, email, national_id,
+        passport_number, citizenship, birth_date, gender, registration_date,
+        intake_period, status, created_at, updated_at
+    )
+    SELECT 'First' || g, 'Last' || g, NULL, '+7900' || lpad(g::text, 7, '0'),
+        'applicant' || g || '@example.com', 'NID' || g, 'P' || g,
+        -- Гражданства и наборы неравномерны, как в реальных данных:
+        -- KZ — 1%, каждый набор — около 8%
+        CASE g % 100 WHEN 0 THEN 'KZ' WHEN 1 THEN 'UZ' WHEN 2 THEN 'ID'
+            ELSE 'RU' END,
+        date '2000-01-01' + (g % 3000),
+        (ARRAY['male', 'female'])[1 + g % 2],
+        now() - make_interval(secs => g),
+        (2020 + g % 6) || (ARRAY['-spring', '-fall'])[1 + g / 7 % 2],
+        (ARRAY['new', 'in_progress', 'admitted',
+               'rejected']::applicantstatus[])[1 + g % 4],
+        now() - make_interval(secs => g), now()
+    FROM generate_series(1, :applicants) AS g
+    """,
+    """
+    INSERT INTO applicant_specialties (applicant_id, specialty_id, priority)
+    SELECT g, 1 + g % 200, 1 FROM generate_series(1, :applicants) AS g
+    """,
+    """
+    INSERT INTO comments (applicant_id, user_id, text, created_at)
+    SELECT 1 + g % :applicants, 1 + g % 1000, 'Comment ' || g,
+        now() - make_interval(secs => g)
+    FROM generate_series(1, :applicants * 2) AS g
+    """,
+    """
+    INSERT INTO audit_log (
+        applicant_id, changed_by_user_id, change_type, action,
+        before_data, after_data, changed_at
+    )
+    SELECT 1 + g % :applicants, 1 + g % 1000, 'applicant_data', 'update',
+        '{"status": "new"}', '{"status": "in_progress"}',
+        now() - make_interval(secs => g)
+    FROM generate_series(1, :applicants * 3) AS g
+    """,
+    "ANALYZE",
+]
+
+Case = Tuple[str, Callable[[AsyncSession], Awaitable]]
+
+CASES: List[Case] = [
+    ("ApplicantService.get_applicant", lambda s: ApplicantService.get_applicant(s, 1)),
+    (
+        "ApplicantService.get_applicant_timeline",
+        lambda s: ApplicantService.get_applicant_timeline(s, 1),
+    ),
+    (
+        "ApplicantService.get_applicants_paginated",
+        lambda s: ApplicantService.get_applicants_paginated(s, 1, 20),
+    ),
+    (
+        "CommentService.get_comments_paginated",
+        lambda s: CommentService.get_comments_paginated(s, applicant_id=1),
+    ),
+    (
+        "AuditLogService.get_applicant_audit_logs_paginated",
+        lambda s: AuditLogService.get_applicant_audit_logs_paginated(
+            s, applicant_id=1
+        ),
+    ),
+    ("AuditLogService.get_audit_log", lambda s: AuditLogService.get_audit_log(s, 1)),
+    (
+        "AuditLogService.query_audit_logs[new_value]",
+        lambda s: AuditLogService.query_audit_logs(
+            s, AuditLogQueryRequest(field="status", new_value="rejected")
+        ),
+    ),
+    (
+        "AuditLogService.query_audit_logs[user]",
+        lambda s: AuditLogService.query_audit_logs(
+            s, AuditLogQueryRequest(changed_by_user_id=7)
+        ),
+    ),
+    ("ExamService.get_exams_paginated", lambda s: ExamService.get_exams_paginated(s)),
+    (
+        "SpecialtyService.get_specialties_paginated",
+        lambda s: SpecialtyService.get_specialties_paginated(s),
+    ),
+    (
+        "ApplicantService.search_applicants[name]",
+        lambda s: ApplicantService.search_applicants(s, "Last1234"),
+    ),
+    (
+        "ApplicantService.search_applicants[phone]",
+        lambda s: ApplicantService.search_applicants(s, "0012345"),
+    ),
+    ("UserService.get_user", lambda s: UserService.get_user(s, 1)),
+    (
+        "UserService.get_users_paginated",
+        lambda s: UserService.get_users_paginated(s, 1, 20),
+    ),
+]
+
+# Значения фильтров, которые точно есть в засеянных данных
+APPLICANT_FILTER_SAMPLES = {
+    "status": "admitted",
+    "intake_period": "2025-fall",
+    "citizenship": "KZ",
+    "gender": "female",
+    "specialty_id": 7,
+}
+
+
+def _applicant_list_case(filters: ApplicantFilterRequest, sort: ApplicantSortKey):
+    return lambda s: ApplicantService.get_applicants_paginated(
+        s, filters=filters, sort=sort
+    )
+
+
+for _column, _value in APPLICANT_FILTER_SAMPLES.items():
+    for _sort in ApplicantSortKey:
+        CASES.append(
+            (
+                f"ApplicantService.get_applicants_paginated[{_column}, {_sort.value}]",
+                _applicant_list_case(
+                    ApplicantFilterRequest(**{_column: _value}), _sort
+                ),
+            )
+        )
+
+# Несколько фильтров сразу и диапазон дат регистрации
+for _sort in ApplicantSortKey:
+    CASES.append(
+        (
+            f"ApplicantService.get_applicants_paginated[all, {_sort.value}]",
+            _applicant_list_case(
+                ApplicantFilterRequest(**APPLICANT_FILTER_SAMPLES), _sort
+            ),
+        )
+    )
+    CASES.append(
+        (
+            f"ApplicantService.get_applicants_paginated[registered, {_sort.value}]",
+            _applicant_list_case(
+                ApplicantFilterRequest(
+                    registered_from=datetime.utcnow() - timedelta(days=1)
+                ),
+                _sort,
+            ),
+        )
+    )
+
+
+def _seq_scans(plan: dict):
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+def _rows_read(plan: dict, tables: set) -> float:
+    # Строки, которые узлы сканирования больших таблиц достали и отбросили
+    rows = 0
+    if plan.get("Relation Name") in tables:
+        rows = (
+            plan.get("Actual Rows", 0)
+            + plan.get("Rows Removed by Filter", 0)
+            + plan.get("Rows Removed by Index Recheck", 0)
+        ) * plan.get("Actual Loops", 1)
+    return rows + sum(_rows_read(child, tables) for child in plan.get("Plans", []))
+
+
+async def _large_tables(db: DatabaseHandler) -> set:
+    async with db.engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT relname FROM pg_class "
+                "WHERE relkind = 'r' AND reltuples > :rows "
+                "AND relnamespace = 'public'::regnamespace"
+            ),
+            {"rows": LARGE_TABLE_ROWS},
+        )
+        return set(result.scalars().all())
+
+
+async def seed(db: DatabaseHandler, applicants: int):
+    await migrate(db.engine)
+    async with db.engine.begin() as conn:
+        # Засеянный аудит уходит в прошлое на несколько дней
+        await ensure_audit_partitions(conn, months_back=1)
+        for statement in SEED_SQL:
+            if ":applicants" in statement:
+                await conn.execute(text(statement), {"applicants": applicants})
+            else:
+                await conn.execute(text(statement))
+
+
+async def check(db: DatabaseHandler) -> List[str]:
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    large_tables = await _large_tables(db)
+    failures = []
+
+    event.listen(db.engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        for name, case in CASES:
+            captured.clear()
+            async with db.sessionmaker() as session:
+                await case(session)
+            statements = list(captured)
+
+            async with db.engine.connect() as conn:
+                for statement, parameters in statements:
+                    result = await conn.exec_driver_sql(
+                        "EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters
+                    )
+                    plan = result.scalar()
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    scans = set(_seq_scans(plan[0]["Plan"])) & large_tables
+                    rows = round(_rows_read(plan[0]["Plan"], large_tables))
+                    status = "FAIL" if scans or rows > MAX_ROWS_READ else "ok"
+                    print(
+                        f"[{status}] {name} ({rows} rows): "
+                        f"{' '.join(statement.split())[:100]}"
+                    )
+                    if scans:
+                        tables = ", ".join(sorted(scans))
+                        failures.append(f"{name}: Seq Scan on {tables}")
+                    elif rows > MAX_ROWS_READ:
+                        failures.append(f"{name}: read {rows} rows")
+    finally:
+        event.remove(db.engine.sync_engine, "before_cursor_execute", capture)
+
+    return failures
+
+
+async def main(args: argparse.Namespace) -> int:
+    db = DatabaseHandler(url=args.url)
+    try:
+        if args.seed:
+            await seed(db, args.applicants)
+        failures = await check(db)
+    finally:
+        await db.close_connection()
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--url",
+        default=(
+            f"postgresql+asyncpg://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+            f"@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '5432')}"
+            f"/{os.getenv('DB_NAME')}"
+        ),
+    )
+    parser.add_argument("--seed", action="store_true")
+    parser.add_argument("--applicants", type=int, default=200_000)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,61 @@
+"""
+Массовый импорт абитуриентов из CSV/JSONL.
+
+    python -m scripts.import_applicants applicants.csv --user-id 1
+
+Файл читается потоково, строки загружаются пачками через COPY, в конце
+печатается JSON-отчёт: количество загруженных строк и ошибки по номерам строк.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+import dotenv
+
+from api.v1.services.applicant_import import ApplicantImportService, iter_rows
+from core.db import DatabaseHandler
+from core.request_models.applicant import ApplicantFileFormat
+
+
+async def main(args: argparse.Namespace) -> int:
+    file_format = ApplicantFileFormat(
+        args.format or ("jsonl" if args.path.endswith(".jsonl") else "csv")
+    )
+    db = DatabaseHandler(url=args.url)
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            async with db.sessionmaker() as session:
+                report = await ApplicantImportService.import_applicants(
+                    session=session,
+                    rows=iter_rows(stream, file_format),
+                    imported_by_id=args.user_id,
+                    batch_size=args.batch_size,
+                )
+    finally:
+        await db.close_connection()
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=[f.value for f in ApplicantFileFormat])
+    parser.add_argument(
+        "--user-id", type=int, required=True, help="автор записей аудита"
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--url",
+        default=(
+            f"postgresql+asyncpg://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+            f"@{os.getenv('DB_HOST', 'localhost')}:{os.getenv('DB_PORT', '5432')}"
+            f"/{os.getenv('DB_NAME')}"
+        ),
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
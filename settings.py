@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List
 
 
@@ -15,3 +15,47 @@ class Settings:
     jwt_secret_key: str
     is_prod: bool = True
     deposit_fee: float = 5.0
+    # Пул соединений каждого воркера: всего до workers * (size + overflow)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = 100
+    # Реплики для чтения; пусто — всё читается с primary
+    db_replica_urls: List[str] = field(default_factory=list)
+    # Реплика, отставшая сильнее, не используется
+    replica_max_lag: float = 5.0
+    replica_poll_interval: float = 1.0
+    # Сколько секунд после изменения клиент читает с primary; не меньше
+    # max_lag + poll_interval, иначе годная реплика может не видеть запись
+    replica_sticky_seconds: float = 7.0
+    audit_sink_mode: str = "sync"
+    audit_flush_size: int = 500
+    audit_flush_interval: float = 1.0
+    audit_queue_size: int = 100_000
+    audit_partitions_ahead: int = 3
+    audit_retention_months: int = 12
+    audit_archive_dir: str = "archive/audit_log"
+    password_hash_workers: int = 2
+    password_hash_max_wait: float = 5.0
+    # Целевое время одного хэша argon2 для калибровки при старте
+    password_hash_target_ms: float = 50.0
+    # memory — лимиты в каждом воркере свои, postgres — общие
+    rate_limit_backend: str = "memory"
+    login_limit_per_username: int = 5
+    login_limit_per_ip: int = 20
+    # Попыток входа в минуту после исчерпания всплеска
+    login_refill_per_minute: float = 5.0
+    # Прокси, которым верим X-Forwarded-For (адреса или сети), например nginx
+    trusted_proxies: List[str] = field(default_factory=list)
+    # Ожидаемое число отозванных, ещё не истёкших refresh-токенов (фильтр Блума)
+    revoked_tokens_capacity: int = 100_000
+
+    def __post_init__(self):
+        # Окно чтения с primary должно перекрывать допустимое отставание
+        # реплики и интервал его опроса
+        self.replica_sticky_seconds = max(
+            self.replica_sticky_seconds,
+            self.replica_max_lag + self.replica_poll_interval,
+        )
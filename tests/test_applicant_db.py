@@ -0,0 +1,292 @@
+"""
+Смоук-тесты импорта, ленты и массовой смены статуса на настоящей БД
+(см. TEST_DATABASE_URL в conftest.py).
+"""
+
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from api.v1.services.applicant import ApplicantService
+from api.v1.services.applicant_import import (
+    DUPLICATE_ERROR,
+    ApplicantImportService,
+    iter_rows,
+)
+from core.db.crud import unit_of_work
+from core.db.models import (
+    ActionType,
+    Applicant,
+    ApplicantStatus,
+    AuditLog,
+    ChangeType,
+    Comment,
+    UserRole,
+)
+from core.request_models.applicant import (
+    ApplicantFileFormat,
+    ApplicantFilterRequest,
+    ApplicantStatus as RequestStatus,
+)
+from core.utilities.audit import log_changes, set_audit_user
+from core.utilities.security import CurrentUser
+
+
+def _national_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+async def _import(db, user, intake, text, file_format=ApplicantFileFormat.csv):
+    async with db.sessionmaker() as session:
+        return await ApplicantImportService.import_applicants(
+            session=session,
+            rows=iter_rows(io.StringIO(text), file_format),
+            imported_by_id=user.id,
+            batch_size=2,
+        )
+
+
+async def _applicants(db, intake) -> list:
+    async with db.sessionmaker() as session:
+        return (
+            await session.scalars(
+                select(Applicant)
+                .where(Applicant.intake_period == intake)
+                .order_by(Applicant.id)
+            )
+        ).all()
+
+
+async def _create_applicants(db, user, intake, *statuses) -> list:
+    async with db.sessionmaker() as session, unit_of_work(session):
+        set_audit_user(session, user.id)
+        applicants = [
+            Applicant(first_name=f"A{i}", intake_period=intake, status=status)
+            for i, status in enumerate(statuses)
+        ]
+        session.add_all(applicants)
+    return applicants
+
+
+# ---------- Импорт ----------
+
+
+async def test_import_csv_reports_invalid_and_duplicate_rows(db, user, intake):
+    taken = _national_id()
+    await _import(
+        db, user, intake, f"first_name,national_id,intake_period\nX,{taken},{intake}\n"
+    )
+
+    first, second = _national_id(), _national_id()
+    report = await _import(
+        db,
+        user,
+        intake,
+        "first_name,email,national_id,intake_period\n"
+        f"Alua,,{first},{intake}\n"
+        f",,{_national_id()},{intake}\n"
+        f"Dana,not-an-email,,{intake}\n"
+        f"Copy,,{first},{intake}\n"
+        f"Taken,,{taken},{intake}\n"
+        f"Erlan,,{second},{intake}\n",
+    )
+
+    assert report["imported"] == 2
+    errors = {error["row"]: error["error"] for error in report["errors"]}
+    assert sorted(errors) == [2, 3, 4, 5]
+    assert errors[2].startswith("first_name")
+    assert errors[3].startswith("email")
+    assert errors[4] == errors[5] == DUPLICATE_ERROR
+
+    applicants = await _applicants(db, intake)
+    assert [a.national_id for a in applicants] == [taken, first, second]
+    assert all(a.status == ApplicantStatus.new for a in applicants)
+
+    async with db.sessionmaker() as session:
+        audited = (
+            await session.scalars(
+                select(AuditLog.applicant_id).where(
+                    AuditLog.applicant_id.in_([a.id for a in applicants]),
+                    AuditLog.action == ActionType.create,
+                    AuditLog.changed_by_user_id == user.id,
+                )
+            )
+        ).all()
+    assert sorted(audited) == [a.id for a in applicants]
+
+
+async def test_import_jsonl_falls_back_to_rows(db, user, intake):
+    # NUL проходит валидацию, но не COPY: пачка грузится построчно,
+    # и в отчёт попадает только отвергнутая строка
+    rows = [
+        {"first_name": "Aigerim", "intake_period": intake},
+        {"first_name": "Bad\x00name", "intake_period": intake},
+        {"first_name": "Cyrus", "intake_period": intake},
+    ]
+    text = "\n".join(json.dumps(row) for row in rows) + "\n{broken\n"
+
+    report = await _import(db, user, intake, text, ApplicantFileFormat.jsonl)
+
+    assert report["imported"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 4]
+    assert [a.first_name for a in await _applicants(db, intake)] == [
+        "Aigerim",
+        "Cyrus",
+    ]
+
+
+# ---------- Лента ----------
+
+
+async def test_timeline_pages_merge_comments_and_audit(db, user, intake):
+    (applicant,) = await _create_applicants(db, user, intake, ApplicantStatus.new)
+    # audit_log секционирован по месяцам: метки времени не раньше текущего
+    now = datetime.utcnow().replace(microsecond=0)
+    same = now + timedelta(minutes=1)
+
+    async with db.sessionmaker() as session, unit_of_work(session):
+        session.add_all(
+            Comment(
+                applicant_id=applicant.id, user_id=user.id, text=str(i), created_at=ts
+            )
+            for i, ts in enumerate([same, same, now + timedelta(minutes=2), now])
+        )
+        await log_changes(
+            session,
+            [
+                {
+                    "applicant_id": applicant.id,
+                    "changed_by_user_id": user.id,
+                    "change_type": ChangeType.status,
+                    "action": ActionType.update,
+                    "before_data": None,
+                    "after_data": {"step": i},
+                    "changed_at": ts,
+                }
+                for i, ts in enumerate([same, same, now + timedelta(minutes=3)])
+            ],
+        )
+
+    async with db.sessionmaker() as session:
+        full = await ApplicantService.get_applicant_timeline(
+            session, applicant.id, page_size=100
+        )
+        keys = [(item["timestamp"], item["kind"], item["id"]) for item in full["items"]]
+        # + запись о создании абитуриента
+        assert len(keys) == 8
+        assert keys == sorted(keys, reverse=True)
+        assert full["next_page"] is False
+
+        for page_size in (1, 2, 3):
+            walked, cursor = [], None
+            while True:
+                page = await ApplicantService.get_applicant_timeline(
+                    session, applicant.id, page_size=page_size, cursor=cursor
+                )
+                assert len(page["items"]) <= page_size
+                walked += [
+                    (item["timestamp"], item["kind"], item["id"])
+                    for item in page["items"]
+                ]
+                if not page["next_page"]:
+                    break
+                cursor = page["next_cursor"]
+            assert walked == keys
+
+
+async def test_timeline_of_missing_applicant(db):
+    async with db.sessionmaker() as session:
+        with pytest.raises(HTTPException) as error:
+            await ApplicantService.get_applicant_timeline(session, -1)
+    assert error.value.status_code == 404
+
+
+# ---------- Массовая смена статуса ----------
+
+
+async def test_bulk_status_by_filter(db, user, intake):
+    applicants = await _create_applicants(
+        db,
+        user,
+        intake,
+        ApplicantStatus.new,
+        ApplicantStatus.in_progress,
+        ApplicantStatus.admitted,
+    )
+    admin = CurrentUser(id=user.id, role=UserRole.admin, security_epoch=0)
+
+    async with db.sessionmaker() as session, unit_of_work(session):
+        result = await ApplicantService.bulk_update_status(
+            session,
+            status=RequestStatus.admitted,
+            updated_by=admin,
+            filters=ApplicantFilterRequest(intake_period=intake),
+        )
+    assert result == {"updated": 2}
+
+    updated = await _applicants(db, intake)
+    assert {a.status for a in updated} == {ApplicantStatus.admitted}
+    # Уже зачисленный не тронут: версия не изменилась
+    assert [a.version for a in updated] == [2, 2, 1]
+
+    async with db.sessionmaker() as session:
+        audit = (
+            await session.execute(
+                select(AuditLog.applicant_id, AuditLog.before_data, AuditLog.after_data)
+                .where(
+                    AuditLog.applicant_id.in_([a.id for a in applicants]),
+                    AuditLog.change_type == ChangeType.status,
+                )
+                .order_by(AuditLog.applicant_id)
+            )
+        ).all()
+    assert audit == [
+        (applicants[0].id, {"status": "new"}, {"status": "admitted"}),
+        (applicants[1].id, {"status": "in_progress"}, {"status": "admitted"}),
+    ]
+
+
+async def test_bulk_status_by_ids(db, user, intake):
+    applicants = await _create_applicants(
+        db, user, intake, ApplicantStatus.new, ApplicantStatus.new
+    )
+    admin = CurrentUser(id=user.id, role=UserRole.admin, security_epoch=0)
+
+    async with db.sessionmaker() as session, unit_of_work(session):
+        result = await ApplicantService.bulk_update_status(
+            session,
+            status=RequestStatus.rejected,
+            updated_by=admin,
+            ids=[applicants[1].id],
+        )
+    assert result == {"updated": 1}
+    assert [a.status for a in await _applicants(db, intake)] == [
+        ApplicantStatus.new,
+        ApplicantStatus.rejected,
+    ]
+
+
+@pytest.mark.parametrize(
+    "role, ids, filters, status_code",
+    [
+        (UserRole.editor, [1], None, 403),
+        (UserRole.admin, None, None, 400),
+        (UserRole.admin, None, ApplicantFilterRequest(), 400),
+    ],
+)
+async def test_bulk_status_rejected(db, role, ids, filters, status_code):
+    async with db.sessionmaker() as session:
+        with pytest.raises(HTTPException) as error:
+            await ApplicantService.bulk_update_status(
+                session,
+                status=RequestStatus.admitted,
+                updated_by=CurrentUser(id=1, role=role, security_epoch=0),
+                ids=ids,
+                filters=filters,
+            )
+    assert error.value.status_code == status_code
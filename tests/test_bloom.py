@@ -0,0 +1,28 @@
+from core.utilities.bloom import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    keys = [f"jti-{i}" for i in range(1000)]
+    bloom.update(keys)
+    assert all(key in bloom for key in keys)
+    assert bloom.count == 1000
+
+
+def test_empty_filter_contains_nothing():
+    bloom = BloomFilter(capacity=100)
+    assert "jti-1" not in bloom
+
+
+def test_false_positive_rate_close_to_error_rate():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    bloom.update(f"used-{i}" for i in range(10_000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(20_000))
+    assert false_positives / 20_000 < 0.02
+
+
+def test_size_follows_capacity_and_error_rate():
+    small = BloomFilter(capacity=1000, error_rate=0.01)
+    assert small.size >= 9585
+    assert small.hashes == 7
+    assert BloomFilter(capacity=1000, error_rate=0.001).size > small.size
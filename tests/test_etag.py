@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from core.utilities.etag import entity_etag, etag_matches, not_modified, page_etag
+
+
+def _request(if_none_match=None) -> Request:
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "headers": headers})
+
+
+def _page(*versions, next_page=False, next_cursor=None) -> dict:
+    items = [SimpleNamespace(id=i, version=v) for i, v in enumerate(versions, 1)]
+    return {"items": items, "next_page": next_page, "next_cursor": next_cursor}
+
+
+def test_entity_etag_changes_with_version():
+    assert entity_etag(5, 1) == '"5-1"'
+    assert entity_etag(5, 1) != entity_etag(5, 2)
+
+
+def test_page_etag_is_weak_and_stable():
+    etag = page_etag(_page(1, 1))
+    assert etag.startswith('W/"')
+    assert page_etag(_page(1, 1)) == etag
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        _page(1, 2),
+        _page(1),
+        _page(1, 1, 1),
+        _page(1, 1, next_page=True, next_cursor="abc"),
+    ],
+)
+def test_page_etag_changes_with_page(changed):
+    assert page_etag(changed) != page_etag(_page(1, 1))
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, False),
+        ('"5-1"', True),
+        ('W/"5-1"', True),
+        ('"4-1", "5-1"', True),
+        ('"5-2"', False),
+        ("*", True),
+    ],
+)
+def test_etag_matches(header, expected):
+    assert etag_matches(_request(header), '"5-1"') is expected
+
+
+def test_etag_matches_weak_page_etag():
+    etag = page_etag(_page(1))
+    assert etag_matches(_request(etag), etag)
+    assert etag_matches(_request(etag.removeprefix("W/")), etag)
+
+
+def test_etag_without_value_never_matches():
+    assert etag_matches(_request("*"), None) is False
+
+
+def test_not_modified():
+    response = not_modified('"5-1"')
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"5-1"'
+    assert response.body == b""
@@ -0,0 +1,120 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from core.db.models import Applicant, User
+from core.utilities.pagination import decode_cursor, encode_cursor, paginate_items
+
+ORDER_BY = (Applicant.first_name, Applicant.id)
+
+
+def _items(*names):
+    # Список уже отсортирован по (first_name, id), как требует paginate_items
+    rows = [SimpleNamespace(first_name=name, id=i) for i, name in enumerate(names, 1)]
+    return sorted(rows, key=lambda row: (row.first_name, row.id))
+
+
+def _walk(items, page_size):
+    pages, cursor = [], None
+    while True:
+        page = paginate_items(items, ORDER_BY, page_size=page_size, cursor=cursor)
+        pages.append([item.id for item in page["items"]])
+        if not page["next_page"]:
+            return pages
+        cursor = page["next_cursor"]
+
+
+def test_cursor_round_trip():
+    values = ["Айгерим", 42]
+    cursor = encode_cursor(values, ORDER_BY)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, ORDER_BY) == values
+
+
+def test_cursor_round_trip_datetime_descending():
+    columns = (Applicant.registration_date, Applicant.id)
+    values = [datetime(2024, 8, 1, 12, 30, 15, 123456), 7]
+    cursor = encode_cursor(values, columns, descending=True)
+    assert decode_cursor(cursor, columns, descending=True) == values
+
+
+@pytest.mark.parametrize(
+    "columns, descending",
+    [
+        ((Applicant.registration_date, Applicant.id), False),
+        ((User.username, User.id), False),
+        (ORDER_BY, True),
+    ],
+)
+def test_cursor_rejects_other_sort_order(columns, descending):
+    cursor = encode_cursor(["b", 2], ORDER_BY)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, columns, descending)
+    assert error.value.status_code == 400
+    assert error.value.detail == "Cursor does not match the sort order"
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30", "W10", "eyJrZXkiOltdfQ"])
+def test_cursor_rejects_garbage(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, ORDER_BY)
+    assert error.value.status_code == 400
+
+
+def test_cursor_rejects_wrong_value_count():
+    cursor = encode_cursor(["b"], ORDER_BY)
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, ORDER_BY)
+    assert error.value.detail == "Invalid cursor"
+
+
+def test_keyset_pages_cover_all_items_once():
+    items = _items("c", "a", "b", "a", "c", "a", "b")
+    pages = _walk(items, page_size=3)
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == [item.id for item in items]
+
+
+def test_keyset_ties_broken_by_id():
+    # Одинаковые имена на границе страницы не теряются и не повторяются
+    items = _items("a", "a", "a", "a")
+    assert _walk(items, page_size=2) == [[1, 2], [3, 4]]
+
+
+def test_keyset_exact_fit_has_no_next_page():
+    page = paginate_items(_items("a", "b"), ORDER_BY, page_size=2)
+    assert page["next_page"] is False
+    assert page["next_cursor"] is None
+
+
+def test_keyset_cursor_past_the_end():
+    items = _items("a", "b")
+    cursor = encode_cursor(["z", 100], ORDER_BY)
+    page = paginate_items(items, ORDER_BY, page_size=2, cursor=cursor)
+    assert page["items"] == []
+    assert page["next_page"] is False
+
+
+def test_keyset_cursor_for_deleted_row():
+    # Курсор указывает на строку, которой уже нет: продолжаем со следующей
+    items = [item for item in _items("a", "b", "c", "d") if item.id != 2]
+    cursor = encode_cursor(["b", 2], ORDER_BY)
+    page = paginate_items(items, ORDER_BY, page_size=10, cursor=cursor)
+    assert [item.id for item in page["items"]] == [3, 4]
+
+
+def test_offset_page():
+    items = _items("a", "b", "c", "d", "e")
+    page = paginate_items(items, ORDER_BY, page=2, page_size=2)
+    assert [item.id for item in page["items"]] == [3, 4]
+    assert page["page"] == 2
+    assert page["next_page"] is True
+
+
+@pytest.mark.parametrize("page, page_size", [(0, 10), (1, 0)])
+def test_rejects_invalid_page(page, page_size):
+    with pytest.raises(HTTPException) as error:
+        paginate_items([], ORDER_BY, page=page, page_size=page_size)
+    assert error.value.status_code == 400
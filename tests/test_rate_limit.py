@@ -0,0 +1,88 @@
+import pytest
+
+from core.utilities import rate_limit
+from core.utilities.rate_limit import MemoryTokenBuckets, RateLimit, client_ip
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+async def test_allows_burst_then_rejects(clock):
+    buckets = MemoryTokenBuckets()
+    limit = RateLimit(capacity=3, rate=1)
+    assert [await buckets.take([("ip:1", limit)]) for _ in range(3)] == [0, 0, 0]
+    assert await buckets.take([("ip:1", limit)]) == pytest.approx(1.0)
+
+
+async def test_refills_over_time(clock):
+    buckets = MemoryTokenBuckets()
+    limit = RateLimit.per_minute(capacity=1, per_minute=6)
+    assert await buckets.take([("ip:1", limit)]) == 0
+    assert await buckets.take([("ip:1", limit)]) == pytest.approx(10.0)
+    clock[0] += 4
+    assert await buckets.take([("ip:1", limit)]) == pytest.approx(6.0)
+    clock[0] += 6
+    assert await buckets.take([("ip:1", limit)]) == 0
+
+
+async def test_refill_capped_at_capacity(clock):
+    buckets = MemoryTokenBuckets()
+    limit = RateLimit(capacity=2, rate=1)
+    await buckets.take([("ip:1", limit)])
+    clock[0] += 3600
+    results = [await buckets.take([("ip:1", limit)]) for _ in range(3)]
+    assert results[:2] == [0, 0]
+    assert results[2] > 0
+
+
+async def test_rejection_does_not_spend_other_buckets(clock):
+    # Отказ по IP не тратит попытки по имени пользователя
+    buckets = MemoryTokenBuckets()
+    ip, user = RateLimit(capacity=1, rate=0.1), RateLimit(capacity=2, rate=0.1)
+    assert await buckets.take([("ip:1", ip), ("user:a", user)]) == 0
+    assert await buckets.take([("ip:1", ip), ("user:a", user)]) > 0
+    assert await buckets.take([("ip:1", ip), ("user:a", user)]) > 0
+    assert await buckets.take([("ip:2", ip), ("user:a", user)]) == 0
+    assert await buckets.take([("ip:3", ip), ("user:a", user)]) > 0
+
+
+async def test_keys_are_independent(clock):
+    buckets = MemoryTokenBuckets()
+    limit = RateLimit(capacity=1, rate=1)
+    assert await buckets.take([("ip:1", limit)]) == 0
+    assert await buckets.take([("ip:2", limit)]) == 0
+
+
+async def test_evicts_least_recently_used(clock):
+    buckets = MemoryTokenBuckets(max_keys=2)
+    limit = RateLimit(capacity=1, rate=0.01)
+    for key in ("ip:1", "ip:2", "ip:1", "ip:3"):
+        await buckets.take([(key, limit)])
+    assert list(buckets.buckets) == ["ip:1", "ip:3"]
+
+
+TRUSTED = ["127.0.0.1", "10.0.0.0/8"]
+
+
+@pytest.mark.parametrize(
+    "host, forwarded_for, expected",
+    [
+        # Заголовок от недоверенного адреса игнорируется
+        ("203.0.113.7", "1.2.3.4", "203.0.113.7"),
+        ("127.0.0.1", None, "127.0.0.1"),
+        ("127.0.0.1", "198.51.100.1", "198.51.100.1"),
+        # Левее первого недоверенного адреса — то, что прислал клиент
+        ("127.0.0.1", "1.2.3.4, 198.51.100.1, 10.0.0.5", "198.51.100.1"),
+        # Все адреса доверенные: берём самый левый
+        ("127.0.0.1", "10.0.0.9, 10.0.0.5", "10.0.0.9"),
+        ("127.0.0.1", "garbage, 10.0.0.5", "garbage"),
+        ("127.0.0.1", " , ", "127.0.0.1"),
+        (None, "1.2.3.4", "unknown"),
+    ],
+)
+def test_client_ip(host, forwarded_for, expected):
+    assert client_ip(host, forwarded_for, TRUSTED) == expected